@@ -0,0 +1,222 @@
+"""
+Модуль содержит ASGI-обработчик для Django 2.2, в котором ASGI ещё нет.
+Цикл событий ASGI-сервера принимает соединения, читает тело запроса
+и отправляет ответ, а сам запрос обрабатывает WSGI-обработчик Django
+в пуле потоков. Поток занят только на время работы вью и базы: медленный
+клиент, который долго присылает запрос или читает ответ, ждёт в цикле
+событий и потока не занимает. Чтение произведений, отзывов
+и комментариев выполняется в отдельном пуле ASGI_READ_THREADS потоков,
+остальные запросы - в пуле ASGI_THREADS потоков, поэтому запись
+и авторизация не ждут за очередью чтения. У каждого потока своё
+соединение с базой, так что число соединений процесса ограничено
+размером пулов. Запрос, которому не хватило места в очереди пула
+(ASGI_MAX_PENDING ожидающих), сразу получает 503.
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+READ_PATH = re.compile(r'^/api/v1/titles/')
+
+
+class Pool:
+    """
+    Пул потоков с ограниченной очередью. Счётчик запросов меняется
+    только в потоке цикла событий, поэтому блокировка не нужна.
+    """
+    def __init__(self, name, threads, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix=f'asgi-{name}')
+        self.limit = threads + max_pending
+        self.running = 0
+
+    @property
+    def full(self):
+        return self.running >= self.limit
+
+    async def run(self, function, *args):
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, function, *args
+            )
+        finally:
+            self.running -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def is_read(scope):
+    """Запрос на чтение произведений, отзывов или комментариев."""
+    return (scope['method'] in READ_METHODS
+            and READ_PATH.match(scope['path']) is not None)
+
+
+def _latin1(value):
+    return value.encode().decode('latin1')
+
+
+def build_environ(scope, body):
+    """Окружение WSGI для HTTP-запроса scope с телом body."""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(script_name),
+        'PATH_INFO': _latin1(path),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    """
+    ASGI-приложение поверх WSGI-приложения Django wsgi_application.
+    Пулы потоков создаются в процессе, который обрабатывает запросы,
+    то есть после fork воркера.
+    """
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+        self.pid = None
+        self.pools = None
+
+    def get_pools(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.pools = {
+                'read': Pool('read', settings.ASGI_READ_THREADS,
+                             settings.ASGI_MAX_PENDING),
+                'default': Pool('default', settings.ASGI_THREADS,
+                                settings.ASGI_MAX_PENDING),
+            }
+        return self.pools
+
+    def shutdown(self):
+        if self.pid == os.getpid():
+            for pool in self.pools.values():
+                pool.shutdown()
+        self.pid = self.pools = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+        pool = self.get_pools()['read' if is_read(scope) else 'default']
+        body = await self.read_body(receive)
+        if body is None:
+            return None
+        try:
+            if pool.full:
+                status, headers, content = self.overloaded()
+            else:
+                status, headers, content = await pool.run(
+                    self.call_wsgi, build_environ(scope, body)
+                )
+        finally:
+            body.close()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+        return None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.get_pools()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        """
+        Тело запроса целиком, до передачи запроса в поток.
+        None, если клиент отключился раньше.
+        """
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b'
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def call_wsgi(self, environ):
+        """
+        Обработка запроса WSGI-приложением в потоке пула.
+        Ответ собирается целиком, чтобы отправка медленному клиенту
+        не держала поток. Закрытие ответа в этом же потоке возвращает
+        соединение потока с базой (сигнал request_finished).
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+        status, headers = started
+        return int(status.split()[0]), [
+            (name.lower().encode('latin1'), value.encode('latin1'))
+            for name, value in headers
+        ], content
+
+    @staticmethod
+    def overloaded():
+        content = json.dumps(
+            {'detail': 'Сервер перегружен, повторите запрос позже.'},
+            ensure_ascii=False,
+        ).encode()
+        return 503, [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(content)).encode()),
+            (b'retry-after', str(settings.CONCURRENCY_RETRY_AFTER).encode()),
+        ], content
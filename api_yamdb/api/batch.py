@@ -0,0 +1,118 @@
+"""
+Модуль содержит выполнение пакетных запросов: несколько GET-запросов
+к API за один HTTP-запрос. Подзапросы вызывают вью напрямую, в обход
+middleware. Пользователь пакетного запроса передаётся во вью как уже
+аутентифицированный (как force_authenticate в тестах DRF), поэтому
+токен разбирается один раз. Права и троттлинг вью проверяются
+для каждого подзапроса как обычно. При BATCH_WORKERS > 0 подзапросы
+выполняются параллельно в пуле потоков, у каждого потока своё
+соединение с базой.
+"""
+import copy
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'api'
+VIEW_NAME = 'api:batch'
+BODY_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'wsgi.input')
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул потоков для подзапросов или None, если BATCH_WORKERS = 0."""
+    global _executor, _executor_workers
+    workers = settings.BATCH_WORKERS
+    if not workers:
+        return None
+    if _executor is None or _executor_workers != workers:
+        with _executor_lock:
+            if _executor is None or _executor_workers != workers:
+                if _executor is not None:
+                    _executor.shutdown(wait=False)
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='batch'
+                )
+                _executor_workers = workers
+    return _executor
+
+
+def _error(path, status, detail):
+    return {'path': path, 'status': status, 'body': {'detail': detail}}
+
+
+def subrequest(request, path, query):
+    """
+    Копия HTTP-запроса request для GET-запроса к path.
+    Пользователь и токен request передаются как уже проверенные.
+    """
+    django_request = copy.copy(request._request)
+    django_request.method = 'GET'
+    django_request.path = django_request.path_info = path
+    django_request.META = {
+        key: value for key, value in request.META.items()
+        if key not in BODY_META
+    }
+    django_request.META.update(REQUEST_METHOD='GET', PATH_INFO=path,
+                               QUERY_STRING=query)
+    django_request.GET = QueryDict(query)
+    if request.user.is_authenticated:
+        django_request._force_auth_user = request.user
+        django_request._force_auth_token = request.auth
+    return django_request
+
+
+def call(request, path):
+    """
+    Выполнение одного подзапроса.
+    Возвращает словарь с путём, статусом и телом ответа.
+    """
+    url = urlsplit(path)
+    if url.scheme or url.netloc or not url.path.startswith('/'):
+        return _error(path, 400, 'Ожидается путь от корня сайта.')
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return _error(path, 404, 'Страница не найдена.')
+    if NAMESPACE not in match.namespaces or match.view_name == VIEW_NAME:
+        return _error(path, 400, 'Путь недоступен в пакетном запросе.')
+    django_request = subrequest(request, url.path, url.query)
+    django_request.resolver_match = match
+    try:
+        response = match.func(django_request, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception('Ошибка подзапроса GET %s', path)
+        return _error(path, 500, 'Ошибка сервера.')
+    return {'path': path, 'status': response.status_code,
+            'body': getattr(response, 'data', None)}
+
+
+def _call_in_thread(request, path):
+    close_old_connections()
+    try:
+        return call(request, path)
+    finally:
+        close_old_connections()
+
+
+def run(request, paths):
+    """
+    Выполнение подзапросов paths: последовательно или в пуле потоков.
+    Ответы возвращаются в порядке путей.
+    """
+    executor = get_executor()
+    if executor is None or len(paths) < 2:
+        return [call(request, path) for path in paths]
+    return list(executor.map(lambda path: _call_in_thread(request, path),
+                             paths))
@@ -1,18 +1,75 @@
 """Модуль содержит самописные фильтры."""
 import django_filters as filters
-from reviews.models import Title
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from reviews.models import Category, Genre, GenreTitle, Title, TitleStats
+
+
+def slugs(value):
+    """Список slug из значения вида 'a,b'."""
+    return [slug for slug in (part.strip() for part in value.split(','))
+            if slug]
 
 
 class TitleFilter(filters.FilterSet):
     """
     Фильтр для произведений, спроектирован по требованиям тестов.
     Имя произведения фильтруется по частичному совпадению.
+    Жанры, категории и рейтинг фильтруются подзапросами IN, а не
+    соединением таблиц: строки произведений не дублируются,
+    а подзапросы читают индексы GenreTitle и TitleStats.
+    genre и category принимают несколько slug через запятую,
+    genre_match=all оставляет произведения со всеми жанрами
+    (по умолчанию - хотя бы с одним).
     """
-    genre = filters.CharFilter(field_name='genre__slug')
-    category = filters.CharFilter(field_name='category__slug')
+    GENRE_MATCH_CHOICES = (('any', 'any'), ('all', 'all'))
+
+    genre = filters.CharFilter(method='filter_genre')
+    genre_match = filters.ChoiceFilter(choices=GENRE_MATCH_CHOICES,
+                                       method='filter_noop')
+    category = filters.CharFilter(method='filter_category')
     year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(method='filter_rating_min')
     name = filters.CharFilter(field_name='name', lookup_expr='contains')
 
     class Meta:
         model = Title
         fields = '__all__'
+
+    def filter_noop(self, queryset, name, value):
+        return queryset
+
+    def filter_genre(self, queryset, name, value):
+        values = slugs(value)
+        if not values:
+            return queryset
+        if self.form.cleaned_data.get('genre_match') != 'all':
+            return queryset.filter(pk__in=GenreTitle.objects.filter(
+                genre__in=Genre.objects.filter(slug__in=values)
+            ).values('title_id'))
+        for slug in set(values):
+            queryset = queryset.filter(pk__in=GenreTitle.objects.filter(
+                genre__in=Genre.objects.filter(slug=slug)
+            ).values('title_id'))
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        values = slugs(value)
+        if not values:
+            return queryset
+        return queryset.filter(category__in=Category.objects.filter(
+            slug__in=values
+        ).values('pk'))
+
+    def filter_rating_min(self, queryset, name, value):
+        """
+        Средняя оценка не ниже value по строкам TitleStats:
+        score_sum >= value * reviews_count.
+        """
+        return queryset.filter(pk__in=TitleStats.objects.filter(
+            score_sum__gte=ExpressionWrapper(
+                F('reviews_count') * Value(float(value)),
+                output_field=FloatField()
+            )
+        ).values('title_id'))
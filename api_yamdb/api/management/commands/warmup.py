@@ -0,0 +1,28 @@
+"""Модуль содержит команду прогрева и замера холодного старта."""
+import time
+
+from api.warmup import warm_up
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Прогревает процесс так же, как воркер gunicorn перед приёмом '
+            'запросов, и печатает длительность фаз прогрева.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Пути запросов прогрева, по умолчанию WARMUP_PATHS'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        timings, statuses = warm_up(options['paths'] or None)
+        for phase, duration in timings.items():
+            self.stdout.write(f'{phase}: {duration * 1000:.1f} мс')
+        for path, status in statuses.items():
+            self.stdout.write(f'GET {path} -> {status}')
+        self.stdout.write(
+            f'Всего: {(time.perf_counter() - start) * 1000:.1f} мс.'
+        )
@@ -0,0 +1,291 @@
+"""
+Модуль содержит сбор метрик запросов и их выдачу в формате Prometheus.
+Каждый процесс копит метрики в памяти и периодически сбрасывает их
+в собственный файл в METRICS_DIR, эндпоинт /metrics суммирует файлы
+всех процессов. Файлы завершившихся процессов сливаются в общий архив.
+"""
+import atexit
+import fcntl
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+from reviews.invalidation import bus_event
+
+PREFIX = 'yamdb_'
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Число запросов по маршрутам.'),
+    'http_request_duration_seconds': (
+        'histogram', 'Длительность обработки запроса.'),
+    'http_response_size_bytes': (
+        'histogram', 'Размер тела ответа.'),
+    'http_request_db_queries': (
+        'histogram', 'Число SQL-запросов на один запрос.'),
+    'cache_requests_total': (
+        'counter', 'Обращения к кэшам: попадания и промахи.'),
+    'cache_invalidations_total': (
+        'counter', 'Сообщения шины инвалидации и очистки кэша процесса.'),
+    'cache_invalidation_lag_seconds': (
+        'histogram', 'Задержка доставки сообщения шины инвалидации.'),
+}
+
+
+class Registry:
+    """
+    Метрики текущего процесса.
+    Все значения - счётчики с ключом (имя, метки), гистограммы
+    раскладываются на счётчики _bucket, _sum и _count.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(
+            directory, f'{os.getpid()}_{uuid.uuid4().hex[:8]}.json'
+        )
+        self.values = {}
+        self.lock = threading.Lock()
+        self.flushed = time.monotonic()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets):
+        position = bisect_left(buckets, value)
+        for bound in buckets[position:]:
+            self.inc(f'{name}_bucket', dict(labels, le=str(bound)))
+        self.inc(f'{name}_bucket', dict(labels, le='+Inf'))
+        self.inc(f'{name}_sum', labels, value)
+        self.inc(f'{name}_count', labels)
+
+    def maybe_flush(self, interval):
+        if time.monotonic() - self.flushed >= interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            payload = [[name, labels, value]
+                       for (name, labels), value in self.values.items()]
+            self.flushed = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(payload, file)
+        os.replace(temporary, self.path)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Реестр текущего процесса для каталога settings.METRICS_DIR."""
+    global _registry
+    directory = settings.METRICS_DIR
+    if _registry is None or _registry.directory != directory:
+        with _registry_lock:
+            if _registry is None or _registry.directory != directory:
+                _registry = Registry(directory)
+                atexit.register(_registry.flush)
+    return _registry
+
+
+def route_name(request, view_func):
+    """
+    Имя маршрута для меток: basename роутера и action вьюсета
+    (например, reviews.list), для остальных вью - имя url.
+    """
+    basename = getattr(view_func, 'initkwargs', {}).get('basename')
+    actions = getattr(view_func, 'actions', None)
+    if basename and actions:
+        method = request.method.lower()
+        return f'{basename}.{actions.get(method, method)}'
+    return request.resolver_match.view_name
+
+
+def record_request(route, method, status, duration, size, queries):
+    registry = get_registry()
+    labels = {'route': route, 'method': method}
+    registry.inc(f'{PREFIX}http_requests_total',
+                 dict(labels, status=str(status)))
+    registry.observe(f'{PREFIX}http_request_duration_seconds', labels,
+                     duration, LATENCY_BUCKETS)
+    registry.observe(f'{PREFIX}http_response_size_bytes', labels,
+                     size, SIZE_BUCKETS)
+    registry.observe(f'{PREFIX}http_request_db_queries', labels,
+                     queries, QUERY_BUCKETS)
+    registry.maybe_flush(settings.METRICS_FLUSH_INTERVAL)
+
+
+def record_cache(cache, hit):
+    """Учёт обращения к кэшу cache: hit=True - попадание."""
+    if not settings.METRICS_ENABLED:
+        return
+    get_registry().inc(f'{PREFIX}cache_requests_total',
+                       {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+@receiver(bus_event)
+def record_invalidation(sender, event, lag=None, **kwargs):
+    """Учёт сообщений шины инвалидации и задержки их доставки."""
+    if not settings.METRICS_ENABLED:
+        return
+    registry = get_registry()
+    registry.inc(f'{PREFIX}cache_invalidations_total', {'event': event})
+    if lag is not None:
+        registry.observe(f'{PREFIX}cache_invalidation_lag_seconds', {},
+                         lag, LAG_BUCKETS)
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(payloads):
+    values = {}
+    for payload in payloads:
+        for name, labels, value in payload:
+            key = (name, tuple(tuple(label) for label in labels))
+            values[key] = values.get(key, 0) + value
+    return values
+
+
+def collect(directory):
+    """
+    Сумма метрик всех процессов.
+    Файлы завершившихся процессов переносятся в архив, чтобы их число
+    не росло при перезапуске воркеров.
+    """
+    os.makedirs(directory, exist_ok=True)
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    with open(os.path.join(directory, LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = _read(archive_path)
+        live, dead = [], []
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == ARCHIVE_FILE:
+                continue
+            path = os.path.join(directory, filename)
+            pid = int(filename.split('_', 1)[0])
+            (live if _is_alive(pid) else dead).append(path)
+        if dead:
+            merged = _merge([archive] + [_read(path) for path in dead])
+            archive = [[name, labels, value]
+                       for (name, labels), value in merged.items()]
+            temporary = f'{archive_path}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump(archive, file)
+            os.replace(temporary, archive_path)
+            for path in dead:
+                os.remove(path)
+        return _merge([archive] + [_read(path) for path in live])
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _sort_key(item):
+    (name, labels), value = item
+    labels = dict(labels)
+    bound = labels.pop('le', None)
+    if bound is not None:
+        bound = float(bound)
+    return name, sorted(labels.items()), bound or 0
+
+
+def render(values):
+    """Текстовый формат экспозиции Prometheus."""
+    lines = []
+    described = set()
+    for (name, labels), value in sorted(values.items(), key=_sort_key):
+        family = name[len(PREFIX):]
+        for suffix in ('_bucket', '_sum', '_count'):
+            if family.endswith(suffix) and family not in METRICS:
+                family = family[:-len(suffix)]
+        if family not in described and family in METRICS:
+            kind, description = METRICS[family]
+            lines.append(f'# HELP {PREFIX}{family} {description}')
+            lines.append(f'# TYPE {PREFIX}{family} {kind}')
+            described.add(family)
+        label_text = ','.join(f'{key}="{_escape(label)}"'
+                              for key, label in labels)
+        if label_text:
+            label_text = f'{{{label_text}}}'
+        lines.append(f'{name}{label_text} {_format(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _allowed(request):
+    """
+    Запрос пришёл с адреса из METRICS_ALLOWED_NETWORKS
+    или с токеном METRICS_TOKEN.
+    """
+    token = settings.METRICS_TOKEN
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    if token and scheme.lower() == 'bearer' and hmac.compare_digest(
+        credentials.strip().encode(), token.encode()
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network.strip(), strict=False)
+               for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    """
+    Метрики всех процессов в текстовом формате Prometheus.
+    Доступны только из разрешённых сетей или с токеном.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not _allowed(request):
+        raise PermissionDenied
+    get_registry().flush()
+    return HttpResponse(render(collect(settings.METRICS_DIR)),
+                        content_type=CONTENT_TYPE)
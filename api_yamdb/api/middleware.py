@@ -0,0 +1,188 @@
+"""Модуль содержит самописные middleware."""
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import JsonResponse
+from reviews import invalidation
+
+from . import metrics
+from .profiling import RequestProfile, set_profile
+from .query_detector import QueryDetector, format_problems
+from .throttling import get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запросов.
+    Для отобранных запросов считает SQL-запросы и длительности фаз,
+    при PROFILING_SERVER_TIMING добавляет заголовок Server-Timing,
+    медленные запросы пишет в лог вместе с самыми долгими SQL.
+    Если профилирование выключено, middleware не подключается вовсе.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.PROFILING_SERVER_TIMING
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_request = settings.PROFILING_SLOW_REQUEST_MS / 1000
+        if not self.server_timing and not self.sample_rate:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if not self.server_timing and random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = RequestProfile()
+        set_profile(profile)
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            set_profile(None)
+        profile.finish()
+        if self.server_timing:
+            response['Server-Timing'] = profile.server_timing()
+        if profile.total >= self.slow_request:
+            self.log_slow_request(request, response, profile)
+        return response
+
+    @staticmethod
+    def log_slow_request(request, response, profile):
+        queries = '\n'.join(
+            f'  {duration * 1000:.2f} мс: {sql}'
+            for sql, duration in profile.slowest_queries(
+                settings.PROFILING_LOGGED_QUERIES
+            )
+        )
+        logger.warning(
+            'Медленный запрос %s %s -> %s: %.2f мс, %s SQL-запросов; %s\n%s',
+            request.method, request.get_full_path(), response.status_code,
+            profile.total * 1000, len(profile.queries),
+            profile.server_timing(), queries,
+        )
+
+
+class QueryCounter:
+    """Счётчик SQL-запросов, подключаемый через connection.execute_wrapper."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Сбор метрик по маршрутам: число запросов, длительность, размер ответа
+    и число SQL-запросов. Маршрут - basename роутера и action вьюсета.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        size = (len(response.content) if not response.streaming
+                else int(response.get('Content-Length', 0)))
+        metrics.record_request(
+            route=getattr(request, 'metrics_route', 'unmatched'),
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            size=size,
+            queries=counter.count,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_route = metrics.route_name(request, view_func)
+
+
+class QueryDetectorMiddleware:
+    """
+    Поиск N+1 и повторяющихся SQL-запросов, для тестовых стендов.
+    Найденные проблемы пишутся в лог вместе с местами вызова.
+    Подключается только при QUERY_DETECTOR_ENABLED.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.QUERY_DETECTOR_ENABLED:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        with QueryDetector() as detector:
+            response = self.get_response(request)
+        problems = detector.problems()
+        if problems:
+            logger.warning(
+                'Повторяющиеся SQL-запросы в %s %s:\n%s',
+                request.method, request.get_full_path(),
+                format_problems(problems),
+            )
+        return response
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Ограничение числа одновременно обрабатываемых запросов.
+    Вью-класс относится к группе через атрибут concurrency_group,
+    бюджет группы задаётся в CONCURRENCY_LIMITS. При превышении бюджета
+    запрос сразу получает 503, не занимая поток воркера.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.CONCURRENCY_LIMITS:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            limiter = getattr(request, 'concurrency_limiter', None)
+            if limiter is not None:
+                limiter.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        group = getattr(getattr(view_func, 'cls', None),
+                        'concurrency_group', None)
+        limiter = group and get_limiter(group)
+        if not limiter:
+            return None
+        if not limiter.acquire():
+            response = JsonResponse(
+                {'detail': 'Сервер перегружен, повторите запрос позже.'},
+                status=503,
+            )
+            response['Retry-After'] = str(settings.CONCURRENCY_RETRY_AFTER)
+            return response
+        request.concurrency_limiter = limiter
+        return None
+
+
+class InvalidationMiddleware:
+    """
+    Запуск потока шины инвалидации в воркере (в том числе после fork)
+    и очистка кэша процесса, если шина молчит дольше
+    INVALIDATION_MAX_STALENESS. Подключается только при INVALIDATION_BUS.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.INVALIDATION_BUS:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        bus = invalidation.get_bus()
+        if bus is not None:
+            bus.start()
+            bus.ensure_fresh()
+        return self.get_response(request)
@@ -1,11 +1,60 @@
 """Модуль содержит самописные миксины."""
-from rest_framework import generics, mixins, viewsets
+import time
+
+from django.conf import settings
+from rest_framework import generics, mixins, status, viewsets
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from reviews import deletion
 
+from . import response_cache
 from .permissions import AdminOrReadonly
+from .profiling import get_profile, phase
+from .serializers import DeletionJobSerializer
+
+
+class ProfilingMixin:
+    """
+    Миксин для вью-классов: замер фаз запроса для ProfilingMiddleware.
+    auth - аутентификация, проверка прав и троттлинг.
+    serialize - работа обработчика без учёта времени SQL-запросов.
+    """
+    def initial(self, request, *args, **kwargs):
+        with phase('auth'):
+            super().initial(request, *args, **kwargs)
+        profile = get_profile()
+        if profile is not None:
+            self._profile_mark = (time.perf_counter(), profile.db_time)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        profile = get_profile()
+        mark = getattr(self, '_profile_mark', None)
+        if profile is not None and mark is not None:
+            started, db_time = mark
+            profile.add(
+                'serialize',
+                time.perf_counter() - started - (profile.db_time - db_time)
+            )
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class BackgroundDeletionMixin:
+    """
+    Миксин для вьюсетов: фоновое удаление при BACKGROUND_DELETION.
+    Объект помечается удаляемым и пропадает из API сразу, зависимые
+    объекты удаляет воркер process_deletions. В ответе 202 - задание
+    на удаление, его прогресс доступен по /api/v1/deletions/{id}/.
+    """
+    def destroy(self, request, *args, **kwargs):
+        if not settings.BACKGROUND_DELETION:
+            return super().destroy(request, *args, **kwargs)
+        job = deletion.schedule(self.get_object())
+        return Response(DeletionJobSerializer(job).data,
+                        status=status.HTTP_202_ACCEPTED)
 
-class CreateByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
+
+class CreateByAdminOrReadOnlyModelMixin(ProfilingMixin,
+                                        mixins.CreateModelMixin,
                                         mixins.ListModelMixin,
                                         mixins.DestroyModelMixin,
                                         viewsets.GenericViewSet):
@@ -17,7 +66,8 @@ class CreateByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
     permission_classes = (AdminOrReadonly, )
 
 
-class CreateOrChangeByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
+class CreateOrChangeByAdminOrReadOnlyModelMixin(ProfilingMixin,
+                                                mixins.CreateModelMixin,
                                                 mixins.ListModelMixin,
                                                 mixins.DestroyModelMixin,
                                                 mixins.UpdateModelMixin,
@@ -31,6 +81,38 @@ class CreateOrChangeByAdminOrReadOnlyModelMixin(mixins.CreateModelMixin,
     permission_classes = (AdminOrReadonly, )
 
 
-class PostByAny(mixins.CreateModelMixin, generics.GenericAPIView):
+class PostByAny(ProfilingMixin, mixins.CreateModelMixin,
+                generics.GenericAPIView):
     """Миксин для классов: метод POST, разрешён всем."""
     permission_classes = (AllowAny, )
+
+
+class ResponseCacheMixin:
+    """
+    Миксин для вьюсетов: кэш ответов list и retrieve со слиянием
+    одинаковых промахов и выдачей устаревшего ответа на время
+    пересборки (см. api.response_cache). Области данных, от которых
+    зависит ответ, возвращает get_response_scopes(). Кэш включается
+    настройкой RESPONSE_CACHE_TIMEOUT.
+    """
+    def get_response_scopes(self):
+        raise NotImplementedError('.get_response_scopes() must be overridden')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if not timeout:
+            return handler(request, *args, **kwargs)
+        key = response_cache.response_key(request,
+                                          self.get_response_scopes())
+        data = response_cache.get_or_compute(
+            key, lambda: handler(request, *args, **kwargs).data,
+            timeout, settings.RESPONSE_CACHE_STALE
+        )
+        return Response(data)
@@ -0,0 +1,183 @@
+"""Модуль содержит самописные пагинаторы."""
+import base64
+import binascii
+import hashlib
+
+from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from reviews import search
+from reviews.paginators import ESTIMATE_THRESHOLD, estimate_rows
+from reviews.signals import get_parent_count
+
+from .metrics import record_cache
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """
+    Пагинатор limit/offset, который берёт count из дешёвых источников.
+    Каждый источник включается атрибутом вьюсета:
+    count_parent_lookup - имя параметра url с id родителя, число
+    объектов у родителя кэшируется и сбрасывается сигналами моделей;
+    count_estimate - для запросов без фильтров запроса использовать
+    оценку числа строк по статистике PostgreSQL;
+    count_cache_timeout - кэшировать COUNT(*) запроса на столько секунд.
+    """
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        self.approximate = False
+        page = super().paginate_queryset(queryset, request, view)
+        if page == [] and self.approximate:
+            page = list(queryset[self.offset:self.offset + self.limit])
+        return page
+
+    def get_count(self, queryset):
+        view = self.view
+        lookup = getattr(view, 'count_parent_lookup', None)
+        if lookup is not None:
+            count, hit = get_parent_count(queryset, view.kwargs[lookup])
+            record_cache('parent_count', hit)
+            self.approximate = hit
+            return count
+        if getattr(view, 'count_estimate', False) and self.unfiltered(
+            queryset, view
+        ):
+            estimate = estimate_rows(queryset.model, using=queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                self.approximate = True
+                return estimate
+        timeout = getattr(view, 'count_cache_timeout', None)
+        if timeout:
+            return self.get_cached_count(queryset, timeout)
+        return super().get_count(queryset)
+
+    @staticmethod
+    def unfiltered(queryset, view):
+        """
+        Нет ли у запроса условий сверх базового queryset вьюсета
+        (например, is_deleted=False): фильтры добавляют условия в WHERE.
+        """
+        base = view.get_queryset().query.where
+        return len(queryset.query.where.children) == len(base.children)
+
+    def get_cached_count(self, queryset, timeout):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}{params!r}'.encode()).hexdigest()
+        key = f'count:query:{digest}'
+        count = cache.get(key)
+        record_cache('query_count', count is not None)
+        if count is not None:
+            self.approximate = True
+            return count
+        count = super().get_count(queryset)
+        cache.set(key, count, timeout)
+        return count
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорный пагинатор по убыванию даты публикации.
+    Страница выбирается условием pub_date < курсора по индексу
+    (author, pub_date, id), поэтому её стоимость не зависит от того,
+    насколько далеко она от начала. Размер страницы - параметр limit.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class SequencePagination(BasePagination):
+    """
+    Пагинатор журнала событий по номеру (position): параметр after -
+    номер последнего полученного события, limit - размер страницы.
+    События без номера (транзакции ещё не завершены) не отдаются.
+    Ссылка next есть всегда: по ней же можно опрашивать новые события,
+    пока страница пустая.
+    """
+    default_limit = 100
+    max_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.after = self.get_int(request, 'after', 0)
+        limit = min(self.get_int(request, 'limit', self.default_limit),
+                    self.max_limit)
+        page = list(queryset.filter(position__gt=self.after)
+                    .order_by('position')[:max(limit, 1)])
+        if page:
+            self.after = page[-1].position
+        return page
+
+    @staticmethod
+    def get_int(request, name, default):
+        value = request.query_params.get(name, default)
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            raise ValidationError({name: 'Ожидается целое число.'})
+
+    def get_paginated_response(self, data):
+        url = self.request.build_absolute_uri()
+        return Response({
+            'last': self.after,
+            'next': replace_query_param(url, 'after', self.after),
+            'results': data,
+        })
+
+
+class SearchPagination(BasePagination):
+    """
+    Курсорный пагинатор результатов полнотекстового поиска (reviews.search)
+    по запросу из параметра q. Курсор - релевантность и id последнего
+    объекта страницы, limit - размер страницы. Ссылка next есть,
+    пока за страницей есть результаты.
+    """
+    search_query_param = 'q'
+    max_query_length = 200
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        query = request.query_params.get(self.search_query_param, '').strip()
+        if not query or len(query) > self.max_query_length:
+            raise ValidationError({
+                self.search_query_param:
+                    f'Ожидается строка до {self.max_query_length} символов.'
+            })
+        limit = min(SequencePagination.get_int(request, 'limit',
+                                               self.default_limit),
+                    self.max_limit) or 1
+        page = search.search(queryset, query, after=self.decode_cursor(),
+                             limit=limit + 1)
+        self.next = None
+        if len(page) > limit:
+            page = page[:limit]
+            self.next = (page[-1].search_rank, page[-1].pk)
+        return page
+
+    def decode_cursor(self):
+        cursor = self.request.query_params.get('cursor')
+        if cursor is None:
+            return None
+        try:
+            rank, pk = base64.urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split(':')
+            return float(rank), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValidationError({'cursor': 'Неверный курсор.'})
+
+    def get_next_link(self):
+        if self.next is None:
+            return None
+        rank, pk = self.next
+        cursor = base64.urlsafe_b64encode(f'{rank!r}:{pk}'.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   'cursor', cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
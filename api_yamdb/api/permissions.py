@@ -33,6 +33,18 @@ class AuthorModeratorAdminOrReadonly(permissions.BasePermission):
             or request.user.is_admin
         )
 
+    def has_bulk_permission(self, request, view, queryset):
+        """
+        Те же правила для набора объектов одной проверкой:
+        модератору и администратору доступен любой набор,
+        автору - только набор из его собственных объектов.
+        """
+        return (
+            request.user.is_moderator
+            or request.user.is_admin
+            or not queryset.exclude(author=request.user).exists()
+        )
+
 
 class AdminOnly(permissions.BasePermission):
     """Пермишен доступа только для админа."""
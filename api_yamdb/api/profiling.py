@@ -0,0 +1,102 @@
+"""
+Модуль содержит инструменты профилирования запросов.
+Замеры ведутся только для запросов, отобранных ProfilingMiddleware,
+для остальных phase() и timed() ничего не делают.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+PHASE_DESCRIPTIONS = {
+    'auth': 'authentication and permissions',
+    'serialize': 'view and serialization',
+    'render': 'response rendering',
+}
+
+_local = threading.local()
+
+
+class RequestProfile:
+    """
+    Замеры одного запроса: длительности фаз и выполненные SQL-запросы.
+    Экземпляр подключается к соединению через connection.execute_wrapper.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.phases = {}
+        self.queries = []
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    def add(self, name, duration):
+        """Добавление длительности (в секундах) к фазе name."""
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing, длительности - в мс."""
+        metrics = [
+            f'{name};desc="{PHASE_DESCRIPTIONS.get(name, name)}";'
+            f'dur={duration * 1000:.2f}'
+            for name, duration in self.phases.items()
+        ]
+        metrics.append(
+            f'db;desc="{len(self.queries)} queries";'
+            f'dur={self.db_time * 1000:.2f}'
+        )
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def slowest_queries(self, limit):
+        return sorted(self.queries, key=lambda query: query[1],
+                      reverse=True)[:limit]
+
+
+def get_profile():
+    """Профиль текущего запроса или None, если запрос не профилируется."""
+    return getattr(_local, 'profile', None)
+
+
+def set_profile(profile):
+    _local.profile = profile
+
+
+@contextmanager
+def phase(name):
+    """Контекстный менеджер для замера фазы name текущего запроса."""
+    profile = get_profile()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Декоратор для замера фазы name на время вызова функции."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
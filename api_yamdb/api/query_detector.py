@@ -0,0 +1,120 @@
+"""
+Модуль содержит детектор N+1 и повторяющихся SQL-запросов.
+Запросы сводятся к «форме» (литералы и параметры заменяются на ?),
+форма, выполненная больше threshold раз, и точные повторы запроса
+с теми же параметрами считаются проблемами. Для каждой проблемы
+сохраняются места вызова в коде проекта.
+"""
+import os
+import re
+import traceback
+from collections import Counter, namedtuple
+
+import django
+from django.conf import settings
+from django.db import connection
+
+QueryProblem = namedtuple('QueryProblem',
+                          ('kind', 'sql', 'count', 'call_sites'))
+
+REPEATED = 'repeated'
+DUPLICATE = 'duplicate'
+CALL_SITES_LIMIT = 3
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s')
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+_SKIPPED_FILES = (
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'middleware.py'),
+)
+_DJANGO_DIR = os.path.dirname(os.path.abspath(django.__file__))
+
+
+def fingerprint(sql):
+    """Форма запроса: литералы и параметры заменены на ?, IN (...) свёрнут."""
+    sql = _SPACE.sub(' ', sql.strip())
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def call_site():
+    """
+    Место вызова запроса: ближайший кадр стека в коде проекта,
+    а если такого нет - ближайший кадр вне Django (например, поле DRF).
+    """
+    fallback = None
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename in _SKIPPED_FILES:
+            continue
+        if frame.filename.startswith(settings.BASE_DIR):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+        if fallback is None and not frame.filename.startswith(_DJANGO_DIR):
+            fallback = f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return fallback
+
+
+class QueryDetector:
+    """
+    Сбор SQL-запросов через connection.execute_wrapper.
+    Используется как контекстный менеджер, по выходу problems()
+    возвращает найденные проблемы. По умолчанию учитываются только SELECT.
+    """
+    def __init__(self, threshold=None, select_only=True):
+        self.threshold = (settings.QUERY_DETECTOR_THRESHOLD
+                          if threshold is None else threshold)
+        self.select_only = select_only
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.select_only or sql.lstrip()[:6].upper() == 'SELECT':
+            self.queries.append(
+                (fingerprint(sql), (sql, repr(params)), call_site())
+            )
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+        self._wrapper = None
+
+    def problems(self):
+        shapes = Counter(shape for shape, _, _ in self.queries)
+        exact = Counter(key for _, key, _ in self.queries)
+        problems = []
+        for shape, count in shapes.most_common():
+            if count > self.threshold:
+                problems.append(QueryProblem(
+                    REPEATED, shape, count,
+                    self._call_sites(lambda query: query[0] == shape)
+                ))
+        for (sql, params), count in exact.most_common():
+            if count > 1:
+                problems.append(QueryProblem(
+                    DUPLICATE, f'{sql} {params}', count,
+                    self._call_sites(lambda query: query[1] == (sql, params))
+                ))
+        return problems
+
+    def _call_sites(self, matches):
+        sites = Counter(site for *_, site in filter(matches, self.queries))
+        return [site for site, _ in sites.most_common(CALL_SITES_LIMIT)]
+
+
+def format_problems(problems):
+    """Текстовый отчёт о найденных проблемах."""
+    lines = []
+    for problem in problems:
+        lines.append(f'[{problem.kind}] {problem.count} раз: {problem.sql}')
+        lines.extend(f'    {site}' for site in problem.call_sites)
+    return '\n'.join(lines)
@@ -0,0 +1,12 @@
+"""Модуль содержит самописные рендереры."""
+from rest_framework import renderers
+
+from .profiling import phase
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSON-рендерер с замером фазы render для ProfilingMiddleware."""
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase('render'):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
@@ -0,0 +1,161 @@
+"""
+Модуль содержит кэш ответов чтения со слиянием одинаковых промахов.
+Ответ хранится в кэше Django вместе со сроком свежести. Свежий ответ
+отдаётся сразу. Устаревший (в пределах RESPONSE_CACHE_STALE после
+срока свежести) тоже отдаётся сразу, а пересобирает его один запрос,
+захвативший блокировку ключа. При промахе одинаковые запросы ждут
+одно вычисление: потоки воркера - на событии SingleFlight, воркеры
+между собой - на блокировке в кэше (cache.add). Блокировка общая для
+воркеров, только если кэш общий (Redis, Memcached); с локальным кэшем
+воркеры вычисляют ответ независимо. Ключ ответа включает поколения
+его областей (reviews.signals), поэтому изменение данных сбрасывает
+ответы без ожидания срока; воркеры с локальным кэшем узнают о смене
+поколения через шину инвалидации (reviews.invalidation).
+"""
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from reviews.signals import get_response_generations
+
+from .metrics import record_cache
+
+
+class Flight:
+    """Вычисление, которое ждут потоки с тем же ключом."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Слияние одинаковых вычислений в потоках процесса: первый поток
+    вычисляет значение, остальные ждут и получают его же результат
+    или исключение.
+    """
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, compute):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = compute()
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.value
+
+
+local_flights = SingleFlight()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _acquire(key):
+    """Блокировка ключа для всех воркеров: токен или None."""
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(key), token,
+                 settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _release(key, token):
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def _store(key, compute, timeout, stale):
+    value = compute()
+    cache.set(key, (value, time.time() + timeout), timeout + stale)
+    return value
+
+
+def _wait(key):
+    """
+    Ожидание ответа, который вычисляет другой воркер.
+    Возвращает запись кэша или None, если блокировка снята
+    или истекла без ответа.
+    """
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.RESPONSE_CACHE_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(_lock_key(key)) is None:
+            return None
+    return None
+
+
+def _fill(key, compute, timeout, stale):
+    token = _acquire(key)
+    if token is None:
+        entry = _wait(key)
+        if entry is not None:
+            return entry[0]
+        token = _acquire(key)
+    try:
+        return _store(key, compute, timeout, stale)
+    finally:
+        if token is not None:
+            _release(key, token)
+
+
+def get_or_compute(key, compute, timeout, stale=0, flights=local_flights):
+    """
+    Значение по ключу key из кэша или вычисленное compute().
+    Свежим значение считается timeout секунд, ещё stale секунд
+    отдаётся устаревшее, пока его пересобирает один запрос.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time():
+            record_cache('response', True)
+            return value
+        record_cache('response_stale', True)
+        token = _acquire(key)
+        if token is None:
+            return value
+        try:
+            return flights.do(
+                key, lambda: _store(key, compute, timeout, stale)
+            )
+        finally:
+            _release(key, token)
+    record_cache('response', False)
+    return flights.do(key, lambda: _fill(key, compute, timeout, stale))
+
+
+def response_key(request, scopes):
+    """Ключ ответа на запрос request с поколениями областей scopes."""
+    scopes = ['all', *scopes]
+    generations = get_response_generations(scopes)
+    version = ':'.join(f'{scope}={generation}'
+                       for scope, generation in zip(scopes, generations))
+    digest = hashlib.md5(
+        f'{version}|{request.build_absolute_uri()}'.encode()
+    ).hexdigest()
+    return f'response:{digest}'
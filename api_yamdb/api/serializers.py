@@ -1,8 +1,14 @@
 """Модуль содержит сериализаторы, используемые в REST API."""
+import json
+
+from django.conf import settings
 from django.utils.timezone import datetime
 from rest_framework import serializers, validators
 from rest_framework.generics import get_object_or_404
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews import moderation
+from reviews.leaderboards import trend_value
+from reviews.models import (Category, Comment, DeletionJob, Event, Genre,
+                            Review, Title, User)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,7 +18,7 @@ class CategorySerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Category
-        exclude = ('id', )
+        exclude = ('id', 'is_deleted')
         lookup_field = 'slug'
 
 
@@ -34,7 +40,7 @@ class TitleSerializer(serializers.ModelSerializer):
     """
     category = serializers.SlugRelatedField(
         slug_field='slug',
-        queryset=Category.objects.all(),
+        queryset=Category.objects.filter(is_deleted=False),
     )
     genre = serializers.SlugRelatedField(
         slug_field='slug',
@@ -69,7 +75,32 @@ class ReadTitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('is_deleted',)
+        read_only_fields = ('reviews_count',)
+
+
+class LeaderboardTitleSerializer(ReadTitleSerializer):
+    """
+    Сериализатор для лидербордов произведений.
+    Добавляет байесовский рейтинг, число отзывов и затухающее
+    число отзывов из строки рейтингов произведения.
+    """
+    weighted_rating = serializers.FloatField(source='stats.rating',
+                                             read_only=True)
+    reviews_count = serializers.IntegerField(source='stats.reviews_count',
+                                             read_only=True)
+    trend = serializers.SerializerMethodField()
+
+    def get_trend(self, obj):
+        return round(trend_value(obj.stats.trend), 3)
+
+
+class SimilarTitleSerializer(ReadTitleSerializer):
+    """
+    Сериализатор для похожих произведений.
+    Добавляет меру сходства с исходным произведением.
+    """
+    similarity = serializers.FloatField(read_only=True)
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -203,27 +234,17 @@ class ConfirmationSerializer(serializers.ModelSerializer):
 class ReviewSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Review.
-    Выполняется контроль правила 'от каждого пользователя возможен только
-    один отзыв на каждое произведение'.
+    Правило 'от каждого пользователя возможен только один отзыв на каждое
+    произведение' контролирует ограничение unique_riview в базе,
+    нарушение превращается в ошибку валидации во вьюсете.
     """
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
 
-    def validate(self, attrs):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context['view'].kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == 'POST':
-            if Review.objects.filter(title=title, author=author).exists():
-                raise serializers.ValidationError(
-                    'Извините, возможен только один отзыв'
-                )
-        return attrs
-
     class Meta:
-        fields = ('id', 'text', 'pub_date', 'author', 'score', 'title')
-        read_only_fields = ('id', 'title')
+        fields = ('id', 'text', 'pub_date', 'author', 'score', 'title',
+                  'comments_count')
+        read_only_fields = ('id', 'title', 'comments_count')
         model = Review
 
 
@@ -242,3 +263,93 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date', 'review')
         read_only_fields = ('review', 'id',)
         model = Comment
+
+
+class UserCommentSerializer(CommentSerializer):
+    """
+    Сериализатор комментариев пользователя.
+    Дополнительно содержит id отзыва и произведения.
+    """
+    review_id = serializers.IntegerField(read_only=True)
+    title_id = serializers.IntegerField(source='review.title_id',
+                                        read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('review_id', 'title_id')
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    """Сериализатор для заданий фонового удаления."""
+    class Meta:
+        model = DeletionJob
+        fields = '__all__'
+
+
+class EventSerializer(serializers.ModelSerializer):
+    """Сериализатор событий журнала изменений."""
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Event
+        fields = ('id', 'position', 'created', 'model', 'object_id',
+                  'action', 'data')
+
+    def get_data(self, obj):
+        return json.loads(obj.data) if obj.data else None
+
+
+class BatchSerializer(serializers.Serializer):
+    """
+    Сериализатор пакетного запроса: список путей GET-запросов к API
+    от корня сайта, не больше BATCH_MAX_REQUESTS.
+    """
+    requests = serializers.ListField(
+        child=serializers.CharField(max_length=2000), allow_empty=False
+    )
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'Не больше {settings.BATCH_MAX_REQUESTS} запросов в пакете.'
+            )
+        return value
+
+
+class ModerationSerializer(serializers.Serializer):
+    """
+    Сериализатор массовой модерации: действие, тип объектов и условия
+    отбора - список id, автор, интервал времени публикации
+    [since, until). Нужно хотя бы одно условие.
+    """
+    action = serializers.ChoiceField(choices=moderation.ACTIONS)
+    target = serializers.ChoiceField(choices=tuple(moderation.MODELS))
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        required=False
+    )
+    author = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all(), required=False
+    )
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate_ids(self, value):
+        if len(value) > settings.MODERATION_MAX_IDS:
+            raise serializers.ValidationError(
+                f'Не больше {settings.MODERATION_MAX_IDS} id в запросе.'
+            )
+        return value
+
+    def validate(self, attrs):
+        if not any(field in attrs
+                   for field in ('ids', 'author', 'since', 'until')):
+            raise serializers.ValidationError(
+                'Укажите id, автора или интервал времени публикации.'
+            )
+        if attrs.get('since') and attrs.get('until') and (
+            attrs['since'] >= attrs['until']
+        ):
+            raise serializers.ValidationError(
+                {'until': 'Конец интервала должен быть позже начала.'}
+            )
+        return attrs
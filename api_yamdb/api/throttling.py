@@ -0,0 +1,202 @@
+"""
+Модуль содержит троттлинг и ограничение параллельных запросов.
+Троттлинг построен на алгоритме token bucket: ведро ёмкостью N токенов
+пополняется со скоростью N за период из настройки rate ('N/период').
+Ведра хранятся в памяти процесса или, при THROTTLE_BACKEND='cache',
+в общем кэше Django, чтобы лимит действовал на все воркеры.
+"""
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+LOCAL_STORE_MAX_KEYS = 10000
+
+
+def _refill(state, capacity, rate, now):
+    if state is None:
+        return capacity
+    tokens, updated = state
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _wait(tokens, rate):
+    return 0 if tokens >= 1 else (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """
+    Хранилище вёдер в памяти процесса, одно на область троттлинга.
+    Вёдра хранятся в порядке последнего обращения, при превышении
+    max_keys вытесняются самые давние: размер ограничен, даже если
+    вёдра не успевают наполниться.
+    """
+    def __init__(self, max_keys=LOCAL_STORE_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, keys, capacity, rate, now):
+        """
+        Списание по токену из каждого ведра keys.
+        Возвращает 0, если запрос разрешён, иначе - секунды ожидания.
+        """
+        with self.lock:
+            states = [_refill(self.buckets.get(key), capacity, rate, now)
+                      for key in keys]
+            wait = max(_wait(tokens, rate) for tokens in states)
+            if not wait:
+                states = [tokens - 1 for tokens in states]
+            for key, tokens in zip(keys, states):
+                self.buckets[key] = (tokens, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Хранилище вёдер в кэше Django, общее для всех воркеров.
+    Чтение и запись не атомарны: при гонке возможен пропуск
+    лишнего запроса, но не ложная блокировка.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+
+    def consume(self, keys, capacity, rate, now):
+        stored = self.cache.get_many(keys)
+        states = [_refill(stored.get(key), capacity, rate, now)
+                  for key in keys]
+        wait = max(_wait(tokens, rate) for tokens in states)
+        if not wait:
+            states = [tokens - 1 for tokens in states]
+        self.cache.set_many(
+            {key: (tokens, now) for key, tokens in zip(keys, states)},
+            timeout=int(capacity / rate) + 1,
+        )
+        return wait
+
+
+local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+def get_local_store(scope):
+    """Хранилище вёдер области scope в памяти процесса."""
+    store = local_stores.get(scope)
+    if store is None:
+        with _local_stores_lock:
+            store = local_stores.setdefault(scope, LocalBucketStore())
+    return store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Базовый троттлинг по алгоритму token bucket.
+    Потомки возвращают из get_idents() идентификаторы клиента,
+    запрос разрешается, только если токен есть в ведре каждого из них.
+    """
+    cache_format = 'throttle_%(scope)s_%(view)s_%(ident)s'
+
+    def get_rate(self):
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def get_idents(self, request, view):
+        raise NotImplementedError('.get_idents() must be overridden')
+
+    def get_store(self):
+        if settings.THROTTLE_BACKEND == 'cache':
+            return CacheBucketStore(self.cache)
+        return get_local_store(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        keys = [
+            self.cache_format % {'scope': self.scope,
+                                 'view': view.__class__.__name__,
+                                 'ident': ident}
+            for ident in self.get_idents(request, view)
+        ]
+        if not keys:
+            return True
+        self.wait_time = self.get_store().consume(
+            keys, self.num_requests, self.num_requests / self.duration,
+            self.timer()
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    """Троттлинг по IP-адресу клиента."""
+    scope = 'auth_ip'
+
+    def get_idents(self, request, view):
+        return [self.get_ident(request)]
+
+
+class IdentityRateThrottle(TokenBucketThrottle):
+    """Троттлинг по переданным username и email."""
+    scope = 'auth_identity'
+    fields = ('username', 'email')
+
+    def get_idents(self, request, view):
+        # Тело не объект JSON отклонит сериализатор вью.
+        if not isinstance(request.data, Mapping):
+            return []
+        return [
+            f'{field}:{str(request.data[field]).strip().lower()}'
+            for field in self.fields if request.data.get(field)
+        ]
+
+
+class ConcurrencyLimiter:
+    """
+    Счётчик одновременно обрабатываемых запросов группы в процессе.
+    acquire() не ждёт: при исчерпании бюджета сразу возвращает False.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(group):
+    """Ограничитель группы эндпоинтов или None, если бюджет не задан."""
+    limit = settings.CONCURRENCY_LIMITS.get(group)
+    if not limit:
+        return None
+    limiter = _limiters.get(group)
+    if limiter is None or limiter.limit != limit:
+        with _limiters_lock:
+            limiter = _limiters.get(group)
+            if limiter is None or limiter.limit != limit:
+                limiter = _limiters[group] = ConcurrencyLimiter(limit)
+    return limiter
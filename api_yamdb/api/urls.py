@@ -2,9 +2,10 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from .views import (CategoryViewSet, CommentViewSet, ConfirmAPIView,
-                    GenreViewSet, NewUserAPIView, ReviewViewSet, TitleViewSet,
-                    UserViewSet)
+from .views import (BatchAPIView, CategoryViewSet, CommentViewSet,
+                    ConfirmAPIView, DeletionJobViewSet, EventViewSet,
+                    GenreViewSet, ModerationAPIView, NewUserAPIView,
+                    ReviewViewSet, SearchViewSet, TitleViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -13,6 +14,9 @@ v1_router.register('users', UserViewSet)
 v1_router.register('categories', CategoryViewSet)
 v1_router.register('genres', GenreViewSet)
 v1_router.register('titles', TitleViewSet)
+v1_router.register('deletions', DeletionJobViewSet)
+v1_router.register('events', EventViewSet)
+v1_router.register('search', SearchViewSet, basename='search')
 v1_router.register(
     r'titles/(?P<title_id>\d+)/reviews',
     ReviewViewSet,
@@ -27,5 +31,7 @@ v1_router.register(
 urlpatterns = [
     path('v1/auth/signup/', NewUserAPIView.as_view(), name='new_user'),
     path('v1/auth/token/', ConfirmAPIView.as_view(), name='confirm_user'),
+    path('v1/batch/', BatchAPIView.as_view(), name='batch'),
+    path('v1/moderation/', ModerationAPIView.as_view(), name='moderation'),
     path('v1/', include(v1_router.urls)),
 ]
@@ -1,29 +1,49 @@
 """Модуль содержит вьюсеты и вью-классы."""
+from django.conf import settings
 from django.core.mail import EmailMessage
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from reviews import events, leaderboards, moderation, read_model, similarity
+from reviews.models import (Category, Comment, DeletionJob, Event, Genre,
+                            Review, Title, User)
 
-from reviews.models import Category, Genre, Review, Title, User
+from . import batch
 from .filters import TitleFilter
-from .mixins import (CreateByAdminOrReadOnlyModelMixin,
-                     CreateOrChangeByAdminOrReadOnlyModelMixin, PostByAny)
+from .mixins import (BackgroundDeletionMixin,
+                     CreateByAdminOrReadOnlyModelMixin,
+                     CreateOrChangeByAdminOrReadOnlyModelMixin, PostByAny,
+                     ProfilingMixin, ResponseCacheMixin)
+from .pagination import (CachedCountPagination, KeysetPagination,
+                         SearchPagination, SequencePagination)
 from .permissions import (AdminOnly, AdminOrReadonly,
                           AuthorModeratorAdminOrReadonly)
-from .serializers import (CategorySerializer, CommentSerializer,
-                          ConfirmationSerializer, GenreSerializer,
-                          ReadTitleSerializer, ReviewSerializer,
-                          TitleSerializer, UserCreateSerializer,
-                          UserSerializer)
+from .serializers import (BatchSerializer, CategorySerializer,
+                          CommentSerializer, ConfirmationSerializer,
+                          DeletionJobSerializer, EventSerializer,
+                          GenreSerializer, LeaderboardTitleSerializer,
+                          ModerationSerializer, ReadTitleSerializer,
+                          ReviewSerializer, SimilarTitleSerializer,
+                          TitleSerializer, UserCommentSerializer,
+                          UserCreateSerializer, UserSerializer)
+from .throttling import IdentityRateThrottle, IPRateThrottle
 
 
-class CategoryViewSet(CreateByAdminOrReadOnlyModelMixin):
-    """Вьюсет для модели Category."""
-    queryset = Category.objects.all()
+class CategoryViewSet(BackgroundDeletionMixin,
+                      CreateByAdminOrReadOnlyModelMixin):
+    """
+    Вьюсет для модели Category.
+    Удаляемые в фоне категории не показываются.
+    """
+    queryset = Category.objects.filter(is_deleted=False)
     serializer_class = CategorySerializer
     pagination_class = LimitOffsetPagination
     search_fields = ('name',)
@@ -41,31 +61,121 @@ class GenreViewSet(CreateByAdminOrReadOnlyModelMixin):
     filter_backends = (filters.SearchFilter,)
 
 
-class TitleViewSet(CreateOrChangeByAdminOrReadOnlyModelMixin):
+class TitleViewSet(ResponseCacheMixin, BackgroundDeletionMixin,
+                   CreateOrChangeByAdminOrReadOnlyModelMixin):
     """
     Вьюсет для модели Title.
     Для метода GET применяется сериализатор ReadTitleSerializer.
     Для других методов применяется сериализатор TitleSerializer.
     Добавляется динамическое поле, содержащее агрегирующую функцию.
+    Число произведений в ответе списка может браться из кэша или из
+    статистики PostgreSQL.
+    Лидерборды top и trending читаются из заранее посчитанных рейтингов
+    и фильтруются по slug категории и жанра.
+    Похожие произведения similar читаются из таблицы, которую заполняет
+    команда build_similar_titles.
+    Удаляемые в фоне произведения не показываются.
+    Список и произведение отдаются готовыми документами из модели
+    чтения TitleDocument: запрос к Title только выбирает id.
+    Ответы списка и произведения кэшируются при RESPONSE_CACHE_TIMEOUT.
     """
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')).all()
+    queryset = Title.objects.filter(is_deleted=False).annotate(
+        rating=Avg('reviews__score', filter=Q(reviews__is_hidden=False))
+    )
     serializer_class = TitleSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
     filterset_class = TitleFilter
+    count_estimate = True
+    count_cache_timeout = settings.COUNT_CACHE_TIMEOUT
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Title.objects.filter(is_deleted=False)
+        return super().get_queryset()
+
+    def get_response_scopes(self):
+        return ['titles']
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.list_documents, request,
+                                    *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(self.retrieve_document, request,
+                                    *args, **kwargs)
+
+    def list_documents(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        title_ids = queryset.values_list('pk', flat=True)
+        page = self.paginate_queryset(title_ids)
+        if page is None:
+            return Response(read_model.documents(list(title_ids)))
+        return self.get_paginated_response(read_model.documents(page))
+
+    def retrieve_document(self, request, *args, **kwargs):
+        pk = str(kwargs[self.lookup_field])
+        document = read_model.document(int(pk)) if pk.isdigit() else None
+        if document is None:
+            raise Http404
+        return Response(document)
 
     def get_serializer_class(self):
+        if self.action in ('top', 'trending'):
+            return LeaderboardTitleSerializer
+        if self.action == 'similar':
+            return SimilarTitleSerializer
         if self.request.method in permissions.SAFE_METHODS:
             return ReadTitleSerializer
         return TitleSerializer
 
+    def get_limit(self, request, default, maximum):
+        limit = request.query_params.get('limit', default)
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+        return max(1, min(limit, maximum))
+
+    def leaderboard(self, request, board):
+        limit = self.get_limit(request, settings.LEADERBOARD_DEFAULT_LIMIT,
+                               settings.LEADERBOARD_MAX_LIMIT)
+        titles = board(category=request.query_params.get('category'),
+                       genre=request.query_params.get('genre'),
+                       limit=limit)
+        serializer = self.get_serializer(titles, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def top(self, request):
+        """Произведения с наибольшим байесовским рейтингом."""
+        return self.leaderboard(request, leaderboards.top)
+
+    @action(detail=False)
+    def trending(self, request):
+        """Произведения с наибольшим числом недавних отзывов."""
+        return self.leaderboard(request, leaderboards.trending)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Произведения, похожие по жанрам и оценкам пользователей."""
+        title = get_object_or_404(Title.objects.only('pk'), pk=pk,
+                                  is_deleted=False)
+        limit = self.get_limit(request, settings.LEADERBOARD_DEFAULT_LIMIT,
+                               settings.SIMILAR_TITLES_COUNT)
+        titles = similarity.similar_titles(title.pk, limit)
+        serializer = self.get_serializer(titles, many=True)
+        return Response(serializer.data)
+
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ProfilingMixin, BackgroundDeletionMixin,
+                  viewsets.ModelViewSet):
     """
     Вьюсет для модели User.
     Доступен только администраторам.
     Получение экземпляра модели User по полю username.
+    Удаляемые в фоне пользователи не показываются.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.filter(is_deleted=False)
     serializer_class = UserSerializer
     permission_classes = (AdminOnly, )
     pagination_class = LimitOffsetPagination
@@ -99,6 +209,43 @@ class UserViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def activity(self, queryset, serializer_class):
+        """Постраничный по курсору список отзывов или комментариев."""
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(page, many=True,
+                                      context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def reviews_of(user):
+        return (Review.objects.filter(author=user, is_hidden=False,
+                                      title__is_deleted=False)
+                .select_related('author'))
+
+    @action(detail=False, url_path='me/reviews',
+            permission_classes=[permissions.IsAuthenticated, ])
+    def my_reviews(self, request):
+        """Отзывы текущего пользователя, новые первыми."""
+        return self.activity(self.reviews_of(request.user), ReviewSerializer)
+
+    @action(detail=False, url_path='me/comments',
+            permission_classes=[permissions.IsAuthenticated, ])
+    def my_comments(self, request):
+        """Комментарии текущего пользователя, новые первыми."""
+        comments = (Comment.objects
+                    .filter(author=request.user, is_hidden=False,
+                            review__is_hidden=False,
+                            review__title__is_deleted=False)
+                    .select_related('author', 'review'))
+        return self.activity(comments, UserCommentSerializer)
+
+    @action(detail=True)
+    def reviews(self, request, username=None):
+        """Отзывы пользователя username, доступно администраторам."""
+        return self.activity(self.reviews_of(self.get_object()),
+                             ReviewSerializer)
+
 
 class NewUserAPIView(PostByAny):
     """
@@ -107,7 +254,11 @@ class NewUserAPIView(PostByAny):
     В поле confirmation_code модели user сохраняется код подтверждения.
     На электронный адрес пользователя отправляется письмо с кодом
     подтверждения.
+    Запросы ограничены по IP и по username/email.
     """
+    throttle_classes = (IPRateThrottle, IdentityRateThrottle)
+    concurrency_group = 'auth'
+
     def post(self, request, *args, **kwargs):
         serializer = UserCreateSerializer(data=request.data)
         if serializer.is_valid():
@@ -136,7 +287,11 @@ class NewUserAPIView(PostByAny):
 class ConfirmAPIView(PostByAny):
     """
     Класс представления для получения токена доступа по коду подтверждения.
+    Запросы ограничены по IP и по username.
     """
+    throttle_classes = (IPRateThrottle, IdentityRateThrottle)
+    concurrency_group = 'auth'
+
     def post(self, request, *args, **kwargs):
         serializer = ConfirmationSerializer(data=request.data)
         if serializer.is_valid():
@@ -153,19 +308,54 @@ class ConfirmAPIView(PostByAny):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    """Вьюсет для модели Review."""
+def is_duplicate_review(error):
+    """Вызвана ли ошибка IntegrityError ограничением unique_riview."""
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name == 'unique_riview'
+    message = str(error)
+    return ('reviews_review.title_id, reviews_review.author_id' in message
+            or 'unique_riview' in message)
+
+
+class ReviewViewSet(ResponseCacheMixin, ProfilingMixin,
+                    viewsets.ModelViewSet):
+    """
+    Вьюсет для модели Review.
+    Число отзывов произведения в ответе списка кэшируется.
+    Ответы чтения кэшируются при RESPONSE_CACHE_TIMEOUT.
+    """
     serializer_class = ReviewSerializer
     permission_classes = (AuthorModeratorAdminOrReadonly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
+    count_parent_lookup = 'title_id'
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'),
+                                  is_deleted=False)
+        return title.reviews.filter(is_hidden=False)
+
+    def get_response_scopes(self):
+        return [f'title:{self.kwargs["title_id"]}']
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        """
+        Создание отзыва одним INSERT без предварительной проверки:
+        повторный отзыв, в том числе при одновременных запросах,
+        отсекает ограничение unique_riview, ответ - 400.
+        Счётчики и рейтинги сигналов меняются в той же транзакции.
+        """
+        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'),
+                                  is_deleted=False)
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user, title=title)
+        except IntegrityError as error:
+            if not is_duplicate_review(error):
+                raise
+            raise ValidationError(
+                {'non_field_errors': ['Извините, возможен только один отзыв']}
+            )
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
@@ -173,25 +363,156 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
-    """Вьюсет для модели Comment."""
+class CommentViewSet(ResponseCacheMixin, ProfilingMixin,
+                     viewsets.ModelViewSet):
+    """
+    Вьюсет для модели Comment.
+    Число комментариев отзыва в ответе списка кэшируется.
+    Ответы чтения кэшируются при RESPONSE_CACHE_TIMEOUT.
+    """
     serializer_class = CommentSerializer
     permission_classes = (AuthorModeratorAdminOrReadonly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
+    count_parent_lookup = 'review_id'
 
     def get_queryset(self):
         review_id = self.kwargs.get('review_id')
         title_id = self.kwargs.get('title_id')
-        review = get_object_or_404(Review, pk=review_id, title__id=title_id)
-        return review.comments.all()
+        review = get_object_or_404(Review, pk=review_id, title__id=title_id,
+                                   is_hidden=False, title__is_deleted=False)
+        return review.comments.filter(is_hidden=False)
+
+    def get_response_scopes(self):
+        return [f'title:{self.kwargs["title_id"]}',
+                f'review:{self.kwargs["review_id"]}']
 
     def perform_create(self, serializer):
         review_id = self.kwargs.get('review_id')
         title_id = self.kwargs.get('title_id')
-        review = get_object_or_404(Review, pk=review_id, title__id=title_id)
+        review = get_object_or_404(Review, pk=review_id, title__id=title_id,
+                                   is_hidden=False, title__is_deleted=False)
         serializer.save(author=self.request.user, review=review)
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
             return (AdminOrReadonly(),)
         return super().get_permissions()
+
+
+class DeletionJobViewSet(ProfilingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Вьюсет для заданий фонового удаления.
+    Доступен только администраторам, показывает прогресс удаления.
+    """
+    queryset = DeletionJob.objects.all()
+    serializer_class = DeletionJobSerializer
+    permission_classes = (AdminOnly, )
+    pagination_class = LimitOffsetPagination
+
+
+class EventViewSet(ProfilingMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Вьюсет журнала изменений отзывов, комментариев и произведений.
+    Доступен только администраторам. События отдаются по возрастанию
+    номера после номера after, номера назначаются перед выдачей
+    (events.sequence()).
+    """
+    queryset = Event.objects.all()
+    serializer_class = EventSerializer
+    permission_classes = (AdminOnly, )
+    pagination_class = SequencePagination
+    filter_backends = ()
+
+    def list(self, request, *args, **kwargs):
+        events.sequence()
+        return super().list(request, *args, **kwargs)
+
+
+class SearchViewSet(ProfilingMixin, viewsets.GenericViewSet):
+    """
+    Полнотекстовый поиск по текстам видимых отзывов и комментариев:
+    /search/reviews/?q= и /search/comments/?q=. Результаты по убыванию
+    релевантности, страницы по курсору (SearchPagination).
+    """
+    permission_classes = (permissions.AllowAny, )
+    pagination_class = SearchPagination
+    filter_backends = ()
+
+    def results(self, queryset, serializer_class):
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(page, many=True,
+                                      context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def reviews(self, request):
+        """Поиск по отзывам."""
+        return self.results(
+            Review.objects.filter(is_hidden=False, title__is_deleted=False)
+            .select_related('author'),
+            ReviewSerializer
+        )
+
+    @action(detail=False)
+    def comments(self, request):
+        """Поиск по комментариям."""
+        return self.results(
+            Comment.objects.filter(is_hidden=False, review__is_hidden=False,
+                                   review__title__is_deleted=False)
+            .select_related('author', 'review'),
+            UserCommentSerializer
+        )
+
+
+class BatchAPIView(ProfilingMixin, APIView):
+    """
+    Пакетный запрос: несколько GET-запросов к API за один HTTP-запрос.
+    Принимает {"requests": [путь, ...]}, возвращает ответы в том же
+    порядке: путь, статус и тело. Подзапросы выполняются от имени
+    пользователя пакетного запроса без повторной проверки токена,
+    права каждого вью проверяются как обычно.
+    """
+    permission_classes = (permissions.AllowAny, )
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            batch.run(request, serializer.validated_data['requests'])
+        )
+
+
+class ModerationAPIView(ProfilingMixin, APIView):
+    """
+    Массовая модерация: удаление, скрытие и возврат скрытых отзывов
+    или комментариев по списку id, автору и интервалу времени публикации.
+    Права AuthorModeratorAdminOrReadonly проверяются один раз на весь
+    набор: автор может только удалить собственные объекты (набор автора
+    дополнительно ограничивается его объектами), скрывать и возвращать -
+    модератор и администратор. Возвращает число
+    обработанных отзывов и комментариев.
+    """
+    permission_classes = (AuthorModeratorAdminOrReadonly, )
+
+    def post(self, request, *args, **kwargs):
+        serializer = ModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        model = moderation.MODELS[data['target']]
+        queryset = moderation.select(
+            model, ids=data.get('ids'), author=data.get('author'),
+            since=data.get('since'), until=data.get('until')
+        )
+        if data['action'] != moderation.DELETE and not (
+            request.user.is_moderator or request.user.is_admin
+        ):
+            self.permission_denied(request)
+        for permission in self.get_permissions():
+            if not permission.has_bulk_permission(request, self, queryset):
+                self.permission_denied(request)
+        if not (request.user.is_moderator or request.user.is_admin):
+            # Набор перечитывается пачками: чужие объекты, добавленные
+            # после проверки, не должны в него попасть.
+            queryset = queryset.filter(author=request.user)
+        result = moderation.moderate(data['action'], model, queryset)
+        return Response({'action': data['action'], **result})
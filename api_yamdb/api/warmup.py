@@ -0,0 +1,89 @@
+"""
+Модуль содержит прогрев воркера перед приёмом запросов.
+Первый запрос холодного воркера платит за импорт вью и сериализаторов,
+сборку резолвера URL, первое соединение с базой и пустые кэши процесса.
+warm_up() делает это заранее: импортирует модули API, собирает
+резолвер, проверяет соединения с базами и прогоняет через WSGI-обработчик
+GET-запросы WARMUP_PATHS, заполняя кэши процесса (число объектов,
+поколения и ответы). Соединения с базой привязаны к потоку, поэтому
+после прогрева они закрываются: потоки воркера откроют свои.
+"""
+import importlib
+import io
+import time
+from contextlib import contextmanager
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.urls import reverse
+
+MODULES = ('api.views', 'api.serializers', 'api.filters', 'api.pagination',
+           'rest_framework_simplejwt.authentication')
+
+
+@contextmanager
+def _timed(timings, phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - start
+
+
+def _host():
+    hosts = [host for host in settings.ALLOWED_HOSTS
+             if host and host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def request(application, path):
+    """GET-запрос path к WSGI-приложению в процессе; возвращает статус."""
+    path, _, query = path.partition('?')
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query,
+               'HTTP_HOST': _host(), 'wsgi.input': io.BytesIO()}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(
+        environ, lambda status, headers, exc_info=None: statuses.append(status)
+    )
+    try:
+        for _ in response:
+            pass
+    finally:
+        close = getattr(response, 'close', None)
+        if close is not None:
+            close()
+    return int(statuses[0].split()[0])
+
+
+def load_modules():
+    """
+    Импорт модулей API и сборка резолвера URL. Без обращений к базе,
+    поэтому при preload выполняется в мастере до fork.
+    """
+    for module in MODULES:
+        importlib.import_module(module)
+    reverse('api:title-list')
+
+
+def warm_up(paths=None, application=None):
+    """
+    Прогрев процесса. Возвращает длительности фаз в секундах
+    и статусы запросов прогрева.
+    """
+    paths = settings.WARMUP_PATHS if paths is None else paths
+    timings = {}
+    with _timed(timings, 'imports'):
+        load_modules()
+        application = application or get_wsgi_application()
+    with _timed(timings, 'db'):
+        for alias in connections:
+            connections[alias].ensure_connection()
+    statuses = {}
+    with _timed(timings, 'caches'):
+        for path in paths:
+            statuses[path] = request(application, path)
+    connections.close_all()
+    return timings, statuses
@@ -0,0 +1,22 @@
+"""
+Конфигурация gunicorn для ASGI:
+gunicorn -c python:api_yamdb.gunicorn_asgi_conf api_yamdb.asgi:application
+
+Воркеры uvicorn: цикл событий процесса держит соединения, читает
+запросы и отправляет ответы, а вью и работа с базой выполняются в пулах
+потоков api.asgi_handler (ASGI_READ_THREADS и ASGI_THREADS). Медленные
+клиенты занимают только соединение, поэтому процессов нужно по одному
+на CPU, но не меньше двух. Остальное - как в gunicorn_conf: preload,
+перезапуск с разбросом, прогрев.
+"""
+import os
+
+from api_yamdb.gunicorn_conf import (accesslog, bind, cpu_count,  # noqa: F401
+                                     graceful_timeout, keepalive, max_requests,
+                                     max_requests_jitter, post_fork,
+                                     post_worker_init, preload_app, timeout,
+                                     warmup, when_ready)
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS',
+                         default='uvicorn.workers.UvicornWorker')
+workers = int(os.getenv('GUNICORN_WORKERS', default=0)) or max(2, cpu_count())
@@ -0,0 +1,118 @@
+"""
+Конфигурация gunicorn для продакшена:
+gunicorn -c python:api_yamdb.gunicorn_conf api_yamdb.wsgi:application
+
+Воркеры gthread: число процессов считается от доступных контейнеру
+CPU (квота cgroup, иначе affinity процесса), число потоков задаётся
+переменной окружения. Приложение загружается в мастере до fork
+(preload), воркеры перезапускаются после max_requests запросов
+с разбросом, чтобы не уходить на перезапуск одновременно.
+Перед приёмом запросов воркер прогревается (api.warmup) и пишет
+в лог время старта по фазам.
+"""
+import logging
+import os
+import time
+
+STARTED = time.monotonic()
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return file.read().split()
+    except OSError:
+        return None
+
+
+def cpu_count():
+    """Число CPU, доступных процессу, с учётом квоты cgroup v1 и v2."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    quota = _read('/sys/fs/cgroup/cpu.max')
+    if quota is None:
+        quota = (_read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') or [])
+        quota += (_read('/sys/fs/cgroup/cpu/cpu.cfs_period_us') or [])
+    if len(quota) == 2 and quota[0] not in ('max', '-1'):
+        count = min(count, max(1, -(-int(quota[0]) // int(quota[1]))))
+    return count
+
+
+def worker_count(cpus, threads):
+    """
+    Число процессов: 2 * CPU + 1 для однопоточных воркеров, для
+    многопоточных - столько же потоков всего, но не меньше процесса
+    на CPU и не меньше двух процессов, чтобы перезапуск одного воркера
+    не останавливал приём запросов.
+    """
+    return max(2, cpus, -(-(2 * cpus + 1) // threads))
+
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', default=4))
+workers = int(os.getenv('GUNICORN_WORKERS', default=0)) or worker_count(
+    cpu_count(), threads
+)
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=2000))
+max_requests_jitter = int(
+    os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default=max_requests // 10)
+)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+accesslog = os.getenv('GUNICORN_ACCESSLOG', default=None)
+warmup = os.getenv('GUNICORN_WARMUP', default='True') == 'True'
+
+
+def when_ready(server):
+    """
+    При preload модули API импортируются в мастере: воркеры получают
+    их после fork готовыми и без копирования памяти.
+    """
+    if preload_app:
+        from api.warmup import load_modules
+        load_modules()
+    logger.info('Мастер готов за %.0f мс: %s воркеров %s.',
+                (time.monotonic() - STARTED) * 1000, server.num_workers,
+                server.cfg.worker_class_str)
+
+
+def post_fork(server, worker):
+    """Соединения с базой, открытые мастером до fork, воркеру не нужны."""
+    worker.forked = time.monotonic()
+    if preload_app:
+        from django.db import connections
+        for connection in connections.all():
+            connection.close()
+
+
+def post_worker_init(worker):
+    """
+    Прогрев воркера перед приёмом запросов и замер его старта.
+    ASGI-приложение прогревается через WSGI-приложение, которое оно
+    оборачивает.
+    """
+    timings = {}
+    if warmup:
+        from api.warmup import warm_up
+        application = getattr(worker.wsgi, 'wsgi_application', worker.wsgi)
+        try:
+            timings, statuses = warm_up(application=application)
+        except Exception:
+            logger.exception('Ошибка прогрева воркера %s', worker.pid)
+        else:
+            failed = {path: status for path, status in statuses.items()
+                      if status >= 400}
+            if failed:
+                logger.warning('Прогрев воркера %s: %s', worker.pid, failed)
+    phases = ', '.join(f'{phase} {duration * 1000:.0f} мс'
+                       for phase, duration in timings.items())
+    logger.info('Воркер %s готов за %.0f мс после fork%s', worker.pid,
+                (time.monotonic() - worker.forked) * 1000,
+                f' ({phases})' if phases else '')
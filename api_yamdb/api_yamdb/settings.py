@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -23,6 +24,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.QueryDetectorMiddleware',
+    'api.middleware.ConcurrencyLimitMiddleware',
+    'api.middleware.InvalidationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -117,8 +123,186 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('AUTH_THROTTLE_IP_RATE', default='20/min'),
+        'auth_identity': os.getenv('AUTH_THROTTLE_IDENTITY_RATE',
+                                   default='5/min'),
+    },
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=10),
 }
+
+# Профилирование запросов: заголовок Server-Timing на каждый ответ
+# и/или доля запросов, для которых медленные пишутся в лог вместе с SQL.
+PROFILING_SERVER_TIMING = os.getenv('PROFILING_SERVER_TIMING') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+PROFILING_SLOW_REQUEST_MS = int(
+    os.getenv('PROFILING_SLOW_REQUEST_MS', default=500)
+)
+PROFILING_LOGGED_QUERIES = 10
+
+# Метрики в формате Prometheus на /metrics, общий каталог для всех воркеров.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='True') == 'True'
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'yamdb_metrics')
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', default=1))
+# Доступ к /metrics: с адресов из METRICS_ALLOWED_NETWORKS или с заголовком
+# Authorization: Bearer METRICS_TOKEN (пустой токен не принимается).
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+METRICS_ALLOWED_NETWORKS = [
+    network for network in os.getenv(
+        'METRICS_ALLOWED_NETWORKS', default='127.0.0.0/8,::1/128'
+    ).split(',') if network
+]
+
+# Поиск N+1 и повторяющихся SQL-запросов (для тестовых стендов):
+# форма запроса, выполненная больше порога раз, попадает в лог.
+QUERY_DETECTOR_ENABLED = os.getenv('QUERY_DETECTOR_ENABLED') == 'True'
+QUERY_DETECTOR_THRESHOLD = int(
+    os.getenv('QUERY_DETECTOR_THRESHOLD', default=3)
+)
+
+# Троттлинг signup/token: 'local' - вёдра в памяти воркера,
+# 'cache' - в общем кэше CACHES['default'] для всех воркеров.
+THROTTLE_BACKEND = os.getenv('THROTTLE_BACKEND', default='local')
+
+# Бюджет одновременно обрабатываемых запросов на процесс по группам
+# вью-классов (атрибут concurrency_group), сверх бюджета - ответ 503.
+CONCURRENCY_LIMITS = {
+    'auth': int(os.getenv('AUTH_CONCURRENCY_LIMIT', default=4)),
+}
+CONCURRENCY_RETRY_AFTER = 1
+
+# Кэширование count в ответах списков: число объектов у родителя
+# (отзывы произведения, комментарии отзыва) и COUNT(*) с фильтрами.
+COUNT_CACHE_PARENT_TIMEOUT = int(
+    os.getenv('COUNT_CACHE_PARENT_TIMEOUT', default=300)
+)
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', default=30))
+
+# Лидерборды произведений: априорная средняя оценка и её вес в отзывах
+# для байесовского рейтинга, период полураспада популярности в часах,
+# число произведений в ответе по умолчанию и максимальное.
+LEADERBOARD_PRIOR_MEAN = float(
+    os.getenv('LEADERBOARD_PRIOR_MEAN', default=5.5)
+)
+LEADERBOARD_PRIOR_WEIGHT = int(
+    os.getenv('LEADERBOARD_PRIOR_WEIGHT', default=10)
+)
+LEADERBOARD_TREND_HALF_LIFE = float(
+    os.getenv('LEADERBOARD_TREND_HALF_LIFE', default=72)
+)
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+# Похожие произведения: число хранимых соседей, веса сходства по жанрам
+# и по оценкам пользователей, размер блока произведений при расчёте.
+SIMILAR_TITLES_COUNT = int(os.getenv('SIMILAR_TITLES_COUNT', default=20))
+SIMILAR_GENRE_WEIGHT = float(os.getenv('SIMILAR_GENRE_WEIGHT', default=0.3))
+SIMILAR_RATING_WEIGHT = float(
+    os.getenv('SIMILAR_RATING_WEIGHT', default=0.7)
+)
+SIMILAR_CHUNK_SIZE = int(os.getenv('SIMILAR_CHUNK_SIZE', default=1000))
+
+# Фоновое удаление категорий, произведений и пользователей: объект
+# скрывается сразу, зависимые объекты удаляет воркер process_deletions
+# пачками по DELETION_BATCH_SIZE строк. Задание без прогресса дольше
+# DELETION_STALE_TIMEOUT секунд считается брошенным и берётся заново.
+BACKGROUND_DELETION = os.getenv('BACKGROUND_DELETION') == 'True'
+DELETION_BATCH_SIZE = int(os.getenv('DELETION_BATCH_SIZE', default=1000))
+DELETION_POLL_INTERVAL = int(os.getenv('DELETION_POLL_INTERVAL', default=5))
+DELETION_STALE_TIMEOUT = int(
+    os.getenv('DELETION_STALE_TIMEOUT', default=600)
+)
+
+# Секционирование таблиц отзывов и комментариев по pub_date (только
+# PostgreSQL): включается при миграции, секции создаются командой
+# manage_partitions на PARTITION_MONTHS_AHEAD месяцев вперёд.
+REVIEWS_PARTITIONING = os.getenv('REVIEWS_PARTITIONING') == 'True'
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', default=3))
+
+# Потоковая загрузка фикстур командой load_fixtures: строки каждой
+# модели вставляются пачками по FIXTURE_BATCH_SIZE.
+FIXTURE_BATCH_SIZE = int(os.getenv('FIXTURE_BATCH_SIZE', default=1000))
+
+# Модель чтения произведений: документы пересобираются пачками
+# по TITLE_DOCUMENT_CHUNK_SIZE произведений.
+TITLE_DOCUMENT_CHUNK_SIZE = int(
+    os.getenv('TITLE_DOCUMENT_CHUNK_SIZE', default=500)
+)
+
+# Пакетные запросы /api/v1/batch/: не больше BATCH_MAX_REQUESTS
+# подзапросов, при BATCH_WORKERS > 0 они выполняются в пуле потоков
+# такого размера (у каждого потока своё соединение с базой).
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', default=10))
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', default=0))
+
+# Кэш ответов чтения произведений, отзывов и комментариев: ответ свежий
+# RESPONSE_CACHE_TIMEOUT секунд (0 - кэш выключен), ещё
+# RESPONSE_CACHE_STALE секунд отдаётся устаревший, пока один запрос
+# его пересобирает. Одинаковые промахи ждут одно вычисление не дольше
+# RESPONSE_CACHE_LOCK_TIMEOUT секунд.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=0))
+RESPONSE_CACHE_STALE = int(os.getenv('RESPONSE_CACHE_STALE', default=30))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_LOCK_TIMEOUT', default=5)
+)
+RESPONSE_CACHE_POLL_INTERVAL = 0.05
+
+# Шина инвалидации кэшей процессов: '' - выключена (кэш общий или
+# воркер один), 'postgres' - LISTEN/NOTIFY, 'sqlite' - опрос файла
+# INVALIDATION_SQLITE_PATH. Кэш воркера, не получавшего сообщений
+# дольше INVALIDATION_MAX_STALENESS секунд, очищается целиком.
+INVALIDATION_BUS = os.getenv('INVALIDATION_BUS', default='')
+INVALIDATION_SQLITE_PATH = os.getenv(
+    'INVALIDATION_SQLITE_PATH',
+    default=os.path.join(tempfile.gettempdir(), 'yamdb_invalidation.sqlite3')
+)
+INVALIDATION_POLL_INTERVAL = float(
+    os.getenv('INVALIDATION_POLL_INTERVAL', default=0.5)
+)
+INVALIDATION_MAX_STALENESS = float(
+    os.getenv('INVALIDATION_MAX_STALENESS', default=5)
+)
+
+# Прогрев воркера gunicorn перед приёмом запросов (api.warmup):
+# GET-запросы, которые заполняют кэши процесса.
+WARMUP_PATHS = [
+    path for path in os.getenv(
+        'WARMUP_PATHS',
+        default='/api/v1/titles/,/api/v1/categories/,/api/v1/genres/'
+    ).split(',') if path
+]
+
+# ASGI (api_yamdb.asgi): запросы обрабатываются в пулах потоков,
+# чтение произведений, отзывов и комментариев - в пуле ASGI_READ_THREADS,
+# остальное - в пуле ASGI_THREADS. Запросы сверх ASGI_MAX_PENDING
+# ожидающих в очереди пула сразу получают 503.
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', default=8))
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=4))
+ASGI_MAX_PENDING = int(os.getenv('ASGI_MAX_PENDING', default=100))
+
+# Массовая модерация /api/v1/moderation/: отзывы и комментарии удаляются
+# и скрываются пачками по MODERATION_BATCH_SIZE строк, список id
+# в запросе - не длиннее MODERATION_MAX_IDS.
+MODERATION_BATCH_SIZE = int(os.getenv('MODERATION_BATCH_SIZE', default=1000))
+MODERATION_MAX_IDS = int(os.getenv('MODERATION_MAX_IDS', default=10000))
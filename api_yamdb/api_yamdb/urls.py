@@ -1,3 +1,4 @@
+from api.metrics import metrics_view
 from django.contrib import admin
 from django.views.generic import TemplateView
 from django.urls import include, path
@@ -9,5 +10,6 @@ urlpatterns = [
         TemplateView.as_view(template_name='redoc.html'),
         name='redoc'
     ),
-    path('api/', include('api.urls', namespace='api'))
+    path('api/', include('api.urls', namespace='api')),
+    path('metrics', metrics_view, name='metrics'),
 ]
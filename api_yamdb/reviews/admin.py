@@ -1,7 +1,43 @@
 """Модуль содержит настройки web-интерфейса администратора."""
 from django.contrib import admin
+from django.db.models import Q
 
-from .models import Category, Comment, Genre, GenreTitle, Review, Title, User
+from . import deletion, search
+from .models import (Category, Comment, DeletionJob, Event, Genre, GenreTitle,
+                     Review, Title, User)
+from .paginators import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовые настройки для таблиц с десятками миллионов строк:
+    оценочный COUNT(*) без фильтров, без повторного COUNT(*) при поиске,
+    поиск только точным совпадением по индексированным полям.
+    В indexed_search_fields поля с суффиксом __id ищутся по числу.
+    При full_text_search поиск также идёт по тексту через reviews.search.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    indexed_search_fields = ()
+    full_text_search = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q()
+        for field in self.indexed_search_fields:
+            if field == 'id' or field.endswith('__id'):
+                if search_term.isdigit():
+                    condition |= Q(**{field: int(search_term)})
+            else:
+                condition |= Q(**{field: search_term})
+        if self.full_text_search:
+            condition |= Q(pk__in=search.matching(queryset.model,
+                                                  search_term))
+        if not condition:
+            return queryset.none(), False
+        return queryset.filter(condition), False
 
 
 @admin.register(Category)
@@ -19,40 +55,62 @@ class GenreAdmin(admin.ModelAdmin):
 @admin.register(Title)
 class TitleAdmin(admin.ModelAdmin):
     list_display = ('name', 'year', 'category')
+    list_select_related = ('category',)
     search_fields = ('name', 'category__name', 'description')
     list_filter = ('year', 'category')
+    autocomplete_fields = ('category',)
 
 
 @admin.register(GenreTitle)
 class GenreTitleAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('title', 'genre')
+    list_select_related = ('title', 'genre')
+    raw_id_fields = ('title',)
+    autocomplete_fields = ('genre',)
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     list_display = (
         'id',
         'title',
         'text',
         'author',
         'score',
-        'pub_date'
+        'pub_date',
+        'is_hidden'
     )
+    list_select_related = ('title', 'author')
+    readonly_fields = ('is_hidden',)
     list_editable = ('text',)
-    search_fields = ('title', 'text',)
+    indexed_search_fields = ('id', 'title__id', 'title__name',
+                             'author__username')
+    search_fields = indexed_search_fields
+    full_text_search = True
+    ordering = ('-pub_date', '-id')
+    raw_id_fields = ('title',)
+    autocomplete_fields = ('author',)
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'id',
         'review',
         'text',
         'author',
-        'pub_date'
+        'pub_date',
+        'is_hidden'
     )
+    list_select_related = ('review__author', 'review__title', 'author')
+    readonly_fields = ('is_hidden',)
     list_editable = ('text',)
-    search_fields = ('review', 'text',)
+    indexed_search_fields = ('id', 'review__id', 'author__username')
+    search_fields = indexed_search_fields
+    full_text_search = True
+    ordering = ('-pub_date', '-id')
+    raw_id_fields = ('review',)
+    autocomplete_fields = ('author',)
 
 
 @admin.register(User)
@@ -60,3 +118,31 @@ class UserAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'role', )
     list_editable = ('role', )
     search_fields = ('username', 'role', )
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'target', 'object_id', 'status', 'deleted_titles',
+                    'deleted_reviews', 'deleted_comments', 'updated')
+    list_filter = ('status', 'target')
+    readonly_fields = ('status', 'error')
+    actions = ('retry_failed',)
+
+    def retry_failed(self, request, queryset):
+        """Статус меняет только воркер, вручную - лишь повтор ошибок."""
+        retried = deletion.retry_failed(queryset)
+        self.message_user(request, f'Заданий возвращено в очередь: {retried}')
+    retry_failed.short_description = 'Повторить задания с ошибкой'
+
+
+@admin.register(Event)
+class EventAdmin(LargeTableAdmin):
+    list_display = ('id', 'created', 'model', 'object_id', 'action')
+    indexed_search_fields = ('id',)
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,87 @@
+"""
+Модуль содержит денормализованные счётчики: число отзывов произведения
+(Title.reviews_count) и число комментариев отзыва
+(Review.comments_count) без скрытых модератором объектов. Счётчики
+меняются одним UPDATE с F-выражением, поэтому параллельные записи
+не теряют изменений. Уменьшение
+ограничено нулём, чтобы разошедшийся счётчик не ломал удаление,
+расхождения исправляет repair().
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Review, Title
+
+COUNTERS = {
+    Review: (Title, 'title_id', 'reviews_count'),
+    Comment: (Review, 'review_id', 'comments_count'),
+}
+
+
+def _shifted(field, delta):
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def change(model, parent_id, delta):
+    """Изменение счётчика родителя объекта model на delta."""
+    parent, _, field = COUNTERS[model]
+    parent.objects.filter(pk=parent_id).update(
+        **{field: _shifted(field, delta)}
+    )
+
+
+def _changed(model, parent_ids, sign):
+    parent, _, field = COUNTERS[model]
+    by_amount = defaultdict(list)
+    for parent_id, amount in Counter(parent_ids).items():
+        by_amount[amount].append(parent_id)
+    for amount, ids in by_amount.items():
+        parent.objects.filter(pk__in=ids).update(
+            **{field: _shifted(field, sign * amount)}
+        )
+
+
+def removed(model, parent_ids):
+    """
+    Уменьшение счётчиков после удаления или скрытия объектов model
+    в обход ORM. parent_ids - id родителя каждого объекта. Родители
+    с одинаковым числом объектов обновляются одним UPDATE.
+    """
+    _changed(model, parent_ids, -1)
+
+
+def added(model, parent_ids):
+    """Увеличение счётчиков после возврата скрытых объектов model."""
+    _changed(model, parent_ids, 1)
+
+
+def _actual(model):
+    _, parent_field, _ = COUNTERS[model]
+    counts = (model.objects.filter(**{parent_field: OuterRef('pk')},
+                                   is_hidden=False)
+              .order_by().values(parent_field)
+              .annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def repair():
+    """
+    Пересчёт счётчиков, расходящихся с реальным числом объектов.
+    Возвращает словарь {имя счётчика: число исправленных строк}.
+    """
+    fixed = {}
+    for model, (parent, _, field) in COUNTERS.items():
+        wrong = list(
+            parent.objects.annotate(actual=_actual(model))
+            .filter(~Q(**{field: F('actual')})).values_list('pk', flat=True)
+        )
+        for start in range(0, len(wrong), 1000):
+            parent.objects.filter(pk__in=wrong[start:start + 1000]).update(
+                **{field: _actual(model)}
+            )
+        fixed[f'{parent._meta.label_lower}.{field}'] = len(wrong)
+    return fixed
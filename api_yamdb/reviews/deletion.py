@@ -0,0 +1,221 @@
+"""
+Модуль содержит фоновое удаление категорий, произведений и пользователей.
+schedule() в одной транзакции помечает корневой объект удаляемым
+(is_deleted), после чего API его не показывает, и создаёт DeletionJob.
+Воркер (команда process_deletions) удаляет зависимые отзывы
+и комментарии пачками по batch_size прямыми DELETE без Collector
+и сигналов, а рейтинги, счётчики, кэши, журнал событий и документы
+произведений обновляет сам в той же транзакции, что и удаление пачки.
+Корневой объект удаляется ORM последним, когда крупных зависимостей
+у него уже не осталось. Пачки идемпотентны, поэтому задание воркера,
+который упал посреди работы, другой воркер подхватывает с места
+остановки, когда прогресс не обновлялся DELETION_STALE_TIMEOUT секунд.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import counters, events, invalidation, leaderboards, read_model
+from .models import (Category, Comment, DeletionJob, Review, Title,
+                     TitleStats, User)
+from .signals import bump_response_generations, count_cache_key
+
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    DeletionJob.CATEGORY: Category,
+    DeletionJob.TITLE: Title,
+    DeletionJob.USER: User,
+}
+TARGETS = {model: target for target, model in MODELS.items()}
+
+
+def schedule(instance):
+    """Пометка объекта удаляемым и создание задания на удаление."""
+    model = type(instance)
+    with transaction.atomic():
+        if model is User:
+            User.objects.filter(pk=instance.pk).update(is_deleted=True,
+                                                       is_active=False)
+        elif model is Category:
+            Category.objects.filter(pk=instance.pk).update(is_deleted=True)
+            Title.objects.filter(category_id=instance.pk).update(
+                is_deleted=True
+            )
+            TitleStats.objects.filter(category_id=instance.pk).delete()
+            bump_response_generations('all')
+        else:
+            Title.objects.filter(pk=instance.pk).update(is_deleted=True)
+            TitleStats.objects.filter(title_id=instance.pk).delete()
+            bump_response_generations('titles', f'title:{instance.pk}')
+        return DeletionJob.objects.create(target=TARGETS[model],
+                                          object_id=instance.pk)
+
+
+def _progress(job, **counters):
+    DeletionJob.objects.filter(pk=job.pk).update(
+        updated=timezone.now(),
+        **{name: F(name) + value for name, value in counters.items()}
+    )
+
+
+def batches(queryset, fields, batch_size):
+    """Пачки значений fields из queryset, пока queryset не опустеет."""
+    queryset = queryset.order_by('pk')
+    while True:
+        batch = list(queryset.values_list(*fields)[:batch_size])
+        if not batch:
+            return
+        yield batch
+
+
+def _delete_comments(job, comments, batch_size):
+    fields = ('pk', 'review_id', 'is_hidden')
+    for batch in batches(comments, fields, batch_size):
+        with transaction.atomic():
+            Comment.objects.filter(
+                pk__in=[pk for pk, _, _ in batch]
+            )._raw_delete(Comment.objects.db)
+            counters.removed(Comment, [review for _, review, hidden in batch
+                                       if not hidden])
+            events.record_deleted(Comment, [pk for pk, _, _ in batch])
+            _progress(job, deleted_comments=len(batch))
+        review_ids = {review for _, review, _ in batch}
+        invalidation.invalidate(delete=[count_cache_key(Comment, review_id)
+                                        for review_id in review_ids])
+        bump_response_generations(*(f'review:{review_id}'
+                                    for review_id in review_ids))
+
+
+def _delete_title(job, title_id, batch_size):
+    _delete_comments(job, Comment.objects.filter(review__title_id=title_id),
+                     batch_size)
+    reviews = Review.objects.filter(title_id=title_id)
+    for batch in batches(reviews, ('pk',), batch_size):
+        with transaction.atomic():
+            Review.objects.filter(
+                pk__in=[pk for pk, in batch]
+            )._raw_delete(Review.objects.db)
+            events.record_deleted(Review, [pk for pk, in batch])
+            _progress(job, deleted_reviews=len(batch))
+    with transaction.atomic():
+        Title.objects.filter(pk=title_id).delete()
+        _progress(job, deleted_titles=1)
+    invalidation.invalidate(delete=[count_cache_key(Review, title_id)])
+    bump_response_generations('titles', f'title:{title_id}')
+
+
+def _delete_user(job, user_id, batch_size):
+    _delete_comments(job, Comment.objects.filter(author_id=user_id),
+                     batch_size)
+    reviews = Review.objects.filter(author_id=user_id)
+    for batch in batches(reviews, ('pk', 'title_id', 'is_hidden'),
+                         batch_size):
+        review_ids = [pk for pk, _, _ in batch]
+        title_ids = sorted({title_id for _, title_id, _ in batch})
+        _delete_comments(job, Comment.objects.filter(review_id__in=review_ids),
+                         batch_size)
+        with transaction.atomic():
+            Review.objects.filter(
+                pk__in=review_ids
+            )._raw_delete(Review.objects.db)
+            counters.removed(Review, [title_id for _, title_id, hidden
+                                      in batch if not hidden])
+            events.record_deleted(Review, review_ids)
+            for title_id in title_ids:
+                leaderboards.refresh_title(title_id)
+            read_model.refresh(title_ids)
+            _progress(job, deleted_reviews=len(batch))
+        invalidation.invalidate(delete=[count_cache_key(Review, title_id)
+                                        for title_id in title_ids])
+        bump_response_generations(
+            'titles', *(f'title:{title_id}' for title_id in title_ids),
+            *(f'review:{review_id}' for review_id in review_ids)
+        )
+
+
+def process(job, batch_size=None):
+    """
+    Выполнение задания: удаление зависимых объектов пачками
+    и удаление корневого объекта.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    if job.target == DeletionJob.CATEGORY:
+        titles = Title.objects.filter(category_id=job.object_id)
+        for batch in batches(titles, ('pk',), 1):
+            _delete_title(job, batch[0][0], batch_size)
+            logger.info('Удаление %s: %s', job, _counters(job))
+        Category.objects.filter(pk=job.object_id).delete()
+    elif job.target == DeletionJob.TITLE:
+        _delete_title(job, job.object_id, batch_size)
+    else:
+        _delete_user(job, job.object_id, batch_size)
+        User.objects.filter(pk=job.object_id).delete()
+
+
+def _counters(job):
+    job.refresh_from_db()
+    return (f'произведений {job.deleted_titles}, '
+            f'отзывов {job.deleted_reviews}, '
+            f'комментариев {job.deleted_comments}')
+
+
+def claim():
+    """
+    Следующее ожидающее или брошенное задание (running без прогресса
+    дольше DELETION_STALE_TIMEOUT), переведённое в статус running.
+    Задание берёт только один воркер: перевод статуса условный.
+    """
+    stale = timezone.now() - timedelta(
+        seconds=settings.DELETION_STALE_TIMEOUT
+    )
+    waiting = (Q(status=DeletionJob.PENDING)
+               | Q(status=DeletionJob.RUNNING, updated__lt=stale))
+    for job in DeletionJob.objects.filter(waiting).order_by('pk'):
+        claimed = DeletionJob.objects.filter(waiting, pk=job.pk).update(
+            status=DeletionJob.RUNNING, updated=timezone.now()
+        )
+        if claimed:
+            if job.status == DeletionJob.RUNNING:
+                logger.warning('Удаление %s возобновлено после остановки '
+                               'воркера', job)
+            job.status = DeletionJob.RUNNING
+            return job
+    return None
+
+
+def retry_failed(queryset):
+    """
+    Возврат заданий queryset со статусом failed в очередь.
+    Задания в других статусах не меняются. Возвращает число заданий.
+    """
+    return queryset.filter(status=DeletionJob.FAILED).update(
+        status=DeletionJob.PENDING, error='', updated=timezone.now()
+    )
+
+
+def run_pending(batch_size=None):
+    """Выполнение всех ожидающих заданий. Возвращает их число."""
+    processed = 0
+    job = claim()
+    while job is not None:
+        try:
+            process(job, batch_size)
+        except Exception as error:
+            logger.exception('Удаление %s прервано', job)
+            DeletionJob.objects.filter(pk=job.pk).update(
+                status=DeletionJob.FAILED, error=repr(error),
+                updated=timezone.now()
+            )
+        else:
+            DeletionJob.objects.filter(pk=job.pk).update(
+                status=DeletionJob.DONE, updated=timezone.now()
+            )
+            logger.info('Удаление %s завершено: %s', job, _counters(job))
+        processed += 1
+        job = claim()
+    return processed
@@ -0,0 +1,102 @@
+"""
+Модуль содержит журнал изменений отзывов, комментариев и произведений.
+Событие пишется обработчиком сигнала в транзакции изменения (модели
+сохраняются в транзакции, см. TransactionalSaveModel), поэтому
+откаченное изменение не попадает в журнал, а зафиксированное - всегда.
+Запись события ничего не блокирует, поэтому транзакции фиксируются
+не в порядке id событий. Потребителям события отдаются по номеру
+position, который назначает sequence() при чтении журнала: номера
+получают только уже зафиксированные события, по одному вызову
+sequence() за раз, поэтому номера растут и не выдаются задним числом.
+Изменения в обход ORM (UPDATE счётчиков, загрузка фикстур) в журнал
+не попадают, фоновое удаление и массовая модерация пишут события сами.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.db.models import F, Max, Subquery
+
+from .models import Comment, Event, Review, Title
+
+MODELS = {
+    Review: Event.REVIEW,
+    Comment: Event.COMMENT,
+    Title: Event.TITLE,
+}
+SEQUENCE_LOCK_ID = 4242
+
+
+def snapshot(instance):
+    """Значения полей объекта в JSON."""
+    return json.dumps(
+        {field.attname: field.value_from_object(instance)
+         for field in instance._meta.concrete_fields},
+        cls=DjangoJSONEncoder, ensure_ascii=False
+    )
+
+
+def record(instance, action):
+    """Запись события action для объекта instance."""
+    using = router.db_for_write(Event)
+    Event.objects.using(using).create(
+        model=MODELS[type(instance)], object_id=instance.pk,
+        action=action, data=snapshot(instance)
+    )
+
+
+def record_many(model, object_ids, action, **fields):
+    """
+    Запись событий action объектов model, изменённых в обход ORM.
+    Данные события - id объекта и изменённые поля fields.
+    """
+    if not object_ids:
+        return
+    using = router.db_for_write(Event)
+    Event.objects.using(using).bulk_create(
+        Event(model=MODELS[model], object_id=object_id, action=action,
+              data=json.dumps({'id': object_id, **fields}))
+        for object_id in object_ids
+    )
+
+
+def record_deleted(model, object_ids):
+    """Запись событий удаления объектов model в обход ORM."""
+    record_many(model, object_ids, Event.DELETE)
+
+
+def sequence(using=None):
+    """
+    Назначение номеров зафиксированным событиям без номера в порядке id.
+    События ещё открытых транзакций не видны и получат номера позже,
+    больше уже выданных. Вызовы sequence() на PostgreSQL сериализуются
+    advisory-блокировкой, которую берут только читатели журнала.
+    """
+    using = using or router.db_for_write(Event)
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                               [SEQUENCE_LOCK_ID])
+        events = Event.objects.using(using)
+        pending = events.filter(position__isnull=True)
+        last = events.aggregate(last=Max('position'))['last'] or 0
+        # Наименьший id считается в том же запросе, что и UPDATE:
+        # событие, зафиксированное между запросами, не получит номер
+        # меньше выданных.
+        first = pending.order_by('id').values('id')[:1]
+        pending.update(position=F('id') - Subquery(first) + last + 1)
+
+
+def as_dict(event):
+    """Событие в виде словаря для выгрузки."""
+    return {
+        'id': event.id,
+        'position': event.position,
+        'created': event.created.isoformat(),
+        'model': event.model,
+        'object_id': event.object_id,
+        'action': event.action,
+        'data': json.loads(event.data) if event.data else None,
+    }
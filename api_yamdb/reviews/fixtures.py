@@ -0,0 +1,259 @@
+"""
+Модуль содержит потоковую загрузку фикстур формата dumpdata (JSON).
+Файл читается кусками по CHUNK_SIZE символов и разбирается по одному
+объекту, поэтому в памяти одновременно находятся только текущий кусок
+и буферы моделей. Объекты копятся по моделям и вставляются пачками
+по batch_size строк без сигналов и save(); значения полей берутся
+из фикстуры как есть (как loaddata, auto_now_add не срабатывает).
+Как и loaddata, объекты с уже занятым pk обновляются, а связи
+многие-ко-многим объекта заменяются связями из фикстуры.
+Полный буфер вставляется сразу, остатки - в порядке зависимостей
+моделей. Внешние ключи проверяются в конце транзакции, как в loaddata,
+после чего сбрасываются последовательности первичных ключей и
+пересчитываются счётчики, рейтинги и документы произведений, которые
+обычно ведут сигналы.
+"""
+import json
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connections, models, router, transaction
+
+from . import counters, leaderboards, read_model
+from .models import Category, Comment, Genre, GenreTitle, Review, Title
+from .signals import bump_response_generations
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def _start(stream, chunk_size):
+    """Текст после открывающей скобки массива и признак конца потока."""
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer = (buffer + chunk).lstrip()
+        if buffer or not chunk:
+            break
+    if not buffer.startswith('['):
+        raise ValueError('Фикстура должна быть массивом JSON')
+    return buffer[1:], not chunk
+
+
+def _decode(decoder, buffer, position, eof):
+    """
+    Объект JSON с позиции position и позиция за ним.
+    Если объект прочитан не полностью, возвращает None.
+    """
+    try:
+        item, end = decoder.raw_decode(buffer, position)
+    except json.JSONDecodeError:
+        if eof:
+            raise
+        return None, position
+    if not isinstance(item, dict):
+        raise ValueError('Элемент фикстуры должен быть объектом')
+    return item, end
+
+
+def iter_objects(stream, chunk_size=CHUNK_SIZE):
+    """
+    Объекты массива JSON из текстового потока stream по одному.
+    Элементы массива должны быть объектами JSON.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof = _start(stream, chunk_size)
+    position = 0
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            item, position = _decode(decoder, buffer, position, eof)
+            if item is not None:
+                yield item
+                continue
+        if eof:
+            raise ValueError('Неожиданный конец фикстуры')
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def dependency_order(model_list):
+    """Модели model_list так, что модели с внешними ключами идут после."""
+    pending = list(model_list)
+    ordered = []
+    while pending:
+        ready = [
+            model for model in pending
+            if not any(field.related_model in pending
+                       and field.related_model is not model
+                       for field in model._meta.concrete_fields
+                       if field.is_relation)
+        ] or pending[:1]
+        ordered.extend(ready)
+        pending = [model for model in pending if model not in ready]
+    return ordered
+
+
+def _through_rows(deserialized):
+    """
+    Связи многие-ко-многим объекта: пары (промежуточная модель,
+    поле объекта в ней) и строки промежуточных таблиц.
+    """
+    instance = deserialized.object
+    relations, rows = [], []
+    for name, values in (deserialized.m2m_data or {}).items():
+        if instance.pk is None:
+            if not values:
+                continue
+            raise ValueError(
+                f'{instance._meta.label}: для связей {name} нужен pk'
+            )
+        field = instance._meta.get_field(name)
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(
+            field.m2m_reverse_field_name()
+        ).attname
+        relations.append((through, source))
+        rows.extend(through(**{source: instance.pk, target: value})
+                    for value in values)
+    return relations, rows
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _update_existing(model, objects, using):
+    """
+    Обновление строк, pk которых уже заняты, значениями объектов.
+    Возвращает объекты, которых в базе ещё нет.
+    """
+    connection = connections[using]
+    manager = model._base_manager.db_manager(using)
+    size = connection.ops.bulk_batch_size(['pk'], objects) or 1
+    existing = set()
+    for chunk in _chunks([obj.pk for obj in objects], size):
+        existing.update(manager.filter(pk__in=chunk)
+                        .values_list('pk', flat=True))
+    fields = [field.name for field in model._meta.concrete_fields
+              if not field.primary_key]
+    if existing and fields:
+        manager.bulk_update([obj for obj in objects if obj.pk in existing],
+                            fields)
+    return [obj for obj in objects if obj.pk not in existing]
+
+
+def _insert(model, objects, using, ignore_conflicts):
+    """Вставка объектов пачками с допустимым для базы числом параметров."""
+    connection = connections[using]
+    manager = model._base_manager.db_manager(using)
+    fields = model._meta.concrete_fields
+    with_pk = [obj for obj in objects if obj.pk is not None]
+    if with_pk and not ignore_conflicts:
+        with_pk = _update_existing(model, with_pk, using)
+    groups = (
+        (with_pk, fields),
+        ([obj for obj in objects if obj.pk is None],
+         [field for field in fields
+          if not isinstance(field, models.AutoField)]),
+    )
+    for group, group_fields in groups:
+        size = connection.ops.bulk_batch_size(group_fields, group) or 1
+        for start in range(0, len(group), size):
+            manager._insert(group[start:start + size], fields=group_fields,
+                            raw=True, ignore_conflicts=ignore_conflicts)
+
+
+def _refresh_denormalized(loaded_models):
+    """
+    Пересчёт счётчиков, рейтингов и документов произведений,
+    которые обычно ведут сигналы, и сброс закэшированных ответов.
+    """
+    if loaded_models & {Title, Review, Comment}:
+        counters.repair()
+    if Review in loaded_models:
+        leaderboards.rebuild()
+    if loaded_models & {Title, Review, Category, Genre, GenreTitle}:
+        read_model.rebuild()
+    bump_response_generations('all')
+
+
+def _rows(stream, using, replaced):
+    """
+    Объекты фикстуры и строки их связей многие-ко-многим. Если передан
+    replaced, в него добавляются объекты, чьи старые связи нужно удалить.
+    """
+    for item in iter_objects(stream):
+        for deserialized in serializers.deserialize(
+            'python', [item], using=using, ignorenonexistent=True
+        ):
+            relations, through_rows = _through_rows(deserialized)
+            if replaced is not None:
+                for through, source in relations:
+                    replaced[through][source].append(deserialized.object.pk)
+            yield deserialized.object
+            yield from through_rows
+
+
+def _clear_relations(through, replaced, using, batch_size):
+    """Удаление старых связей объектов из replaced перед вставкой новых."""
+    if not replaced:
+        return
+    manager = through._base_manager.db_manager(using)
+    for source, pks in replaced.pop(through, {}).items():
+        for chunk in _chunks(pks, batch_size):
+            manager.filter(**{f'{source}__in': chunk})._raw_delete(using)
+
+
+def load(stream, batch_size=None, ignore_conflicts=False, using=None):
+    """
+    Загрузка фикстуры из текстового потока stream в одной транзакции.
+    Объекты с уже занятым pk обновляются, при ignore_conflicts -
+    пропускаются вместе с объектами с занятыми уникальными значениями.
+    Возвращает число объектов фикстуры по моделям.
+    """
+    batch_size = batch_size or settings.FIXTURE_BATCH_SIZE
+    using = using or router.db_for_write(Title)
+    connection = connections[using]
+    buffers = defaultdict(list)
+    loaded = Counter()
+    # Объекты, чьи старые связи многие-ко-многим ещё не удалены:
+    # промежуточная модель - {поле объекта: [pk]}.
+    replaced = None if ignore_conflicts else defaultdict(
+        lambda: defaultdict(list)
+    )
+
+    def flush(model):
+        _clear_relations(model, replaced, using, batch_size)
+        objects = buffers.pop(model, [])
+        if objects:
+            _insert(model, objects, using, ignore_conflicts)
+            loaded[model] += len(objects)
+
+    with transaction.atomic(using=using):
+        with connection.constraint_checks_disabled():
+            for row in _rows(stream, using, replaced):
+                model = type(row)
+                buffers[model].append(row)
+                if len(buffers[model]) >= batch_size:
+                    flush(model)
+            for model in dependency_order([*buffers, *(replaced or ())]):
+                flush(model)
+        connection.check_constraints(
+            table_names=[model._meta.db_table for model in loaded]
+        )
+        statements = connection.ops.sequence_reset_sql(no_style(),
+                                                       list(loaded))
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        _refresh_denormalized(set(loaded))
+    return {model._meta.label: count for model, count in loaded.items()}
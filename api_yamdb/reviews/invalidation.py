@@ -0,0 +1,281 @@
+"""
+Модуль содержит шину инвалидации кэшей процессов.
+С кэшем в памяти процесса (LocMemCache) сброс ключа или смена
+поколения видны только воркеру, обработавшему запись. invalidate()
+применяет сброс к своему кэшу и публикует сообщение в шину, остальные
+воркеры получают его в фоновом потоке и применяют к своим кэшам.
+Транспорты:
+postgres - LISTEN/NOTIFY; NOTIFY транзакционный и доставляется после
+фиксации транзакции записи;
+sqlite - таблица сообщений в файле SQLite, которую воркеры опрашивают
+каждые INVALIDATION_POLL_INTERVAL секунд (для тестов и одного хоста).
+Ограниченная устарелость: если поток шины не получал вестей от
+транспорта дольше INVALIDATION_MAX_STALENESS секунд (обрыв соединения,
+поток завис), ближайший запрос очищает кэш процесса целиком; после
+переподключения кэш очищается сразу, так как сообщения могли
+потеряться. Значит, устаревшие данные живут в воркере не дольше
+INVALIDATION_MAX_STALENESS.
+"""
+import json
+import logging
+import os
+import select
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'yamdb_invalidation'
+MAX_PAYLOAD = 7000
+SQLITE_RETENTION = 3600
+
+# Событие шины для метрик: event - published, applied или reset,
+# lag - задержка доставки сообщения в секундах.
+bus_event = Signal()
+
+
+def apply(cache, delete=(), bump=()):
+    """
+    Сброс ключей delete и смена поколений bump в кэше cache.
+    Отсутствующее поколение начинается с текущего времени.
+    """
+    if delete:
+        cache.delete_many(list(delete))
+    for key in bump:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def split(message, limit=MAX_PAYLOAD):
+    """Сообщение, разбитое на части не длиннее limit символов в JSON."""
+    parts = []
+    part = dict(message, delete=[], bump=[])
+    size = len(json.dumps(part))
+    for field in ('delete', 'bump'):
+        for key in message[field]:
+            length = len(json.dumps(key)) + 2
+            if size + length > limit and (part['delete'] or part['bump']):
+                parts.append(part)
+                part = dict(message, delete=[], bump=[])
+                size = len(json.dumps(part))
+            part[field].append(key)
+            size += length
+    parts.append(part)
+    return parts
+
+
+class PostgresTransport:
+    """Транспорт LISTEN/NOTIFY PostgreSQL."""
+    def __init__(self, using='default'):
+        self.using = using
+        if connections[using].vendor != 'postgresql':
+            raise ImproperlyConfigured(
+                'Транспорт postgres шины инвалидации требует PostgreSQL'
+            )
+
+    def publish(self, message):
+        with connections[self.using].cursor() as cursor:
+            for part in split(message):
+                cursor.execute('SELECT pg_notify(%s, %s)',
+                               [CHANNEL, json.dumps(part)])
+
+    def listen(self, poll_interval):
+        """
+        Сообщения, пришедшие за очередной интервал poll_interval.
+        Соединение для LISTEN - отдельное от соединений Django.
+        """
+        base = connections[self.using]
+        listener = base.get_new_connection(base.get_connection_params())
+        listener.autocommit = True
+        try:
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if not select.select([listener], [], [], poll_interval)[0]:
+                    with listener.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                listener.poll()
+                messages = [json.loads(notify.payload)
+                            for notify in listener.notifies]
+                listener.notifies.clear()
+                yield messages
+        finally:
+            listener.close()
+
+
+class SQLiteTransport:
+    """
+    Транспорт на таблице сообщений в файле SQLite.
+    Сообщение пишется после фиксации транзакции записи.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        db.execute('CREATE TABLE IF NOT EXISTS messages ('
+                   'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                   'created REAL NOT NULL, payload TEXT NOT NULL)')
+        return db
+
+    def write(self, message):
+        now = time.time()
+        with closing(self.connect()) as db:
+            db.execute('INSERT INTO messages (created, payload) '
+                       'VALUES (?, ?)', (now, json.dumps(message)))
+            db.execute('DELETE FROM messages WHERE created < ?',
+                       (now - SQLITE_RETENTION,))
+
+    def publish(self, message):
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self.write(message))
+        else:
+            self.write(message)
+
+    def listen(self, poll_interval):
+        with closing(self.connect()) as db:
+            last, = db.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM messages'
+            ).fetchone()
+            while True:
+                rows = db.execute(
+                    'SELECT id, payload FROM messages WHERE id > ? '
+                    'ORDER BY id', (last,)
+                ).fetchall()
+                if rows:
+                    last = rows[-1][0]
+                yield [json.loads(payload) for _, payload in rows]
+                time.sleep(poll_interval)
+
+
+class InvalidationBus:
+    """
+    Шина инвалидации процесса: публикация сообщений и фоновый поток,
+    применяющий чужие сообщения к кэшу cache.
+    """
+    def __init__(self, transport, cache=default_cache, poll_interval=None,
+                 max_staleness=None):
+        self.transport = transport
+        self.cache = cache
+        self.poll_interval = (poll_interval
+                              or settings.INVALIDATION_POLL_INTERVAL)
+        self.max_staleness = (max_staleness
+                              or settings.INVALIDATION_MAX_STALENESS)
+        self.origin = uuid.uuid4().hex
+        self.pid = None
+        self.thread = None
+        self.heard = time.monotonic()
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+    def publish(self, delete=(), bump=()):
+        self.transport.publish({'origin': self.origin, 'sent': time.time(),
+                                'delete': list(delete), 'bump': list(bump)})
+        bus_event.send(sender=self.__class__, event='published')
+
+    def start(self):
+        """Запуск потока шины, в том числе заново после fork."""
+        if self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.heard = time.monotonic()
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True,
+                                           name='invalidation-bus')
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        connected = False
+        while not self.stopped.is_set():
+            try:
+                for messages in self.transport.listen(self.poll_interval):
+                    self.heard = time.monotonic()
+                    if connected is None:
+                        self.reset()
+                    connected = True
+                    for message in messages:
+                        self.receive(message)
+                    if self.stopped.is_set():
+                        return
+            except Exception:
+                logger.exception('Ошибка транспорта шины инвалидации')
+                connected = None
+                self.stopped.wait(self.poll_interval)
+
+    def receive(self, message):
+        if message.get('origin') == self.origin:
+            return
+        apply(self.cache, message.get('delete', ()), message.get('bump', ()))
+        bus_event.send(sender=self.__class__, event='applied',
+                       lag=max(time.time() - message.get('sent', 0), 0))
+
+    def reset(self):
+        """Очистка кэша процесса, когда сообщения могли потеряться."""
+        self.cache.clear()
+        bus_event.send(sender=self.__class__, event='reset')
+
+    def ensure_fresh(self):
+        """
+        Очистка кэша, если поток шины молчит дольше max_staleness:
+        данные в кэше процесса не устаревают сильнее этой границы.
+        """
+        if time.monotonic() - self.heard > self.max_staleness:
+            self.heard = time.monotonic()
+            self.reset()
+
+
+_bus = None
+_bus_name = None
+_bus_lock = threading.Lock()
+
+
+def make_transport(name):
+    if name == 'postgres':
+        return PostgresTransport()
+    if name == 'sqlite':
+        return SQLiteTransport(settings.INVALIDATION_SQLITE_PATH)
+    raise ImproperlyConfigured(f'Неизвестный транспорт шины: {name}')
+
+
+def get_bus():
+    """Шина процесса или None, если INVALIDATION_BUS не задан."""
+    global _bus, _bus_name
+    name = settings.INVALIDATION_BUS
+    if not name:
+        return None
+    if _bus is None or _bus_name != name:
+        with _bus_lock:
+            if _bus is None or _bus_name != name:
+                _bus = InvalidationBus(make_transport(name))
+                _bus_name = name
+    return _bus
+
+
+def invalidate(delete=(), bump=()):
+    """
+    Сброс ключей delete и смена поколений bump в кэше процесса
+    и публикация сообщения для остальных процессов.
+    """
+    apply(default_cache, delete, bump)
+    bus = get_bus()
+    if bus is not None and (delete or bump):
+        bus.publish(delete, bump)
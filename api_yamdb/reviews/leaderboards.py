@@ -0,0 +1,175 @@
+"""
+Модуль содержит расчёт лидербордов произведений.
+Рейтинг - байесовский: средняя оценка, сглаженная к априорной средней
+LEADERBOARD_PRIOR_MEAN с весом LEADERBOARD_PRIOR_WEIGHT отзывов.
+Популярность - сумма отзывов, каждый из которых затухает с периодом
+полураспада LEADERBOARD_TREND_HALF_LIFE часов. Сумма хранится как
+логарифм sum(exp(x)), где x - время отзыва от TREND_EPOCH в единицах
+затухания: порядок по ней совпадает с порядком по затухающей сумме
+в любой момент времени, поэтому пересчёт со временем не нужен.
+"""
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (Count, ExpressionWrapper, F, FloatField, Sum,
+                              Value)
+from django.db.models.functions import Cast, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Review, Title, TitleStats
+
+TREND_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def trend_position(moment):
+    """Время moment от TREND_EPOCH в единицах затухания."""
+    half_life = settings.LEADERBOARD_TREND_HALF_LIFE * 3600
+    return (moment - TREND_EPOCH).total_seconds() * math.log(2) / half_life
+
+
+def trend_value(trend, now=None):
+    """Затухающее число отзывов на момент now по сохранённому trend."""
+    return math.exp(trend - trend_position(now or timezone.now()))
+
+
+def bayesian_rating(reviews_count, score_sum):
+    prior_weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    return ((prior_weight * settings.LEADERBOARD_PRIOR_MEAN + score_sum)
+            / (prior_weight + reviews_count))
+
+
+def _log_add(total, position):
+    if total is None:
+        return position
+    top = max(total, position)
+    return top + math.log(math.exp(total - top) + math.exp(position - top))
+
+
+def review_added(review):
+    """
+    Инкрементальный учёт нового отзыва одним UPDATE.
+    Если у произведения ещё нет строки рейтинга, она пересчитывается.
+    """
+    prior_weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    position = Value(trend_position(review.pub_date),
+                     output_field=FloatField())
+    top = Greatest(F('trend'), position)
+    updated = TitleStats.objects.filter(title_id=review.title_id).update(
+        reviews_count=F('reviews_count') + 1,
+        score_sum=F('score_sum') + review.score,
+        rating=(
+            (Value(prior_weight * settings.LEADERBOARD_PRIOR_MEAN,
+                   output_field=FloatField())
+             + F('score_sum') + review.score)
+            / (Value(float(prior_weight), output_field=FloatField())
+               + F('reviews_count') + 1)
+        ),
+        trend=top + Ln(Exp(F('trend') - top) + Exp(position - top)),
+    )
+    if not updated:
+        refresh_title(review.title_id)
+
+
+def refresh_title(title_id):
+    """
+    Пересчёт строки рейтинга произведения по его отзывам.
+    Используется при изменении, удалении и скрытии отзывов; без видимых
+    отзывов и у удаляемого произведения строка удаляется.
+    """
+    trend = None
+    reviews_count = score_sum = 0
+    reviews = Review.objects.filter(title_id=title_id, is_hidden=False,
+                                    title__is_deleted=False).order_by()
+    for score, pub_date in reviews.values_list('score', 'pub_date'):
+        reviews_count += 1
+        score_sum += score
+        trend = _log_add(trend, trend_position(pub_date))
+    if not reviews_count:
+        TitleStats.objects.filter(title_id=title_id).delete()
+        return
+    values = {
+        'reviews_count': reviews_count,
+        'score_sum': score_sum,
+        'rating': bayesian_rating(reviews_count, score_sum),
+        'trend': trend,
+    }
+    if TitleStats.objects.filter(title_id=title_id).update(**values):
+        return
+    category_id = (Title.objects.filter(pk=title_id, is_deleted=False)
+                   .values_list('category_id', flat=True).first())
+    if category_id is None:
+        return
+    try:
+        with transaction.atomic():
+            TitleStats.objects.create(title_id=title_id,
+                                      category_id=category_id, **values)
+    except IntegrityError:
+        TitleStats.objects.filter(title_id=title_id).update(**values)
+
+
+def rebuild():
+    """
+    Полный пересчёт рейтингов всех произведений.
+    Нужен после массовой загрузки отзывов в обход сигналов и после
+    смены настроек лидербордов. Удаляемые произведения не учитываются.
+    Возвращает число строк рейтинга.
+    """
+    reviews = Review.objects.filter(is_hidden=False,
+                                    title__is_deleted=False).order_by()
+    totals = (reviews.values('title_id')
+              .annotate(count=Count('id'), total=Sum('score')))
+    trends = {}
+    pub_dates = reviews.values_list('title_id', 'pub_date').iterator()
+    for title_id, pub_date in pub_dates:
+        trends[title_id] = _log_add(trends.get(title_id),
+                                    trend_position(pub_date))
+    categories = dict(Title.objects.filter(pk__in=trends)
+                      .values_list('pk', 'category_id'))
+    stats = [
+        TitleStats(title_id=row['title_id'],
+                   category_id=categories[row['title_id']],
+                   reviews_count=row['count'],
+                   score_sum=row['total'],
+                   rating=bayesian_rating(row['count'], row['total']),
+                   trend=trends[row['title_id']])
+        for row in totals
+    ]
+    with transaction.atomic():
+        TitleStats.objects.all().delete()
+        TitleStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def average_rating():
+    """
+    Выражение средней оценки произведения по строке рейтингов,
+    замена агрегата Avg('reviews__score') без обхода отзывов.
+    """
+    return ExpressionWrapper(
+        Cast('stats__score_sum', FloatField()) / F('stats__reviews_count'),
+        output_field=FloatField()
+    )
+
+
+def _board(ordering, category=None, genre=None, limit=None):
+    titles = Title.objects.filter(is_deleted=False, stats__isnull=False)
+    if category:
+        titles = titles.filter(stats__category__slug=category)
+    if genre:
+        titles = titles.filter(genre__slug=genre)
+    return (titles.select_related('category', 'stats')
+            .prefetch_related('genre')
+            .annotate(rating=average_rating())
+            .order_by(ordering, 'pk')[:limit])
+
+
+def top(category=None, genre=None, limit=None):
+    """Произведения по убыванию байесовского рейтинга."""
+    return _board('-stats__rating', category, genre, limit)
+
+
+def trending(category=None, genre=None, limit=None):
+    """Произведения по убыванию затухающего числа отзывов."""
+    return _board('-stats__trend', category, genre, limit)
@@ -0,0 +1,39 @@
+"""Модуль содержит команду расчёта похожих произведений."""
+from django.core.management.base import BaseCommand
+from reviews import similarity
+
+
+class Command(BaseCommand):
+    help = ('Рассчитывает похожие произведения по жанрам и оценкам '
+            'пользователей и сохраняет их в таблицу SimilarTitle.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-i',
+            '--incremental',
+            action='store_true',
+            default=False,
+            help='Пересчитать только произведения с новыми отзывами '
+                 'и новые произведения'
+        )
+        parser.add_argument(
+            '-k',
+            '--limit',
+            type=int,
+            help='Число соседей для каждого произведения'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Число произведений в блоке расчёта'
+        )
+
+    def handle(self, *args, **options):
+        build = similarity.build(limit=options['limit'],
+                                 chunk_size=options['chunk_size'],
+                                 incremental=options['incremental'])
+        mode = 'инкрементально' if build.incremental else 'полностью'
+        self.stdout.write(
+            f'Похожие произведения пересчитаны {mode}: '
+            f'{build.titles_count} произведений.'
+        )
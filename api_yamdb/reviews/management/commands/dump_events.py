@@ -0,0 +1,47 @@
+"""Модуль содержит команду выгрузки журнала событий в NDJSON."""
+import json
+
+from django.core.management.base import BaseCommand
+from reviews import events
+from reviews.models import Event
+
+
+class Command(BaseCommand):
+    help = ('Выгружает события журнала изменений с номером больше --after '
+            'в формате NDJSON (один объект JSON на строку).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--after',
+            type=int,
+            default=0,
+            help='Номер последнего уже полученного события'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Максимальное число событий'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки, по умолчанию stdout'
+        )
+
+    def handle(self, *args, **options):
+        events.sequence()
+        queryset = (Event.objects.filter(position__gt=options['after'])
+                    .order_by('position'))
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+        last = options['after']
+        output = (open(options['output'], 'w', encoding='utf-8')
+                  if options['output'] else self.stdout)
+        try:
+            for event in queryset.iterator(chunk_size=1000):
+                output.write(json.dumps(events.as_dict(event),
+                                        ensure_ascii=False) + '\n')
+                last = event.position
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.stderr.write(f'Последнее событие: {last}')
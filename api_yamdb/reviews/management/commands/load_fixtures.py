@@ -0,0 +1,37 @@
+"""Модуль содержит команду потоковой загрузки фикстур."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from reviews import fixtures
+
+
+class Command(BaseCommand):
+    help = ('Загружает фикстуру JSON (например, infra/fixtures.json) '
+            'потоково, пачками bulk insert без сигналов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture', help='Путь к файлу фикстуры')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Число строк одной модели в буфере перед вставкой'
+        )
+        parser.add_argument(
+            '--ignore-existing',
+            action='store_true',
+            default=False,
+            help=('Пропускать объекты, которые уже есть в базе, '
+                  'вместо их обновления')
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['fixture'], encoding='utf-8') as stream:
+                loaded = fixtures.load(
+                    stream, options['batch_size'],
+                    ignore_conflicts=options['ignore_existing']
+                )
+        except (OSError, ValueError, DatabaseError) as error:
+            raise CommandError(f'Фикстура не загружена: {error}')
+        for label, count in loaded.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(f'Загружено объектов: {sum(loaded.values())}.')
@@ -0,0 +1,83 @@
+"""Модуль содержит команду обслуживания секций отзывов и комментариев."""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from reviews import counters, leaderboards, partitioning, read_model
+from reviews.signals import bump_response_generations
+
+
+class Command(BaseCommand):
+    help = ('Создаёт будущие секции таблиц отзывов и комментариев, '
+            'отсоединяет или архивирует старые. Только для PostgreSQL.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.PARTITION_MONTHS_AHEAD,
+            help='На сколько месяцев вперёд создать секции'
+        )
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            help='Отсоединить секции старше указанного числа месяцев'
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            default=False,
+            help='Перенести отсоединённые секции в схему archive'
+        )
+        parser.add_argument(
+            '--partition',
+            action='store_true',
+            default=False,
+            help='Перевести обычные таблицы на секционирование'
+        )
+        parser.add_argument(
+            '--unpartition',
+            action='store_true',
+            default=False,
+            help='Вернуть таблицы к обычным'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL.')
+        with transaction.atomic():
+            if options['unpartition']:
+                partitioning.unpartition(connection)
+                self.stdout.write('Таблицы возвращены к обычным.')
+                return
+            if options['partition']:
+                partitioning.partition(connection, options['months_ahead'])
+            if not partitioning.is_partitioned(connection, 'reviews_review'):
+                raise CommandError('Таблицы не секционированы, '
+                                   'используйте --partition.')
+            self.maintain(options)
+        self.report_default_rows()
+
+    def maintain(self, options):
+        for name in partitioning.ensure_partitions(connection,
+                                                   options['months_ahead']):
+            self.stdout.write(f'Создана секция {name}.')
+        if options['keep_months'] is None:
+            return
+        detached = partitioning.detach_partitions(
+            connection, options['keep_months'], options['archive']
+        )
+        for name in detached:
+            self.stdout.write(f'Отсоединена секция {name}.')
+        if detached:
+            counters.repair()
+            leaderboards.rebuild()
+            read_model.rebuild()
+            bump_response_generations('all')
+
+    def report_default_rows(self):
+        for table, count in partitioning.default_rows(connection).items():
+            if count:
+                self.stderr.write(
+                    f'В секции по умолчанию {table} {count} строк: '
+                    f'для них нет секции по pub_date.'
+                )
@@ -0,0 +1,33 @@
+"""Модуль содержит воркер фонового удаления."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reviews import deletion
+
+
+class Command(BaseCommand):
+    help = ('Удаляет пачками зависимые объекты категорий, произведений '
+            'и пользователей, помеченных на фоновое удаление.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            default=False,
+            help='Выполнить ожидающие задания и завершиться'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Число строк в одном DELETE'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = deletion.run_pending(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Выполнено заданий: {processed}.')
+            if options['once']:
+                return
+            time.sleep(settings.DELETION_POLL_INTERVAL)
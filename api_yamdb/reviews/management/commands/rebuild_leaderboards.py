@@ -0,0 +1,13 @@
+"""Модуль содержит команду пересчёта лидербордов произведений."""
+from django.core.management.base import BaseCommand
+from reviews import leaderboards
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинги произведений для лидербордов. '
+            'Нужна после загрузки отзывов в обход моделей и после '
+            'смены настроек LEADERBOARD_*.')
+
+    def handle(self, *args, **options):
+        count = leaderboards.rebuild()
+        self.stdout.write(f'Пересчитаны рейтинги {count} произведений.')
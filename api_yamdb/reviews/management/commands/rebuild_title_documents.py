@@ -0,0 +1,46 @@
+"""Модуль содержит команду пересборки документов произведений."""
+from django.core.management.base import BaseCommand, CommandError
+from reviews import read_model
+from reviews.signals import bump_response_generations
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает документы произведений, из которых читает API. '
+            'С --check только сверяет их с данными.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            default=False,
+            help='Сверить документы с данными без пересборки всех'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            default=False,
+            help='Вместе с --check пересобрать расходящиеся документы'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Число произведений в одной пачке'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            count = read_model.rebuild(options['chunk_size'])
+            bump_response_generations('titles')
+            self.stdout.write(f'Пересобрано документов: {count}.')
+            return
+        missing, stale = read_model.check(options['fix'],
+                                          options['chunk_size'])
+        if (missing or stale) and options['fix']:
+            bump_response_generations('titles')
+        self.stdout.write(f'Нет документа: {len(missing)}, '
+                          f'устарел: {len(stale)}.')
+        if (missing or stale) and not options['fix']:
+            raise CommandError(
+                'Документы расходятся с данными, например у произведений '
+                f'{(missing + stale)[:10]}; запустите с --fix.'
+            )
@@ -0,0 +1,19 @@
+"""Модуль содержит команду пересчёта счётчиков отзывов и комментариев."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews import counters, read_model
+from reviews.signals import bump_response_generations
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает число отзывов произведений и комментариев '
+            'отзывов там, где счётчик разошёлся с данными.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = counters.repair()
+        if any(fixed.values()):
+            read_model.rebuild()
+            bump_response_generations('titles')
+        for counter, count in fixed.items():
+            self.stdout.write(f'{counter}: исправлено {count}.')
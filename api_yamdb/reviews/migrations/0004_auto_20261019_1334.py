@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_auto_20220226_2230'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='name',
+            field=models.TextField(db_index=True, verbose_name='Название произведения'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['pub_date', 'id'], name='comment_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pub_date', 'id'], name='review_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_auto_20261019_1334'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Title', verbose_name='произведение')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='число отзывов')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='сумма оценок')),
+                ('rating', models.FloatField(verbose_name='байесовский рейтинг')),
+                ('trend', models.FloatField(verbose_name='логарифм затухающей суммы отзывов')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Category', verbose_name='категория')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг произведения',
+                'verbose_name_plural': 'Рейтинги произведений',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titlestats',
+            index=models.Index(fields=['-rating'], name='stats_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titlestats',
+            index=models.Index(fields=['category', '-rating'], name='stats_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titlestats',
+            index=models.Index(fields=['-trend'], name='stats_trend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titlestats',
+            index=models.Index(fields=['category', '-trend'], name='stats_category_trend_idx'),
+        ),
+    ]
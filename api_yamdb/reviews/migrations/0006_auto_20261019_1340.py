@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_auto_20261019_1337'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityBuild',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(verbose_name='начало расчёта')),
+                ('max_title_id', models.PositiveIntegerField(verbose_name='наибольший id произведения')),
+                ('titles_count', models.PositiveIntegerField(verbose_name='пересчитано произведений')),
+                ('incremental', models.BooleanField(verbose_name='инкрементальный расчёт')),
+            ],
+            options={
+                'verbose_name': 'Расчёт похожих произведений',
+                'verbose_name_plural': 'Расчёты похожих произведений',
+                'get_latest_by': 'started',
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarTitle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='сходство')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='reviews.Title', verbose_name='похожее произведение')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_titles', to='reviews.Title', verbose_name='произведение')),
+            ],
+            options={
+                'verbose_name': 'Похожее произведение',
+                'verbose_name_plural': 'Похожие произведения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='similartitle',
+            index=models.Index(fields=['title', '-score'], name='similar_title_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='similartitle',
+            constraint=models.UniqueConstraint(fields=('title', 'similar'), name='unique_similar_title'),
+        ),
+    ]
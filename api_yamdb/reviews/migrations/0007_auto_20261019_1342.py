@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_auto_20261019_1340'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('category', 'категория'), ('title', 'произведение'), ('user', 'пользователь')], max_length=16, verbose_name='объект')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('status', models.CharField(choices=[('pending', 'ожидает'), ('running', 'выполняется'), ('done', 'выполнено'), ('failed', 'ошибка')], db_index=True, default='pending', max_length=16, verbose_name='статус')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+                ('deleted_titles', models.PositiveIntegerField(default=0, verbose_name='удалено произведений')),
+                ('deleted_reviews', models.PositiveIntegerField(default=0, verbose_name='удалено отзывов')),
+                ('deleted_comments', models.PositiveIntegerField(default=0, verbose_name='удалено комментариев')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+            ],
+            options={
+                'verbose_name': 'Фоновое удаление',
+                'verbose_name_plural': 'Фоновые удаления',
+                'ordering': ('created', 'id'),
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удаляется'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удаляется'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Удаляется'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_tables(apps, schema_editor):
+    from reviews import partitioning
+    if settings.REVIEWS_PARTITIONING:
+        partitioning.partition(schema_editor.connection,
+                               settings.PARTITION_MONTHS_AHEAD)
+
+
+def unpartition_tables(apps, schema_editor):
+    from reviews import partitioning
+    partitioning.unpartition(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_auto_20261019_1342'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
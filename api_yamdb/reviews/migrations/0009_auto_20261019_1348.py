@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, parent_field):
+    counts = (model.objects.filter(**{parent_field: OuterRef('pk')})
+              .order_by().values(parent_field)
+              .annotate(count=Count('pk')).values('count'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    Title.objects.update(reviews_count=count_subquery(Review, 'title'))
+    Review.objects.update(comments_count=count_subquery(Comment, 'review'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_partition_reviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число комментариев'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число отзывов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_auto_20261019_1348'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='comment_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='review_author_pub_date_idx'),
+        ),
+    ]
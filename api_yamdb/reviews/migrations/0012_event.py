@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_auto_20261019_1354'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='время')),
+                ('model', models.CharField(choices=[('review', 'отзыв'), ('comment', 'комментарий'), ('title', 'произведение')], max_length=16, verbose_name='модель')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('action', models.CharField(choices=[('create', 'создание'), ('update', 'изменение'), ('delete', 'удаление')], max_length=16, verbose_name='действие')),
+                ('data', models.TextField(blank=True, verbose_name='данные (JSON)')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'Журнал событий',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleDocument',
+            fields=[
+                ('title', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='document', serialize=False, to='reviews.Title')),
+                ('document', models.TextField(verbose_name='документ (JSON)')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+            ],
+            options={
+                'verbose_name': 'Документ произведения',
+                'verbose_name_plural': 'Документы произведений',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from reviews import search
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from reviews import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_review_comment_is_hidden'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
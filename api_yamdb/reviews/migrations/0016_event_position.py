@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:21
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_events(apps, schema_editor):
+    """
+    События до этой миграции фиксировались в порядке id, поэтому
+    их номера совпадают с id: сохранённые потребителями номера
+    остаются верными.
+    """
+    Event = apps.get_model('reviews', 'Event')
+    Event.objects.update(position=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='position',
+            field=models.BigIntegerField(editable=False, null=True, unique=True, verbose_name='номер'),
+        ),
+        migrations.RunPython(number_existing_events,
+                             migrations.RunPython.noop),
+    ]
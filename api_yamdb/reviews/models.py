@@ -1,7 +1,7 @@
 """Модуль содержит описание моделей."""
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, router, transaction
 
 from .validators import validate_year
 
@@ -9,6 +9,24 @@ MAX_SCORE = 'Максимальная оценка'
 MIN_SCORE = 'Минимальная оценка'
 
 
+class TransactionalSaveModel(models.Model):
+    """
+    Абстрактная модель, сохранение которой выполняется в транзакции
+    вместе с обработчиками post_save: журнал событий, счётчики и рейтинги
+    фиксируются одновременно со строкой. Внутри уже открытой транзакции
+    точка сохранения не создаётся. Удаление через Collector выполняется
+    в транзакции и без этого.
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self),
+                                                           instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
 class User(AbstractUser):
     """
     Модель пользователя.
@@ -40,6 +58,11 @@ class User(AbstractUser):
         null=True,
         blank=True,
     )
+    is_deleted = models.BooleanField(
+        'Удаляется',
+        default=False,
+        db_index=True,
+    )
 
     class Meta():
         verbose_name = 'Пользователь'
@@ -58,7 +81,7 @@ class User(AbstractUser):
         return str(self.username)
 
 
-class Genre(models.Model):
+class Genre(TransactionalSaveModel):
     """Модель жанров."""
     name = models.TextField(max_length=256,
                             verbose_name='Название жанра')
@@ -74,12 +97,15 @@ class Genre(models.Model):
         return str(self.name)
 
 
-class Category(models.Model):
+class Category(TransactionalSaveModel):
     """Модель категорий."""
     name = models.TextField(max_length=256,
                             verbose_name='Название категории')
     slug = models.SlugField(max_length=50,
                             unique=True)
+    is_deleted = models.BooleanField(verbose_name='Удаляется',
+                                     default=False,
+                                     db_index=True)
 
     class Meta:
         verbose_name = 'Категория'
@@ -90,9 +116,10 @@ class Category(models.Model):
         return str(self.name)
 
 
-class Title(models.Model):
+class Title(TransactionalSaveModel):
     """Модель произведений."""
-    name = models.TextField(verbose_name='Название произведения')
+    name = models.TextField(verbose_name='Название произведения',
+                            db_index=True)
     year = models.IntegerField(verbose_name='Год выпуска',
                                db_index=True,
                                validators=(validate_year, ))
@@ -107,6 +134,13 @@ class Title(models.Model):
                                    through='GenreTitle',
                                    verbose_name='Жанр',
                                    related_name='titles')
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='Число отзывов',
+        default=0
+    )
+    is_deleted = models.BooleanField(verbose_name='Удаляется',
+                                     default=False,
+                                     db_index=True)
 
     class Meta:
         verbose_name = 'Произведение'
@@ -117,7 +151,7 @@ class Title(models.Model):
         return str(self.name)
 
 
-class GenreTitle(models.Model):
+class GenreTitle(TransactionalSaveModel):
     """Модель связи произведения с жанром."""
     title = models.ForeignKey(
         Title,
@@ -128,9 +162,19 @@ class GenreTitle(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('genre', 'title'),
+                         name='genre_title_idx'),
+        )
+
 
-class Review(models.Model):
-    """Модель отзывов."""
+class Review(TransactionalSaveModel):
+    """
+    Модель отзывов.
+    Скрытые модератором отзывы (is_hidden) не показываются в API
+    и не учитываются в счётчиках и рейтингах, см. reviews.moderation.
+    """
     text = models.TextField()
     pub_date = models.DateTimeField(
         'Дата публикации',
@@ -155,6 +199,14 @@ class Review(models.Model):
         related_name='reviews',
         verbose_name='произведение'
     )
+    comments_count = models.PositiveIntegerField(
+        'число комментариев',
+        default=0
+    )
+    is_hidden = models.BooleanField(
+        'скрыт модератором',
+        default=False
+    )
 
     class Meta:
         verbose_name = 'Отзыв'
@@ -164,14 +216,24 @@ class Review(models.Model):
                 fields=['title', 'author'],
                 name='unique_riview'),
         )
+        indexes = (
+            models.Index(fields=('pub_date', 'id'),
+                         name='review_pub_date_idx'),
+            models.Index(fields=('author', 'pub_date', 'id'),
+                         name='review_author_pub_date_idx'),
+        )
         ordering = ['-pub_date', 'title', '-score', 'text']
 
     def __str__(self):
         return f'{str(self.author)}: {str(self.score)} | {str(self.title)}'
 
 
-class Comment(models.Model):
-    """Модель комментариев."""
+class Comment(TransactionalSaveModel):
+    """
+    Модель комментариев.
+    Скрытые модератором комментарии не показываются в API
+    и не учитываются в счётчике отзыва.
+    """
     text = models.TextField()
     author = models.ForeignKey(
         User,
@@ -188,11 +250,238 @@ class Comment(models.Model):
         related_name='comments',
         verbose_name='отзыв'
     )
+    is_hidden = models.BooleanField(
+        'скрыт модератором',
+        default=False
+    )
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(fields=('pub_date', 'id'),
+                         name='comment_pub_date_idx'),
+            models.Index(fields=('author', 'pub_date', 'id'),
+                         name='comment_author_pub_date_idx'),
+        )
         ordering = ['-pub_date', 'review', 'text']
 
     def __str__(self):
         return str(self.text)
+
+
+class TitleStats(models.Model):
+    """
+    Модель рейтингов произведения для лидербордов.
+    Строка создаётся с первым отзывом и обновляется инкрементально
+    при каждой записи отзыва, см. reviews.leaderboards.
+    Категория продублирована из произведения для индексов
+    с фильтром по категории.
+    """
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='произведение'
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='категория'
+    )
+    reviews_count = models.PositiveIntegerField('число отзывов', default=0)
+    score_sum = models.PositiveIntegerField('сумма оценок', default=0)
+    rating = models.FloatField('байесовский рейтинг')
+    trend = models.FloatField('логарифм затухающей суммы отзывов')
+
+    class Meta:
+        verbose_name = 'Рейтинг произведения'
+        verbose_name_plural = 'Рейтинги произведений'
+        indexes = (
+            models.Index(fields=('-rating',), name='stats_rating_idx'),
+            models.Index(fields=('category', '-rating'),
+                         name='stats_category_rating_idx'),
+            models.Index(fields=('-trend',), name='stats_trend_idx'),
+            models.Index(fields=('category', '-trend'),
+                         name='stats_category_trend_idx'),
+        )
+
+    def __str__(self):
+        return f'{str(self.title)}: {self.rating:.2f}'
+
+
+class SimilarTitle(models.Model):
+    """
+    Модель похожих произведений.
+    Заполняется командой build_similar_titles, для каждого произведения
+    хранятся ближайшие соседи с мерой сходства.
+    """
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_titles',
+        verbose_name='произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='похожее произведение'
+    )
+    score = models.FloatField('сходство')
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        constraints = (
+            models.UniqueConstraint(fields=('title', 'similar'),
+                                    name='unique_similar_title'),
+        )
+        indexes = (
+            models.Index(fields=('title', '-score'),
+                         name='similar_title_score_idx'),
+        )
+
+    def __str__(self):
+        return f'{str(self.title)} ~ {str(self.similar)}: {self.score:.3f}'
+
+
+class SimilarityBuild(models.Model):
+    """
+    Модель запусков расчёта похожих произведений.
+    Время начала и наибольший id произведения последнего запуска
+    определяют, какие произведения пересчитывать инкрементально.
+    """
+    started = models.DateTimeField('начало расчёта')
+    max_title_id = models.PositiveIntegerField('наибольший id произведения')
+    titles_count = models.PositiveIntegerField('пересчитано произведений')
+    incremental = models.BooleanField('инкрементальный расчёт')
+
+    class Meta:
+        verbose_name = 'Расчёт похожих произведений'
+        verbose_name_plural = 'Расчёты похожих произведений'
+        get_latest_by = 'started'
+
+    def __str__(self):
+        return f'{self.started:%Y-%m-%d %H:%M}: {self.titles_count}'
+
+
+class DeletionJob(models.Model):
+    """
+    Модель задания фонового удаления категории, произведения
+    или пользователя. Счётчики показывают прогресс удаления зависимых
+    объектов, см. reviews.deletion.
+    """
+    CATEGORY = 'category'
+    TITLE = 'title'
+    USER = 'user'
+
+    TARGETS = (
+        (CATEGORY, 'категория'),
+        (TITLE, 'произведение'),
+        (USER, 'пользователь'),
+    )
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (PENDING, 'ожидает'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнено'),
+        (FAILED, 'ошибка'),
+    )
+
+    target = models.CharField('объект', max_length=16, choices=TARGETS)
+    object_id = models.PositiveIntegerField('id объекта')
+    status = models.CharField('статус', max_length=16, choices=STATUSES,
+                              default=PENDING, db_index=True)
+    created = models.DateTimeField('создано', auto_now_add=True)
+    updated = models.DateTimeField('обновлено', auto_now=True)
+    deleted_titles = models.PositiveIntegerField('удалено произведений',
+                                                 default=0)
+    deleted_reviews = models.PositiveIntegerField('удалено отзывов',
+                                                  default=0)
+    deleted_comments = models.PositiveIntegerField('удалено комментариев',
+                                                   default=0)
+    error = models.TextField('ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновое удаление'
+        verbose_name_plural = 'Фоновые удаления'
+        ordering = ('created', 'id')
+
+    def __str__(self):
+        return f'{self.target} {self.object_id}: {self.status}'
+
+
+class Event(models.Model):
+    """
+    Модель журнала изменений отзывов, комментариев и произведений
+    (transactional outbox). Запись добавляется в той же транзакции,
+    что и изменение. Номер события в журнале (position) назначается
+    после фиксации транзакции, см. reviews.events.
+    """
+    REVIEW = 'review'
+    COMMENT = 'comment'
+    TITLE = 'title'
+
+    MODELS = (
+        (REVIEW, 'отзыв'),
+        (COMMENT, 'комментарий'),
+        (TITLE, 'произведение'),
+    )
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    ACTIONS = (
+        (CREATE, 'создание'),
+        (UPDATE, 'изменение'),
+        (DELETE, 'удаление'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    created = models.DateTimeField('время', auto_now_add=True)
+    model = models.CharField('модель', max_length=16, choices=MODELS)
+    object_id = models.PositiveIntegerField('id объекта')
+    action = models.CharField('действие', max_length=16, choices=ACTIONS)
+    data = models.TextField('данные (JSON)', blank=True)
+    position = models.BigIntegerField('номер', null=True, unique=True,
+                                      editable=False)
+
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'Журнал событий'
+        ordering = ('id',)
+
+    def __str__(self):
+        return f'{self.id}: {self.action} {self.model} {self.object_id}'
+
+
+class TitleDocument(models.Model):
+    """
+    Модель чтения произведения: готовый документ JSON для ответов API.
+    Пересобирается при изменении произведения, его жанров, категории
+    и отзывов, см. reviews.read_model. Документ удаляется обработчиком
+    post_delete произведения, а не каскадом: при каскадном удалении
+    отзывы удаляются раньше произведения и пересобирают документ.
+    """
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='document',
+    )
+    document = models.TextField('документ (JSON)')
+    updated = models.DateTimeField('обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Документ произведения'
+        verbose_name_plural = 'Документы произведений'
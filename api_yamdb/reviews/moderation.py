@@ -0,0 +1,180 @@
+"""
+Модуль содержит массовую модерацию отзывов и комментариев: удаление,
+скрытие и возврат скрытых по списку id, автору и интервалу времени
+публикации. Как и фоновое удаление (reviews.deletion), объекты
+обрабатываются пачками по batch_size прямыми DELETE и UPDATE без
+Collector и сигналов, а счётчики, рейтинги, документы произведений
+и журнал событий обновляются в транзакции пачки, кэши - после её
+фиксации. Строки пачки перечитываются в транзакции с блокировкой,
+поэтому счётчики меняются только для строк, которые действительно
+удалены или скрыты этим запросом.
+Скрытый объект остаётся в базе, но не показывается в API и не
+учитывается в счётчиках и рейтингах. Комментарии удаляемого отзыва
+удаляются вместе с ним, комментарии скрытого - остаются и снова
+видны после возврата отзыва.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from . import counters, events, invalidation, leaderboards, read_model
+from .deletion import batches
+from .models import Comment, Event, Review
+from .signals import bump_response_generations, count_cache_key
+
+DELETE = 'delete'
+HIDE = 'hide'
+UNHIDE = 'unhide'
+ACTIONS = (DELETE, HIDE, UNHIDE)
+
+MODELS = {
+    'review': Review,
+    'comment': Comment,
+}
+PARENT_FIELDS = {
+    Review: 'title_id',
+    Comment: 'review_id',
+}
+
+
+def select(model, ids=None, author=None, since=None, until=None):
+    """
+    Отзывы или комментарии по списку ids, автору и интервалу
+    [since, until) времени публикации; условия объединяются через И.
+    """
+    queryset = model.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if author is not None:
+        queryset = queryset.filter(author=author)
+    if since is not None:
+        queryset = queryset.filter(pub_date__gte=since)
+    if until is not None:
+        queryset = queryset.filter(pub_date__lt=until)
+    return queryset
+
+
+def _locked(model, fields, **filters):
+    """Значения fields строк filters, заблокированных до конца транзакции."""
+    return list(model.objects.filter(**filters).order_by('pk')
+                .select_for_update().values_list(*fields))
+
+
+def _refresh_titles(title_ids):
+    for title_id in title_ids:
+        leaderboards.refresh_title(title_id)
+    read_model.refresh(title_ids)
+
+
+def _invalidate(model, rows):
+    """Сброс кэшей после фиксации пачки строк (id, id родителя)."""
+    parent_ids = sorted({parent_id for _, parent_id in rows})
+    invalidation.invalidate(delete=[count_cache_key(model, parent_id)
+                                    for parent_id in parent_ids])
+    if model is Comment:
+        bump_response_generations(*(f'review:{review_id}'
+                                    for review_id in parent_ids))
+    else:
+        bump_response_generations(
+            'titles', *(f'title:{title_id}' for title_id in parent_ids),
+            *(f'review:{review_id}' for review_id, _ in rows)
+        )
+
+
+def _delete_comment_rows(rows):
+    """Удаление комментариев по строкам (id, id отзыва, скрыт)."""
+    Comment.objects.filter(
+        pk__in=[pk for pk, _, _ in rows]
+    )._raw_delete(Comment.objects.db)
+    counters.removed(Comment, [review_id for _, review_id, hidden in rows
+                               if not hidden])
+    events.record_deleted(Comment, [pk for pk, _, _ in rows])
+
+
+def delete_comments(comments, batch_size):
+    """Удаление комментариев пачками. Возвращает их число."""
+    deleted = 0
+    fields = ('pk', 'review_id', 'is_hidden')
+    for batch in batches(comments, ('pk',), batch_size):
+        with transaction.atomic():
+            rows = _locked(Comment, fields, pk__in=[pk for pk, in batch])
+            _delete_comment_rows(rows)
+        _invalidate(Comment, [(pk, review_id) for pk, review_id, _ in rows])
+        deleted += len(rows)
+    return deleted
+
+
+def delete_reviews(reviews, batch_size):
+    """
+    Удаление отзывов пачками вместе с комментариями.
+    Возвращает число удалённых отзывов и комментариев.
+    """
+    deleted = {'reviews': 0, 'comments': 0}
+    fields = ('pk', 'title_id', 'is_hidden')
+    for batch in batches(reviews, ('pk',), batch_size):
+        review_ids = [pk for pk, in batch]
+        deleted['comments'] += delete_comments(
+            Comment.objects.filter(review_id__in=review_ids), batch_size
+        )
+        with transaction.atomic():
+            rows = _locked(Review, fields, pk__in=review_ids)
+            review_ids = [pk for pk, _, _ in rows]
+            # Комментарии, добавленные после удаления комментариев
+            # пачки и до блокировки отзывов.
+            late = _locked(Comment, ('pk', 'review_id', 'is_hidden'),
+                           review_id__in=review_ids)
+            _delete_comment_rows(late)
+            Review.objects.filter(
+                pk__in=review_ids
+            )._raw_delete(Review.objects.db)
+            counters.removed(Review, [title_id for _, title_id, hidden
+                                      in rows if not hidden])
+            events.record_deleted(Review, review_ids)
+            _refresh_titles(sorted({title_id for _, title_id, _ in rows}))
+        _invalidate(Review, [(pk, title_id) for pk, title_id, _ in rows])
+        deleted['reviews'] += len(rows)
+        deleted['comments'] += len(late)
+    return deleted
+
+
+def set_hidden(model, queryset, hidden, batch_size):
+    """
+    Скрытие (hidden=True) или возврат скрытых отзывов или комментариев
+    пачками. Возвращает число изменённых объектов.
+    """
+    changed = 0
+    fields = ('pk', PARENT_FIELDS[model])
+    queryset = queryset.filter(is_hidden=not hidden)
+    for batch in batches(queryset, ('pk',), batch_size):
+        with transaction.atomic():
+            rows = _locked(model, fields, pk__in=[pk for pk, in batch],
+                           is_hidden=not hidden)
+            ids = [pk for pk, _ in rows]
+            model.objects.filter(pk__in=ids).update(is_hidden=hidden)
+            parent_ids = [parent_id for _, parent_id in rows]
+            if hidden:
+                counters.removed(model, parent_ids)
+            else:
+                counters.added(model, parent_ids)
+            events.record_many(model, ids, Event.UPDATE, is_hidden=hidden)
+            if model is Review:
+                _refresh_titles(sorted(set(parent_ids)))
+        _invalidate(model, rows)
+        changed += len(rows)
+    return changed
+
+
+def moderate(action, model, queryset, batch_size=None):
+    """
+    Действие action над отзывами или комментариями queryset.
+    Возвращает число обработанных отзывов и комментариев.
+    """
+    batch_size = batch_size or settings.MODERATION_BATCH_SIZE
+    if action == DELETE and model is Review:
+        return delete_reviews(queryset, batch_size)
+    if action == DELETE:
+        count = delete_comments(queryset, batch_size)
+    else:
+        count = set_hidden(model, queryset, action == HIDE, batch_size)
+    if model is Review:
+        return {'reviews': count, 'comments': 0}
+    return {'reviews': 0, 'comments': count}
@@ -0,0 +1,46 @@
+"""Модуль содержит пагинаторы для больших таблиц."""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+ESTIMATE_THRESHOLD = 100000
+
+
+def estimate_rows(model, using='default'):
+    """
+    Оценка числа строк таблицы модели по статистике планировщика
+    PostgreSQL (pg_class.reltuples). Для других СУБД и для таблиц
+    без собранной статистики возвращает None.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор без полного COUNT(*) для больших таблиц.
+    Для запросов без фильтров число объектов берётся из статистики
+    PostgreSQL, если она больше ESTIMATE_THRESHOLD; для небольших таблиц
+    и отфильтрованных запросов выполняется обычный COUNT(*).
+    """
+    estimate_threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimate_rows(self.object_list.model,
+                                     using=self.object_list.db)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
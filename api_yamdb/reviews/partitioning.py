@@ -0,0 +1,335 @@
+"""
+Модуль содержит секционирование таблиц отзывов и комментариев
+по pub_date (декларативное секционирование PostgreSQL по диапазонам).
+Таблица пересоздаётся как секционированная с помесячными секциями
+{таблица}_pГГГГ_ММ и секцией {таблица}_default для строк вне секций.
+Ограничения PostgreSQL для секционированных таблиц:
+- первичный ключ включает ключ секционирования: (id, pub_date);
+- глобальная уникальность (title, author) отзыва обеспечивается
+  отдельной таблицей reviews_review_unique с ограничением unique_riview,
+  которую ведёт триггер;
+- внешний ключ комментария на отзыв не создаётся, каскадное удаление
+  комментариев выполняет ORM (и фоновое удаление reviews.deletion).
+Индексы, ограничения и триггеры (например, поискового столбца
+reviews.search) переносятся на пересозданную таблицу.
+Все функции принимают соединение Django и работают только с PostgreSQL.
+"""
+from datetime import date
+
+from django.utils import timezone
+
+TABLES = ('reviews_review', 'reviews_comment')
+GUARD_TABLE = 'reviews_review_unique'
+UNIQUE_CONSTRAINT = 'unique_riview'
+DEFAULT_SUFFIX = 'default'
+ARCHIVE_SCHEMA = 'archive'
+
+GUARD_FUNCTION = f'''
+CREATE OR REPLACE FUNCTION {GUARD_TABLE}_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM {GUARD_TABLE}
+        WHERE title_id = OLD.title_id AND author_id = OLD.author_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {GUARD_TABLE} (title_id, author_id)
+        VALUES (NEW.title_id, NEW.author_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+'''
+
+
+def month_start(moment, shift=0):
+    """Первое число месяца moment, сдвинутого на shift месяцев."""
+    months = moment.year * 12 + moment.month - 1 + shift
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(table, start):
+    return f'{table}_p{start:%Y_%m}'
+
+
+def _bounds(start):
+    return (f"FOR VALUES FROM ('{start} 00:00:00+00') "
+            f"TO ('{month_start(start, 1)} 00:00:00+00')")
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT relkind FROM pg_class WHERE oid = %s::regclass', [table]
+        )
+        return cursor.fetchone()[0] == 'p'
+
+
+def partitions(connection, table):
+    """Имена секций таблицы, кроме секции по умолчанию, по возрастанию."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = %s::regclass',
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(name for name in names
+                  if name != f'{table}_{DEFAULT_SUFFIX}')
+
+
+def _quote(connection, name):
+    return connection.ops.quote_name(name)
+
+
+def create_partition(cursor, connection, table, start):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS '
+        f'{_quote(connection, partition_name(table, start))} '
+        f'PARTITION OF {_quote(connection, table)} {_bounds(start)}'
+    )
+
+
+def ensure_partitions(connection, months_ahead, now=None):
+    """
+    Создание секций от текущего месяца на months_ahead месяцев вперёд
+    для всех секционированных таблиц. Возвращает имена новых секций.
+    """
+    current = month_start(now or timezone.now())
+    created = []
+    with connection.cursor() as cursor:
+        for table in TABLES:
+            if not is_partitioned(connection, table):
+                continue
+            existing = set(partitions(connection, table))
+            for shift in range(months_ahead + 1):
+                start = month_start(current, shift)
+                if partition_name(table, start) in existing:
+                    continue
+                create_partition(cursor, connection, table, start)
+                created.append(partition_name(table, start))
+    return created
+
+
+def detach_partitions(connection, months_kept, archive=False, now=None):
+    """
+    Отсоединение секций, которые целиком старше months_kept месяцев.
+    При archive секции переносятся в схему archive, иначе остаются
+    отдельными таблицами в текущей схеме. Возвращает их имена.
+    """
+    cutoff = month_start(now or timezone.now(), -months_kept)
+    detached = []
+    with connection.cursor() as cursor:
+        if archive:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}')
+        for table in TABLES:
+            if not is_partitioned(connection, table):
+                continue
+            for name in partitions(connection, table):
+                year, month = name[len(table) + 2:].split('_')
+                if month_start(date(int(year), int(month), 1), 1) > cutoff:
+                    continue
+                cursor.execute(
+                    f'ALTER TABLE {_quote(connection, table)} '
+                    f'DETACH PARTITION {_quote(connection, name)}'
+                )
+                if archive:
+                    cursor.execute(
+                        f'ALTER TABLE {_quote(connection, name)} '
+                        f'SET SCHEMA {ARCHIVE_SCHEMA}'
+                    )
+                detached.append(name)
+    return detached
+
+
+def default_rows(connection):
+    """Число строк в секциях по умолчанию: им не нашлось секции."""
+    counts = {}
+    with connection.cursor() as cursor:
+        for table in TABLES:
+            if not is_partitioned(connection, table):
+                continue
+            cursor.execute(
+                f'SELECT count(*) FROM '
+                f'{_quote(connection, f"{table}_{DEFAULT_SUFFIX}")}'
+            )
+            counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def _definitions(cursor, table):
+    """
+    Индексы, исходящие и входящие внешние ключи, CHECK и триггеры таблицы.
+    """
+    cursor.execute(
+        'SELECT indexdef FROM pg_indexes '
+        'JOIN pg_class index ON index.relname = pg_indexes.indexname '
+        'WHERE tablename = %s AND NOT EXISTS ('
+        '    SELECT 1 FROM pg_constraint WHERE conindid = index.oid'
+        ')',
+        [table],
+    )
+    # Индексы секционированной таблицы определены как ON ONLY,
+    # без ONLY индекс создаётся и на всех секциях.
+    indexes = [row[0].replace(' ON ONLY ', ' ON ')
+               for row in cursor.fetchall()]
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE conrelid = %s::regclass AND contype IN ('f', 'c') "
+        'AND conparentid = 0',
+        [table],
+    )
+    outgoing = cursor.fetchall()
+    cursor.execute(
+        'SELECT conrelid::regclass::text, conname, '
+        'pg_get_constraintdef(oid) FROM pg_constraint '
+        "WHERE confrelid = %s::regclass AND contype = 'f' "
+        'AND conparentid = 0',
+        [table],
+    )
+    incoming = cursor.fetchall()
+    # Триггеры секций и внешних ключей внутренние, их создаёт PostgreSQL.
+    cursor.execute(
+        'SELECT pg_get_triggerdef(oid) FROM pg_trigger '
+        'WHERE tgrelid = %s::regclass AND NOT tgisinternal',
+        [table],
+    )
+    triggers = [row[0] for row in cursor.fetchall()]
+    return indexes, outgoing, incoming, triggers
+
+
+def _rebuild(connection, table, partitioned, months_ahead):
+    """
+    Пересоздание таблицы как секционированной или обычной с переносом
+    данных, индексов, ограничений, триггеров и последовательности id.
+    """
+    quoted = _quote(connection, table)
+    new = _quote(connection, f'{table}_new')
+    with connection.cursor() as cursor:
+        indexes, outgoing, incoming, triggers = _definitions(cursor, table)
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+        for referencing, name, _ in incoming:
+            cursor.execute(f'ALTER TABLE {referencing} '
+                           f'DROP CONSTRAINT {_quote(connection, name)}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+        if partitioned:
+            cursor.execute(
+                f'CREATE TABLE {new} (LIKE {quoted} INCLUDING DEFAULTS) '
+                f'PARTITION BY RANGE (pub_date)'
+            )
+            cursor.execute(f'SELECT min(pub_date) FROM {quoted}')
+            oldest = cursor.fetchone()[0] or timezone.now()
+            start = month_start(oldest)
+            last = month_start(timezone.now(), months_ahead)
+            while start <= last:
+                cursor.execute(
+                    f'CREATE TABLE '
+                    f'{_quote(connection, partition_name(table, start))} '
+                    f'PARTITION OF {new} {_bounds(start)}'
+                )
+                start = month_start(start, 1)
+            cursor.execute(
+                f'CREATE TABLE '
+                f'{_quote(connection, f"{table}_{DEFAULT_SUFFIX}")} '
+                f'PARTITION OF {new} DEFAULT'
+            )
+        else:
+            cursor.execute(
+                f'CREATE TABLE {new} (LIKE {quoted} INCLUDING DEFAULTS)'
+            )
+        cursor.execute(f'INSERT INTO {new} SELECT * FROM {quoted}')
+        cursor.execute(f'DROP TABLE {quoted}')
+        cursor.execute(f'ALTER TABLE {new} RENAME TO {quoted}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quoted}.id')
+        key = '(id, pub_date)' if partitioned else '(id)'
+        cursor.execute(
+            f'ALTER TABLE {quoted} ADD CONSTRAINT '
+            f'{_quote(connection, f"{table}_pkey")} PRIMARY KEY {key}'
+        )
+        for definition in indexes + triggers:
+            cursor.execute(definition)
+        for name, definition in outgoing:
+            cursor.execute(f'ALTER TABLE {quoted} ADD CONSTRAINT '
+                           f'{_quote(connection, name)} {definition}')
+        if not partitioned:
+            for referencing, name, definition in incoming:
+                cursor.execute(f'ALTER TABLE {referencing} ADD CONSTRAINT '
+                               f'{_quote(connection, name)} {definition}')
+    return incoming
+
+
+def _review_uniqueness(connection, partitioned):
+    quoted = _quote(connection, 'reviews_review')
+    guard = _quote(connection, GUARD_TABLE)
+    with connection.cursor() as cursor:
+        if partitioned:
+            cursor.execute(
+                f'CREATE TABLE {guard} ('
+                f'title_id integer NOT NULL, author_id integer NOT NULL, '
+                f'CONSTRAINT {UNIQUE_CONSTRAINT} '
+                f'PRIMARY KEY (title_id, author_id))'
+            )
+            cursor.execute(f'INSERT INTO {guard} '
+                           f'SELECT title_id, author_id FROM {quoted}')
+            cursor.execute(GUARD_FUNCTION)
+            cursor.execute(
+                f'CREATE TRIGGER {GUARD_TABLE}_sync '
+                f'AFTER INSERT OR DELETE OR UPDATE OF title_id, author_id '
+                f'ON {quoted} FOR EACH ROW '
+                f'EXECUTE PROCEDURE {GUARD_TABLE}_sync()'
+            )
+        else:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {GUARD_TABLE}_sync '
+                           f'ON {quoted}')
+            cursor.execute(f'DROP FUNCTION IF EXISTS {GUARD_TABLE}_sync()')
+            cursor.execute(f'DROP TABLE IF EXISTS {guard}')
+            cursor.execute(
+                f'ALTER TABLE {quoted} ADD CONSTRAINT {UNIQUE_CONSTRAINT} '
+                f'UNIQUE (title_id, author_id)'
+            )
+
+
+def _check_deferred(connection):
+    # Отложенные проверки внешних ключей из текущей транзакции
+    # не дают удалить таблицу, выполняем их сразу.
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+def partition(connection, months_ahead=3):
+    """
+    Перевод таблиц отзывов и комментариев на секционирование.
+    Уже секционированные таблицы пропускаются.
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    if is_partitioned(connection, 'reviews_review'):
+        return False
+    _check_deferred(connection)
+    # Комментарии сначала: их внешний ключ на отзыв удаляется
+    # при пересоздании отзывов и не восстанавливается.
+    _rebuild(connection, 'reviews_comment', True, months_ahead)
+    _rebuild(connection, 'reviews_review', True, months_ahead)
+    _review_uniqueness(connection, True)
+    return True
+
+
+def unpartition(connection):
+    """Возврат таблиц отзывов и комментариев к обычным."""
+    if connection.vendor != 'postgresql':
+        return False
+    if not is_partitioned(connection, 'reviews_review'):
+        return False
+    _check_deferred(connection)
+    _rebuild(connection, 'reviews_review', False, 0)
+    _review_uniqueness(connection, False)
+    _rebuild(connection, 'reviews_comment', False, 0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'ALTER TABLE reviews_comment ADD CONSTRAINT '
+            'reviews_comment_review_id_fk_reviews_review_id '
+            'FOREIGN KEY (review_id) REFERENCES reviews_review (id) '
+            'DEFERRABLE INITIALLY DEFERRED'
+        )
+    return True
@@ -0,0 +1,141 @@
+"""
+Модуль содержит модель чтения произведений: таблицу TitleDocument
+с готовым документом JSON произведения в том виде, в каком его отдаёт
+API (поля ReadTitleSerializer). Документ пересобирается обработчиками
+сигналов в транзакции изменения произведения, его жанров, категории
+или отзывов, поэтому чтение списка и произведения не соединяет таблицы
+и не сериализует модели. Средняя оценка берётся из TitleStats.
+Изменения в обход моделей исправляют rebuild() и check(fix=True).
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from .leaderboards import average_rating
+from .models import GenreTitle, Title, TitleDocument
+
+
+def _genres(title_ids):
+    genres = {title_id: [] for title_id in title_ids}
+    rows = (GenreTitle.objects.filter(title_id__in=title_ids)
+            .order_by('genre__name', 'genre_id')
+            .values_list('title_id', 'genre__name', 'genre__slug'))
+    for title_id, name, slug in rows:
+        genres[title_id].append({'name': name, 'slug': slug})
+    return genres
+
+
+def render_many(title_ids):
+    """Документы произведений title_ids: словарь id - строка JSON."""
+    titles = (Title.objects.filter(pk__in=title_ids)
+              .select_related('category')
+              .annotate(rating=average_rating())
+              .order_by())
+    genres = _genres(title_ids)
+    return {
+        title.pk: json.dumps({
+            'id': title.pk,
+            'category': {'name': title.category.name,
+                         'slug': title.category.slug},
+            'genre': genres[title.pk],
+            'rating': None if title.rating is None else int(title.rating),
+            'year': title.year,
+            'name': title.name,
+            'description': title.description,
+            'reviews_count': title.reviews_count,
+        }, ensure_ascii=False)
+        for title in titles
+    }
+
+
+def refresh(title_ids):
+    """
+    Пересборка документов произведений title_ids: UPDATE существующих,
+    INSERT недостающих.
+    """
+    documents = render_many(list(set(title_ids)))
+    created = [
+        TitleDocument(title_id=title_id, document=document)
+        for title_id, document in documents.items()
+        if not TitleDocument.objects.filter(title_id=title_id).update(
+            document=document
+        )
+    ]
+    TitleDocument.objects.bulk_create(created, ignore_conflicts=True)
+
+
+def _chunks(queryset, chunk_size):
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def rebuild(chunk_size=None):
+    """
+    Полная пересборка документов пачками по chunk_size произведений,
+    каждая пачка - в своей транзакции. Возвращает число документов.
+    """
+    chunk_size = chunk_size or settings.TITLE_DOCUMENT_CHUNK_SIZE
+    count = 0
+    for title_ids in _chunks(Title.objects.all(), chunk_size):
+        documents = render_many(title_ids)
+        with transaction.atomic():
+            TitleDocument.objects.filter(title_id__in=title_ids).delete()
+            TitleDocument.objects.bulk_create(
+                TitleDocument(title_id=title_id, document=document)
+                for title_id, document in documents.items()
+            )
+        count += len(documents)
+    return count
+
+
+def check(fix=False, chunk_size=None):
+    """
+    Сравнение сохранённых документов с пересобранными.
+    Возвращает списки id произведений без документа и с устаревшим
+    документом; при fix такие документы пересобираются.
+    """
+    chunk_size = chunk_size or settings.TITLE_DOCUMENT_CHUNK_SIZE
+    missing, stale = [], []
+    for title_ids in _chunks(Title.objects.all(), chunk_size):
+        stored = dict(TitleDocument.objects.filter(title_id__in=title_ids)
+                      .values_list('title_id', 'document'))
+        for title_id, document in render_many(title_ids).items():
+            if title_id not in stored:
+                missing.append(title_id)
+            elif json.loads(stored[title_id]) != json.loads(document):
+                stale.append(title_id)
+    if fix and (missing or stale):
+        with transaction.atomic():
+            refresh(missing + stale)
+    return missing, stale
+
+
+def documents(title_ids):
+    """
+    Документы произведений title_ids в том же порядке.
+    Документ без строки в таблице собирается на лету.
+    """
+    stored = dict(TitleDocument.objects.filter(title_id__in=title_ids)
+                  .values_list('title_id', 'document'))
+    absent = [title_id for title_id in title_ids if title_id not in stored]
+    if absent:
+        stored.update(render_many(absent))
+    return [json.loads(stored[title_id]) for title_id in title_ids
+            if title_id in stored]
+
+
+def document(title_id):
+    """
+    Документ неудаляемого произведения title_id одним запросом
+    или None, если такого произведения нет.
+    """
+    stored = (TitleDocument.objects
+              .filter(title_id=title_id, title__is_deleted=False)
+              .values_list('document', flat=True).first())
+    if stored is not None:
+        return json.loads(stored)
+    if Title.objects.filter(pk=title_id, is_deleted=False).exists():
+        return json.loads(render_many([title_id])[title_id])
+    return None
@@ -0,0 +1,286 @@
+"""
+Модуль содержит полнотекстовый поиск по текстам отзывов и комментариев.
+Результаты упорядочены по убыванию релевантности и id, страница
+выбирается условием (релевантность, id) < курсора, поэтому её стоимость
+не зависит от номера страницы. Видимость (скрытые объекты, удаляемые
+произведения) задаёт queryset, который передаёт вызывающий.
+PostgreSQL: у таблиц отзывов и комментариев есть столбец search_vector
+(tsvector), которого нет в моделях. Его заполняет триггер при вставке
+и изменении текста, по нему построен GIN-индекс. Запрос разбирается
+websearch_to_tsquery (слова, "фразы", or, -исключение), релевантность -
+ts_rank. Столбец, триггер и индекс создаёт миграция (install()),
+секционирование переносит их при пересоздании таблиц.
+Другие СУБД (SQLite в разработке): инвертированный индекс в памяти
+процесса. Он строится при первом поиске и перед каждым поиском догоняет
+изменения по журналу событий (reviews.events). Индекс перестраивается
+целиком, если последнее учтённое событие пропало или стало другим
+(откат транзакции, после которого SQLite выдаёт те же id заново), или
+если число строк, максимальный id и суммарная длина текстов таблицы
+не совпадают с индексом (изменения в обход журнала, например загрузка
+фикстур). Запрос - слова, которые должны встретиться все,
+без морфологии.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.db import connections
+from django.db.models import Count, FloatField, Max, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+
+from .events import MODELS as EVENT_MODELS
+from .models import Comment, Event, Review
+
+MODELS = (Review, Comment)
+COLUMN = 'search_vector'
+CONFIG = 'russian'
+TSQUERY = f"websearch_to_tsquery('{CONFIG}', %s)"
+INDEX_CHUNK_SIZE = 1000
+WORD = re.compile(r'\w+')
+
+
+def _names(connection, model):
+    table = model._meta.db_table
+    return (connection.ops.quote_name(table),
+            connection.ops.quote_name(f'{table}_{COLUMN}'),
+            connection.ops.quote_name(f'{table}_{COLUMN}_idx'))
+
+
+def install(connection):
+    """
+    Создание столбца search_vector, триггера и GIN-индекса
+    и заполнение столбца для существующих строк. Только для PostgreSQL.
+    """
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        for model in MODELS:
+            table, trigger, index = _names(connection, model)
+            cursor.execute(f'ALTER TABLE {table} '
+                           f'ADD COLUMN IF NOT EXISTS {COLUMN} tsvector')
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger} ON {table}')
+            cursor.execute(
+                f'CREATE TRIGGER {trigger} '
+                f'BEFORE INSERT OR UPDATE OF text ON {table} '
+                f'FOR EACH ROW EXECUTE PROCEDURE '
+                f"tsvector_update_trigger({COLUMN}, 'pg_catalog.{CONFIG}', "
+                f'text)'
+            )
+            cursor.execute(f"UPDATE {table} SET {COLUMN} = "
+                           f"to_tsvector('{CONFIG}', text)")
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index} '
+                           f'ON {table} USING gin ({COLUMN})')
+    return True
+
+
+def uninstall(connection):
+    """Удаление индекса, триггера и столбца search_vector."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        for model in MODELS:
+            table, trigger, index = _names(connection, model)
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger} ON {table}')
+            cursor.execute(f'ALTER TABLE {table} '
+                           f'DROP COLUMN IF EXISTS {COLUMN}')
+    return True
+
+
+def _vector(connection, model):
+    return f'{connection.ops.quote_name(model._meta.db_table)}.{COLUMN}'
+
+
+def search_postgres(queryset, query, after=None, limit=20):
+    """Поиск по столбцу search_vector, см. search()."""
+    connection = connections[queryset.db]
+    vector = _vector(connection, queryset.model)
+    rank = f'ts_rank({vector}, {TSQUERY}, 1)::float8'
+    queryset = queryset.annotate(
+        search_rank=RawSQL(rank, [query], output_field=FloatField())
+    ).extra(where=[f'{vector} @@ {TSQUERY}'], params=[query])
+    if after is not None:
+        pk = (f'{connection.ops.quote_name(queryset.model._meta.db_table)}.'
+              f'{connection.ops.quote_name(queryset.model._meta.pk.column)}')
+        queryset = queryset.extra(
+            where=[f'({rank}, {pk}) < (%s::float8, %s)'],
+            params=[query, *after]
+        )
+    return list(queryset.order_by('-search_rank', '-pk')[:limit])
+
+
+def words(text):
+    """Слова текста в нижнем регистре, ё заменяется на е."""
+    return WORD.findall(text.lower().replace('ё', 'е'))
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс текстов отзывов или комментариев
+    в памяти процесса: слово - {id объекта: число вхождений}.
+    Содержит все объекты, включая скрытые: видимость проверяется
+    по базе при выборке страницы.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+        self.last_event = None
+        self.postings = defaultdict(dict)
+        self.documents = {}
+
+    def fingerprint(self):
+        """Число строк, максимальный id и суммарная длина текстов."""
+        current = self.model.objects.aggregate(
+            count=Count('pk'), last=Max('pk'), length=Sum(Length('text'))
+        )
+        return current['count'], current['last'], current['length'] or 0
+
+    def indexed(self):
+        return (len(self.documents), max(self.documents, default=None),
+                sum(length for _, _, length in self.documents.values()))
+
+    def add(self, pk, text):
+        self.remove(pk)
+        counts = Counter(words(text))
+        for word, count in counts.items():
+            self.postings[word][pk] = count
+        self.documents[pk] = (set(counts), sum(counts.values()), len(text))
+
+    def remove(self, pk):
+        if pk not in self.documents:
+            return
+        for word in self.documents.pop(pk)[0]:
+            self.postings[word].pop(pk, None)
+            if not self.postings[word]:
+                del self.postings[word]
+
+    def load(self, pks=None):
+        queryset = self.model.objects.order_by('pk')
+        if pks is not None:
+            queryset = queryset.filter(pk__in=pks)
+        for pk, text in queryset.values_list('pk', 'text').iterator(
+            chunk_size=INDEX_CHUNK_SIZE
+        ):
+            self.add(pk, text)
+
+    def rebuild(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.last_event = (Event.objects.order_by('-id')
+                           .values_list('id', 'created').first() or (0, None))
+        self.load()
+
+    def catch_up(self):
+        """
+        Переиндексация объектов из событий после последнего учтённого.
+        Возвращает False, если последнее учтённое событие не найдено.
+        """
+        last_id, last_created = self.last_event
+        if last_id and not Event.objects.filter(
+            id=last_id, created=last_created
+        ).exists():
+            return False
+        latest = (Event.objects.order_by('-id')
+                  .values_list('id', 'created').first() or (0, None))
+        if latest[0] < last_id:
+            return False
+        changed = sorted(set(
+            Event.objects.filter(id__gt=last_id, id__lte=latest[0],
+                                 model=EVENT_MODELS[self.model])
+            .values_list('object_id', flat=True)
+        ))
+        self.last_event = latest
+        for pk in changed:
+            self.remove(pk)
+        for start in range(0, len(changed), INDEX_CHUNK_SIZE):
+            self.load(changed[start:start + INDEX_CHUNK_SIZE])
+        return True
+
+    def sync(self):
+        """Приведение индекса к содержимому таблицы."""
+        with self.lock:
+            if (
+                self.last_event is not None
+                and self.catch_up()
+                and self.fingerprint() == self.indexed()
+            ):
+                return
+            self.rebuild()
+
+    def ranked(self, query):
+        """
+        Пары (релевантность, id) объектов, содержащих все слова
+        запроса, по убыванию. Релевантность - сумма tf-idf слов,
+        делённая на 1 + логарифм длины текста, как ts_rank(..., 1).
+        """
+        terms = set(words(query))
+        with self.lock:
+            postings = [self.postings.get(term, {}) for term in terms]
+            if not postings or not all(postings):
+                return []
+            total = len(self.documents)
+            matched = set.intersection(*(set(found) for found in postings))
+            weights = [math.log(1 + total / len(found)) for found in postings]
+            ranked = [
+                (sum(found[pk] * weight
+                     for found, weight in zip(postings, weights))
+                 / (1 + math.log(self.documents[pk][1])), pk)
+                for pk in matched
+            ]
+        return sorted(ranked, reverse=True)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(model):
+    """Инвертированный индекс модели, приведённый к содержимому таблицы."""
+    with _indexes_lock:
+        index = _indexes.setdefault(model, InvertedIndex(model))
+    index.sync()
+    return index
+
+
+def search_index(queryset, query, after=None, limit=20):
+    """Поиск по инвертированному индексу в памяти, см. search()."""
+    ranked = get_index(queryset.model).ranked(query)
+    if after is not None:
+        after = tuple(after)
+        ranked = [item for item in ranked if item < after]
+    results = []
+    for start in range(0, len(ranked), INDEX_CHUNK_SIZE):
+        chunk = ranked[start:start + INDEX_CHUNK_SIZE]
+        visible = queryset.in_bulk([pk for _, pk in chunk])
+        for rank, pk in chunk:
+            if pk in visible:
+                visible[pk].search_rank = rank
+                results.append(visible[pk])
+                if len(results) == limit:
+                    return results
+    return results
+
+
+def search(queryset, query, after=None, limit=20):
+    """
+    Объекты queryset (отзывы или комментарии), тексты которых
+    подходят под запрос query, не больше limit. after - пара
+    (релевантность, id) последнего объекта предыдущей страницы.
+    У объектов заполнен атрибут search_rank.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return search_postgres(queryset, query, after, limit)
+    return search_index(queryset, query, after, limit)
+
+
+def matching(model, query):
+    """Id объектов model, подходящих под запрос: для поиска в админке."""
+    connection = connections[model.objects.db]
+    if connection.vendor == 'postgresql':
+        return model.objects.extra(
+            where=[f'{_vector(connection, model)} @@ {TSQUERY}'],
+            params=[query]
+        ).values('pk')
+    return [pk for _, pk in get_index(model).ranked(query)]
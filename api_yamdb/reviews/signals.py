@@ -0,0 +1,249 @@
+"""Модуль содержит обработчики сигналов моделей."""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, events, invalidation, leaderboards, read_model
+from .models import (Category, Comment, Event, Genre, GenreTitle, Review,
+                     Title, TitleDocument, TitleStats)
+
+PARENT_FIELDS = {
+    Review: 'title_id',
+    Comment: 'review_id',
+}
+
+
+def count_cache_key(model, parent_id):
+    """Ключ кэша с числом объектов model у родителя parent_id."""
+    return f'count:{model._meta.label_lower}:{parent_id}'
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def invalidate_parent_count(sender, instance, created=True, **kwargs):
+    """
+    Сброс закэшированного числа отзывов или комментариев родителя.
+    Внутри транзакции ключ сбрасывается ещё раз после фиксации:
+    число, посчитанное параллельным запросом до фиксации, не останется
+    в кэше.
+    """
+    if not created:
+        return
+    parent_id = getattr(instance, PARENT_FIELDS[sender])
+    keys = [count_cache_key(sender, parent_id)]
+    invalidation.invalidate(delete=keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: invalidation.apply(cache, delete=keys))
+
+
+def response_generation_key(scope):
+    """Ключ кэша с поколением закэшированных ответов области scope."""
+    return f'response:generation:{scope}'
+
+
+def get_response_generations(scopes):
+    """
+    Поколения областей scopes. Отсутствующее поколение начинается
+    с текущего времени, чтобы после вытеснения ключа из кэша
+    не совпасть с одним из прежних.
+    """
+    keys = [response_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_response_generations(*scopes):
+    """
+    Сброс закэшированных ответов областей scopes сменой поколения
+    во всех процессах (через шину инвалидации). Внутри транзакции
+    поколение в своём процессе меняется ещё раз после фиксации:
+    ответ, собранный до фиксации по старым данным, не останется
+    под новым поколением. Остальные процессы получают сообщение
+    шины уже после фиксации.
+    """
+    keys = [response_generation_key(scope) for scope in scopes]
+    invalidation.invalidate(bump=keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(
+            lambda: invalidation.apply(cache, bump=keys)
+        )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def increment_parent_counter(sender, instance, created, raw=False,
+                             **kwargs):
+    """Увеличение счётчика отзывов произведения или комментариев отзыва."""
+    if created and not raw:
+        counters.change(sender, getattr(instance, PARENT_FIELDS[sender]), 1)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def decrement_parent_counter(sender, instance, **kwargs):
+    """
+    Уменьшение счётчика родителя, в том числе при каскадном удалении:
+    Collector удаляет дочерние объекты раньше родителя. Скрытый объект
+    в счётчике уже не учтён.
+    """
+    if not instance.is_hidden:
+        counters.change(sender, getattr(instance, PARENT_FIELDS[sender]),
+                        -1)
+
+
+@receiver(post_save, sender=Review)
+def update_leaderboards_on_save(sender, instance, created, raw=False,
+                                **kwargs):
+    """Учёт нового или изменённого отзыва в рейтингах произведения."""
+    if raw:
+        return
+    if created:
+        leaderboards.review_added(instance)
+    else:
+        leaderboards.refresh_title(instance.title_id)
+
+
+@receiver(post_delete, sender=Review)
+def update_leaderboards_on_delete(sender, instance, **kwargs):
+    """Пересчёт рейтингов произведения после удаления отзыва."""
+    leaderboards.refresh_title(instance.title_id)
+
+
+@receiver(post_save, sender=Title)
+def update_leaderboards_category(sender, instance, created, **kwargs):
+    """Перенос категории произведения в строку его рейтингов."""
+    if not created:
+        TitleStats.objects.filter(title_id=instance.pk).update(
+            category_id=instance.category_id
+        )
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Title)
+def record_save_event(sender, instance, created, raw=False, **kwargs):
+    """Запись создания или изменения объекта в журнал событий."""
+    if not raw:
+        events.record(instance, Event.CREATE if created else Event.UPDATE)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Title)
+def record_delete_event(sender, instance, **kwargs):
+    """Запись удаления объекта, в том числе каскадного, в журнал событий."""
+    events.record(instance, Event.DELETE)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def refresh_title_document(sender, instance, raw=False, **kwargs):
+    """
+    Пересборка документа произведения после изменения произведения,
+    связи с жанром или отзыва. Обработчик подключён после счётчиков
+    и рейтингов и видит их новые значения.
+    """
+    if raw:
+        return
+    read_model.refresh([instance.pk if sender is Title
+                        else instance.title_id])
+
+
+@receiver(post_delete, sender=Title)
+def delete_title_document(sender, instance, **kwargs):
+    """Удаление документа вместе с произведением."""
+    TitleDocument.objects.filter(title_id=instance.pk).delete()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def refresh_title_document_genres(sender, instance, action, reverse,
+                                  pk_set, **kwargs):
+    """Пересборка документов после изменения жанров через Title.genre."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        read_model.refresh([instance.pk])
+    elif pk_set:
+        read_model.refresh(pk_set)
+    else:
+        read_model.refresh(Title.objects.filter(genre=instance)
+                           .values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def refresh_related_title_documents(sender, instance, created, raw=False,
+                                    **kwargs):
+    """Пересборка документов произведений изменённой категории или жанра."""
+    if created or raw:
+        return
+    if sender is Category:
+        titles = Title.objects.filter(category=instance)
+    else:
+        titles = Title.objects.filter(genre=instance)
+    title_ids = list(titles.values_list('pk', flat=True))
+    for start in range(0, len(title_ids), settings.TITLE_DOCUMENT_CHUNK_SIZE):
+        read_model.refresh(
+            title_ids[start:start + settings.TITLE_DOCUMENT_CHUNK_SIZE]
+        )
+
+
+def get_parent_count(queryset, parent_id):
+    """
+    Число объектов queryset у родителя parent_id из кэша,
+    при промахе - COUNT(*) с сохранением в кэш.
+    Возвращает пару (число, попадание в кэш).
+    """
+    key = count_cache_key(queryset.model, parent_id)
+    count = cache.get(key)
+    if count is not None:
+        return count, True
+    count = queryset.count()
+    cache.set(key, count, settings.COUNT_CACHE_PARENT_TIMEOUT)
+    return count, False
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def invalidate_responses(sender, instance, **kwargs):
+    """
+    Сброс закэшированных ответов API: списка и страниц произведений,
+    списков отзывов произведения и комментариев отзыва.
+    """
+    if sender is Comment:
+        bump_response_generations(f'review:{instance.review_id}')
+    elif sender is Review:
+        bump_response_generations('titles', f'title:{instance.title_id}',
+                                  f'review:{instance.pk}')
+    elif sender is Title:
+        bump_response_generations('titles', f'title:{instance.pk}')
+    else:
+        bump_response_generations('titles')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_responses_genres(sender, action, **kwargs):
+    """Сброс закэшированных ответов после изменения жанров произведений."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_response_generations('titles')
@@ -0,0 +1,180 @@
+"""
+Модуль содержит пакетный расчёт похожих произведений.
+Каждое произведение описывается двумя векторами: жанры из GenreTitle
+и оценки пользователей из Review за вычетом средней оценки
+пользователя. Сходство - взвешенная сумма косинусных мер по жанрам
+и по оценкам. Векторы хранятся разреженными матрицами CSR (SciPy),
+строки таблиц читаются курсором кусками по FETCH_SIZE прямо в массивы
+NumPy. Соседи считаются разреженным умножением блоками по chunk_size
+строк, в таблицу SimilarTitle попадают top-k соседей с положительным
+сходством. Память: ненулевые элементы матриц (связи с жанрами
+и отзывы) и ненулевые сходства одного блока.
+"""
+from itertools import chain, islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from scipy import sparse
+
+from .leaderboards import average_rating
+from .models import (GenreTitle, Review, SimilarityBuild, SimilarTitle,
+                     Title)
+
+FETCH_SIZE = 10000
+
+
+def _fetch(values, title_ids):
+    """
+    Строки values_list из целых чисел, первое поле - id произведения,
+    массивом (строк, полей). id произведения заменяется номером
+    в title_ids, строки других произведений отбрасываются по ходу чтения.
+    """
+    width = len(values._fields)
+    rows = values.order_by().iterator(chunk_size=FETCH_SIZE)
+    chunks = [np.empty((0, width), dtype=np.int64)]
+    while True:
+        chunk = np.fromiter(
+            chain.from_iterable(islice(rows, FETCH_SIZE)), dtype=np.int64
+        ).reshape(-1, width)
+        if not len(chunk):
+            return np.concatenate(chunks)
+        positions = np.searchsorted(title_ids, chunk[:, 0])
+        found = positions < len(title_ids)
+        found[found] = title_ids[positions[found]] == chunk[found, 0]
+        chunk[:, 0] = positions
+        chunks.append(chunk[found])
+
+
+def _normalized(rows, columns, values, shape):
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, columns)),
+        shape=shape, dtype=np.float32
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms.ravel()).dot(matrix).tocsr()
+
+
+def _index(keys):
+    return {key: position for position, key in enumerate(keys)}
+
+
+def build_vectors(title_ids):
+    """
+    Нормированные разреженные матрицы жанров и оценок для произведений
+    title_ids (по возрастанию). Строка i обеих матриц - title_ids[i].
+    """
+    title_ids = np.asarray(title_ids, dtype=np.int64)
+    pairs = _fetch(GenreTitle.objects.values_list('title_id', 'genre_id'),
+                   title_ids)
+    genres, columns = np.unique(pairs[:, 1], return_inverse=True)
+    genre_matrix = _normalized(pairs[:, 0], columns, np.ones(len(pairs)),
+                               (len(title_ids), len(genres)))
+
+    reviews = _fetch(Review.objects.filter(is_hidden=False)
+                     .values_list('title_id', 'author_id', 'score'),
+                     title_ids)
+    authors, columns = np.unique(reviews[:, 1], return_inverse=True)
+    totals = np.bincount(columns, weights=reviews[:, 2],
+                         minlength=len(authors))
+    counts = np.bincount(columns, minlength=len(authors))
+    centered = reviews[:, 2] - totals[columns] / np.maximum(counts[columns], 1)
+    rating_matrix = _normalized(reviews[:, 0], columns, centered,
+                                (len(title_ids), len(authors)))
+    return genre_matrix, rating_matrix
+
+
+def nearest(genre_matrix, rating_matrix, rows, limit):
+    """
+    Ближайшие соседи для строк rows.
+    Возвращает пары массивов (индексы соседей, сходство) по строкам.
+    """
+    scores = (
+        genre_matrix[rows].dot(genre_matrix.T)
+        * settings.SIMILAR_GENRE_WEIGHT
+        + rating_matrix[rows].dot(rating_matrix.T)
+        * settings.SIMILAR_RATING_WEIGHT
+    ).tocsr()
+    result = []
+    for position, row in enumerate(rows):
+        bounds = slice(scores.indptr[position], scores.indptr[position + 1])
+        columns, values = scores.indices[bounds], scores.data[bounds]
+        keep = (values > 0) & (columns != row)
+        columns, values = columns[keep], values[keep]
+        if len(values) > limit:
+            top = np.argpartition(-values, limit - 1)[:limit]
+            columns, values = columns[top], values[top]
+        order = np.lexsort((columns, -values))
+        result.append((columns[order], values[order]))
+    return result
+
+
+def changed_titles(build):
+    """
+    Произведения, которые нужно пересчитать после запуска build:
+    получившие отзывы после его начала и созданные после него.
+    """
+    reviewed = (Review.objects.filter(pub_date__gte=build.started)
+                .values_list('title_id', flat=True))
+    created = (Title.objects.filter(pk__gt=build.max_title_id)
+               .values_list('pk', flat=True))
+    return sorted(set(reviewed) | set(created))
+
+
+def build(limit=None, chunk_size=None, incremental=False):
+    """
+    Расчёт похожих произведений и запись в SimilarTitle.
+    При incremental пересчитываются только произведения из
+    changed_titles() последнего запуска, если запусков не было -
+    все произведения. Возвращает запись о запуске SimilarityBuild.
+    """
+    limit = limit or settings.SIMILAR_TITLES_COUNT
+    chunk_size = chunk_size or settings.SIMILAR_CHUNK_SIZE
+    started = timezone.now()
+    title_ids = list(Title.objects.order_by('pk')
+                     .values_list('pk', flat=True))
+    previous = SimilarityBuild.objects.order_by('-started').first()
+    if incremental and previous is not None:
+        targets = changed_titles(previous)
+    else:
+        incremental = False
+        targets = title_ids
+    genre_matrix, rating_matrix = build_vectors(title_ids)
+    positions = _index(title_ids)
+    target_rows = np.array([positions[pk] for pk in targets
+                            if pk in positions], dtype=np.int64)
+    with transaction.atomic():
+        if incremental:
+            SimilarTitle.objects.filter(title_id__in=targets).delete()
+        else:
+            SimilarTitle.objects.all().delete()
+        for start in range(0, len(target_rows), chunk_size):
+            rows = target_rows[start:start + chunk_size]
+            neighbours = nearest(genre_matrix, rating_matrix, rows, limit)
+            SimilarTitle.objects.bulk_create(
+                SimilarTitle(title_id=title_ids[row],
+                             similar_id=title_ids[column],
+                             score=float(score))
+                for row, (columns, scores) in zip(rows, neighbours)
+                for column, score in zip(columns, scores)
+            )
+        return SimilarityBuild.objects.create(
+            started=started,
+            max_title_id=title_ids[-1] if title_ids else 0,
+            titles_count=len(target_rows),
+            incremental=incremental,
+        )
+
+
+def similar_titles(title_id, limit):
+    """Похожие произведения по убыванию сходства с title_id."""
+    return (Title.objects.filter(similar_to__title_id=title_id,
+                                 is_deleted=False)
+            .select_related('category')
+            .prefetch_related('genre')
+            .annotate(similarity=F('similar_to__score'),
+                      rating=average_rating())
+            .order_by('-similarity', 'pk')[:limit])
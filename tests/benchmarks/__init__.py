@@ -0,0 +1,4 @@
+"""
+Набор бенчмарков REST API.
+Запуск: python -m tests.benchmarks (подробнее - в README).
+"""
@@ -0,0 +1,98 @@
+"""
+Запуск бенчмарков из командной строки:
+
+    python -m tests.benchmarks --output results.json
+
+Бенчмарки работают на отдельной тестовой базе, которая создаётся
+и удаляется автоматически. Движок базы задаётся переменными окружения
+DB_ENGINE/DB_NAME, как и для самого проекта.
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'baseline.json')
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='Бенчмарки REST API.')
+    parser.add_argument('-n', '--iterations', type=int, default=None,
+                        help='Число замеров на сценарий.')
+    parser.add_argument('-w', '--warmup', type=int, default=None,
+                        help='Число прогревочных запросов на сценарий.')
+    parser.add_argument('-s', '--scenario', action='append', dest='names',
+                        help='Запускать только указанный сценарий.')
+    parser.add_argument('-o', '--output',
+                        help='Файл для сохранения результатов в JSON.')
+    parser.add_argument('-b', '--baseline', default=BASELINE_PATH,
+                        help='Базовая линия для сравнения.')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='Допустимый рост p95 (0.25 - на 25%%).')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Сохранить результаты как новую базовую линию.')
+    return parser.parse_args()
+
+
+def main():
+    args = _parse_args()
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+
+    from . import runner
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0,
+                                                  autoclobber=True)
+    try:
+        results = runner.run(
+            iterations=args.iterations or runner.DEFAULT_ITERATIONS,
+            warmup=(runner.DEFAULT_WARMUP if args.warmup is None
+                    else args.warmup),
+            names=args.names,
+        )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    baseline = None
+    if os.path.isfile(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if baseline['meta']['database'] != results['meta']['database']:
+            print('Базовая линия снята на другой СУБД: '
+                  f'{baseline["meta"]["database"]}.', file=sys.stderr)
+    print(runner.format_report(results, baseline))
+
+    for path in (args.output, args.update_baseline and args.baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    if baseline is None:
+        return 0
+    regressions = runner.compare(
+        results, baseline,
+        max_regression=(runner.DEFAULT_MAX_REGRESSION
+                        if args.max_regression is None
+                        else args.max_regression),
+    )
+    for regression in regressions:
+        print(f'Регрессия: {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
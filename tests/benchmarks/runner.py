@@ -0,0 +1,278 @@
+"""
+Модуль содержит сценарии бенчмарков REST API и функции измерения.
+Запросы выполняются внутри процесса через тестовый клиент Django,
+поэтому для работы нужна только база данных (SQLite или PostgreSQL).
+"""
+import json
+import math
+import platform
+import time
+from collections import namedtuple
+
+import django
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.middleware import QueryCounter
+from reviews import leaderboards, read_model
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+PERCENTILES = (50, 90, 95, 99)
+DEFAULT_ITERATIONS = 50
+DEFAULT_WARMUP = 5
+DEFAULT_MAX_REGRESSION = 0.25
+REVIEWS_PER_TITLE = 5
+COMMENTS_PER_REVIEW = 2
+CONFIRMATION_CODE = 'benchmark-code'
+
+Scenario = namedtuple('Scenario', ('name', 'build', 'auth', 'status'))
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def seed(titles_count):
+    """
+    Наполнение базы данными для бенчмарков.
+    На каждое произведение создаются отзывы, на каждый отзыв - комментарии.
+    Возвращает словарь с идентификаторами, используемыми в сценариях.
+    """
+    admin = User.objects.create(username='bench_admin',
+                                email='bench_admin@yamdb.local',
+                                role=User.ADMIN)
+    author = User.objects.create(username='bench_author',
+                                 email='bench_author@yamdb.local')
+    User.objects.bulk_create(
+        User(username=f'bench_token_{number}',
+             email=f'bench_token_{number}@yamdb.local',
+             confirmation_code=CONFIRMATION_CODE)
+        for number in range(titles_count)
+    )
+    User.objects.bulk_create(
+        User(username=f'bench_reviewer_{number}',
+             email=f'bench_reviewer_{number}@yamdb.local')
+        for number in range(REVIEWS_PER_TITLE)
+    )
+    reviewers = list(
+        User.objects.filter(username__startswith='bench_reviewer_')
+    )
+    category = Category.objects.create(name='Бенчмарк', slug='bench')
+    genres = [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'bench-{number}')
+        for number in range(3)
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Бенчмарк {number}', year=2000 + number % 20,
+              category=category)
+        for number in range(titles_count)
+    )
+    titles = list(
+        Title.objects.filter(category=category).order_by('pk')
+    )
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles for genre in genres[:2]
+    )
+    Review.objects.bulk_create(
+        Review(title=title, author=reviewer, text='Отзыв', score=7)
+        for title in titles for reviewer in reviewers
+    )
+    reviews = list(
+        Review.objects.filter(title=titles[0]).order_by('pk')
+    )
+    Comment.objects.bulk_create(
+        Comment(review=review, author=reviewer, text='Комментарий')
+        for review in Review.objects.filter(title__in=titles)
+        for reviewer in reviewers[:COMMENTS_PER_REVIEW]
+    )
+    leaderboards.rebuild()
+    read_model.rebuild()
+    return {
+        'admin': admin,
+        'author': author,
+        'category': category.slug,
+        'genre': genres[0].slug,
+        'titles': [title.pk for title in titles],
+        'review': reviews[0].pk,
+    }
+
+
+def _titles_list(data, number):
+    return ('get',
+            f'/api/v1/titles/?genre={data["genre"]}'
+            f'&category={data["category"]}',
+            None)
+
+
+def _title_detail(data, number):
+    return 'get', f'/api/v1/titles/{data["titles"][0]}/', None
+
+
+def _reviews_list(data, number):
+    return 'get', f'/api/v1/titles/{data["titles"][0]}/reviews/', None
+
+
+def _comments_list(data, number):
+    return ('get',
+            f'/api/v1/titles/{data["titles"][0]}/reviews/'
+            f'{data["review"]}/comments/',
+            None)
+
+
+def _review_create(data, number):
+    return ('post',
+            f'/api/v1/titles/{data["titles"][number]}/reviews/',
+            {'text': 'Новый отзыв', 'score': 8})
+
+
+def _signup(data, number):
+    return ('post',
+            '/api/v1/auth/signup/',
+            {'username': f'bench_signup_{number}',
+             'email': f'bench_signup_{number}@yamdb.local'})
+
+
+def _token(data, number):
+    return ('post',
+            '/api/v1/auth/token/',
+            {'username': f'bench_token_{number}',
+             'confirmation_code': CONFIRMATION_CODE})
+
+
+SCENARIOS = (
+    Scenario('titles_list_filtered', _titles_list, False, 200),
+    Scenario('title_detail', _title_detail, False, 200),
+    Scenario('reviews_list', _reviews_list, False, 200),
+    Scenario('comments_list', _comments_list, False, 200),
+    Scenario('review_create', _review_create, True, 201),
+    Scenario('signup', _signup, False, 200),
+    Scenario('token', _token, False, 200),
+)
+
+
+def run_scenario(scenario, data, iterations, warmup):
+    """
+    Прогон одного сценария.
+    Подготовка запроса (build) в замер времени не входит,
+    прогревочные итерации в статистику не попадают.
+    """
+    client = Client()
+    if scenario.auth:
+        token = RefreshToken.for_user(data['author']).access_token
+        client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    timings = []
+    queries = []
+    for number in range(warmup + iterations):
+        method, path, payload = scenario.build(data, number)
+        kwargs = {}
+        if payload is not None:
+            kwargs = {'data': json.dumps(payload),
+                      'content_type': 'application/json'}
+        # Отдельный адрес на каждую итерацию, чтобы замерять обычный
+        # путь запроса, а не ответы троттлинга.
+        kwargs['REMOTE_ADDR'] = f'10.0.{number // 256}.{number % 256}'
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            elapsed = time.perf_counter() - start
+        if response.status_code != scenario.status:
+            raise AssertionError(
+                f'{scenario.name}: {method.upper()} {path} вернул '
+                f'{response.status_code}, ожидался {scenario.status}'
+            )
+        if number >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(counter.count)
+    latency = {f'p{percent}': round(percentile(timings, percent), 3)
+               for percent in PERCENTILES}
+    latency.update(
+        mean=round(sum(timings) / len(timings), 3),
+        min=round(min(timings), 3),
+        max=round(max(timings), 3),
+    )
+    return {
+        'iterations': iterations,
+        'latency_ms': latency,
+        'throughput_rps': round(iterations / (sum(timings) / 1000), 1),
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+    }
+
+
+def run(iterations=DEFAULT_ITERATIONS, warmup=DEFAULT_WARMUP, names=None):
+    """
+    Наполнение базы и прогон выбранных сценариев (по умолчанию - всех).
+    Ожидает, что база данных уже переключена на тестовую.
+    """
+    data = seed(titles_count=warmup + iterations)
+    scenarios = [scenario for scenario in SCENARIOS
+                 if names is None or scenario.name in names]
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+        },
+        'scenarios': {
+            scenario.name: run_scenario(scenario, data, iterations, warmup)
+            for scenario in scenarios
+        },
+    }
+
+
+def compare(results, baseline, max_regression=DEFAULT_MAX_REGRESSION):
+    """
+    Сравнение результатов с базовой линией.
+    Число запросов к БД не должно расти вовсе, p95 задержки - не больше,
+    чем на max_regression. Возвращает список найденных регрессий.
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        if current['queries']['max'] > base['queries']['max']:
+            regressions.append(
+                f'{name}: запросов к БД {current["queries"]["max"]}, '
+                f'в базовой линии {base["queries"]["max"]}'
+            )
+        limit = base['latency_ms']['p95'] * (1 + max_regression)
+        if current['latency_ms']['p95'] > limit:
+            regressions.append(
+                f'{name}: p95 {current["latency_ms"]["p95"]} мс, '
+                f'в базовой линии {base["latency_ms"]["p95"]} мс'
+            )
+    return regressions
+
+
+def format_report(results, baseline=None):
+    """Текстовая таблица результатов для вывода в консоль."""
+    lines = [
+        f'{"сценарий":<22}{"p50":>9}{"p95":>9}{"p99":>9}'
+        f'{"rps":>9}{"SQL":>6}{"Δp95":>9}'
+    ]
+    for name, current in results['scenarios'].items():
+        latency = current['latency_ms']
+        delta = ''
+        if baseline and name in baseline['scenarios']:
+            base = baseline['scenarios'][name]['latency_ms']['p95']
+            delta = f'{(latency["p95"] / base - 1) * 100:+.0f}%'
+        lines.append(
+            f'{name:<22}{latency["p50"]:>9.2f}{latency["p95"]:>9.2f}'
+            f'{latency["p99"]:>9.2f}{current["throughput_rps"]:>9.1f}'
+            f'{current["queries"]["max"]:>6}{delta:>9}'
+        )
+    return '\n'.join(lines)
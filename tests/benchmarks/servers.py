@@ -0,0 +1,230 @@
+"""
+Сравнение WSGI и ASGI под конкурентной нагрузкой:
+
+    python -m tests.benchmarks.servers --duration 10 --clients 32 --slow 8
+
+Бенчмарк наполняет отдельную тестовую базу, по очереди запускает
+gunicorn с конфигурациями gunicorn_conf (WSGI, gthread) и
+gunicorn_asgi_conf (ASGI, uvicorn) и нагружает каждый сервер
+одинаково: clients клиентов без пауз запрашивают списки и карточки
+произведений, отзывов и комментариев, а slow медленных клиентов
+присылают запрос по байту. Для быстрых клиентов считаются пропускная
+способность, задержки и ошибки. Размеры пулов и число воркеров задаются
+переменными окружения GUNICORN_* и ASGI_*, как и в продакшене.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from .__main__ import ROOT_DIR
+
+PROFILES = {
+    'wsgi': ('python:api_yamdb.gunicorn_conf', 'api_yamdb.wsgi:application'),
+    'asgi': ('python:api_yamdb.gunicorn_asgi_conf',
+             'api_yamdb.asgi:application'),
+}
+GUNICORN = 'from gunicorn.app.wsgiapp import run; run()'
+HOST = '127.0.0.1'
+START_TIMEOUT = 30
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(
+        description='Сравнение WSGI и ASGI под нагрузкой.'
+    )
+    parser.add_argument('-d', '--duration', type=float, default=10,
+                        help='Длительность нагрузки на сервер в секундах.')
+    parser.add_argument('-c', '--clients', type=int, default=32,
+                        help='Число быстрых клиентов.')
+    parser.add_argument('-s', '--slow', type=int, default=8,
+                        help='Число медленных клиентов.')
+    parser.add_argument('--slow-delay', type=float, default=0.1,
+                        help='Пауза медленного клиента между байтами.')
+    parser.add_argument('-p', '--profile', action='append', dest='profiles',
+                        choices=sorted(PROFILES),
+                        help='Запускать только указанный профиль.')
+    parser.add_argument('--titles', type=int, default=100,
+                        help='Число произведений в базе.')
+    return parser.parse_args()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _request(path):
+    return (f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\n'
+            'Connection: close\r\n\r\n').encode()
+
+
+async def fetch(port, path, delay=0):
+    """
+    GET-запрос к серверу; возвращает статус ответа.
+    При delay > 0 запрос отправляется по байту с паузами.
+    """
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        request = _request(path)
+        if delay:
+            for position in range(len(request)):
+                writer.write(request[position:position + 1])
+                await writer.drain()
+                await asyncio.sleep(delay)
+        else:
+            writer.write(request)
+            await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def fast_client(port, paths, deadline, stats):
+    number = 0
+    while time.monotonic() < deadline:
+        path = paths[number % len(paths)]
+        number += 1
+        start = time.perf_counter()
+        try:
+            status = await fetch(port, path)
+        except (OSError, IndexError, ValueError):
+            status = None
+        if status == 200:
+            stats['latency'].append((time.perf_counter() - start) * 1000)
+        else:
+            stats['errors'] += 1
+
+
+async def slow_client(port, path, deadline, delay):
+    while time.monotonic() < deadline:
+        try:
+            await fetch(port, path, delay)
+        except (OSError, IndexError, ValueError):
+            await asyncio.sleep(delay)
+
+
+async def load(port, paths, duration, clients, slow, slow_delay):
+    """Нагрузка на сервер; возвращает статистику быстрых клиентов."""
+    stats = {'latency': [], 'errors': 0}
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(fast_client(port, paths[number % len(paths):] + paths, deadline,
+                      stats)
+          for number in range(clients)),
+        *(slow_client(port, paths[0], deadline, slow_delay)
+          for _ in range(slow)),
+    )
+    return stats
+
+
+def summary(stats, duration):
+    from .runner import percentile
+
+    latency = stats['latency'] or [0]
+    return {
+        'requests': len(stats['latency']),
+        'errors': stats['errors'],
+        'throughput_rps': round(len(stats['latency']) / duration, 1),
+        'latency_ms': {f'p{percent}': round(percentile(latency, percent), 2)
+                       for percent in (50, 95, 99)},
+    }
+
+
+def start_server(profile, port, database):
+    config, application = PROFILES[profile]
+    environ = dict(os.environ, DB_NAME=database,
+                   GUNICORN_BIND=f'{HOST}:{port}')
+    if profile == 'asgi':
+        try:
+            import httptools  # noqa: F401
+        except ImportError:
+            environ.setdefault('GUNICORN_WORKER_CLASS',
+                               'uvicorn.workers.UvicornH11Worker')
+    server = subprocess.Popen(
+        [sys.executable, '-c', GUNICORN, '--config', config, application],
+        cwd=os.path.join(ROOT_DIR, 'api_yamdb'), env=environ,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            if asyncio.run(fetch(port, '/api/v1/titles/')) == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'Сервер {profile} не запустился')
+
+
+def benchmark(profile, paths, database, args):
+    port = _free_port()
+    server = start_server(profile, port, database)
+    try:
+        results = {}
+        for name, slow in (('fast', 0), ('slow_clients', args.slow)):
+            stats = asyncio.run(load(port, paths, args.duration,
+                                     args.clients, slow, args.slow_delay))
+            results[name] = summary(stats, args.duration)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def format_report(results):
+    lines = [f'{"профиль":<8}{"нагрузка":<14}{"rps":>9}{"p50":>9}'
+             f'{"p95":>9}{"p99":>9}{"ошибки":>8}']
+    for profile, loads in results.items():
+        for name, current in loads.items():
+            latency = current['latency_ms']
+            lines.append(
+                f'{profile:<8}{name:<14}{current["throughput_rps"]:>9.1f}'
+                f'{latency["p50"]:>9.2f}{latency["p95"]:>9.2f}'
+                f'{latency["p99"]:>9.2f}{current["errors"]:>8}'
+            )
+    return '\n'.join(lines)
+
+
+def main():
+    args = _parse_args()
+
+    import django
+    django.setup()
+
+    from django.db import connection
+
+    from . import runner
+
+    if connection.vendor == 'sqlite':
+        # Серверам нужна база в файле, а не в памяти процесса.
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            tempfile.gettempdir(), 'yamdb_benchmark.sqlite3'
+        )
+    old_name = connection.creation.create_test_db(verbosity=0,
+                                                  autoclobber=True)
+    try:
+        data = runner.seed(titles_count=args.titles)
+        paths = [path for builder in (runner._titles_list,
+                                      runner._title_detail,
+                                      runner._reviews_list,
+                                      runner._comments_list)
+                 for _, path, _ in [builder(data, 0)]]
+        database = connection.settings_dict['NAME']
+        connection.close()
+        results = {profile: benchmark(profile, paths, database, args)
+                   for profile in args.profiles or PROFILES}
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    print(format_report(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,22 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.query_detector',
 ]
+
+
+@pytest.fixture(autouse=True)
+def reset_search_indexes():
+    # Инвертированные индексы поиска живут в памяти процесса,
+    # между тестами они не должны переносить содержимое базы.
+    from reviews import search
+    search._indexes.clear()
+    yield
+    search._indexes.clear()
@@ -0,0 +1,62 @@
+"""
+Плагин pytest для поиска N+1 и повторяющихся SQL-запросов.
+Фикстура query_detector проверяет запросы внутри блока with,
+ключ --detect-queries включает проверку для всех тестов.
+"""
+import pytest
+from api.query_detector import QueryDetector, format_problems
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--detect-queries',
+        action='store_true',
+        default=False,
+        help='Проверять все тесты на N+1 и повторяющиеся SQL-запросы.',
+    )
+    parser.addoption(
+        '--detect-queries-threshold',
+        type=int,
+        default=None,
+        help='Сколько раз допустимо выполнить запрос одной формы.',
+    )
+
+
+def _fail_on_problems(detector):
+    problems = detector.problems()
+    if problems:
+        pytest.fail(
+            'Найдены повторяющиеся SQL-запросы:\n'
+            f'{format_problems(problems)}',
+            pytrace=False,
+        )
+
+
+@pytest.fixture
+def query_detector(request):
+    """
+    Детектор для использования в тесте:
+
+        with query_detector:
+            client.get(url)
+
+    Если найдены проблемы, тест падает на этапе teardown.
+    """
+    detector = QueryDetector(
+        threshold=request.config.getoption('detect_queries_threshold')
+    )
+    yield detector
+    _fail_on_problems(detector)
+
+
+@pytest.fixture(autouse=True)
+def _detect_queries(request):
+    if not request.config.getoption('detect_queries'):
+        yield
+        return
+    detector = QueryDetector(
+        threshold=request.config.getoption('detect_queries_threshold')
+    )
+    with detector:
+        yield
+    _fail_on_problems(detector)
@@ -0,0 +1,105 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Comment, Review, Title, User
+from reviews.paginators import EstimatedCountPaginator
+
+
+@pytest.fixture
+def admin_client_with_reviews(db):
+    admin = User.objects.create(username='root', email='root@yamdb.local',
+                                is_staff=True, is_superuser=True)
+    category = Category.objects.create(name='Фильмы', slug='movies')
+    client = Client()
+    client.force_login(admin)
+
+    def add_reviews(count):
+        for number in range(count):
+            author = User.objects.create(
+                username=f'author_{Review.objects.count()}',
+                email=f'author_{number}@yamdb.local',
+            )
+            title = Title.objects.create(name=f'Фильм {author.pk}',
+                                         year=2000, category=category)
+            review = Review.objects.create(title=title, author=author,
+                                           text='Отзыв', score=5)
+            Comment.objects.create(review=review, author=author,
+                                   text='Комментарий')
+    return client, add_reviews
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context)
+
+
+class TestAdminChangelists:
+
+    @pytest.mark.parametrize('url', [
+        '/admin/reviews/review/',
+        '/admin/reviews/comment/',
+        '/admin/reviews/title/',
+    ])
+    def test_queries_do_not_grow_with_rows(self, admin_client_with_reviews,
+                                           url):
+        client, add_reviews = admin_client_with_reviews
+        add_reviews(2)
+        few = count_queries(client, url)
+        add_reviews(8)
+
+        assert count_queries(client, url) == few, (
+            f'Проверьте, что страница {url} не делает запрос на каждую строку'
+        )
+
+    def test_indexed_search(self, admin_client_with_reviews):
+        client, add_reviews = admin_client_with_reviews
+        add_reviews(3)
+
+        response = client.get('/admin/reviews/review/?q=author_1')
+
+        assert response.status_code == 200
+        assert response.context['cl'].result_count == 1, (
+            'Проверьте, что отзывы ищутся по точному имени автора'
+        )
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+
+    def test_small_tables_use_exact_count(self):
+        Category.objects.create(name='Фильмы', slug='movies')
+
+        paginator = EstimatedCountPaginator(
+            Category.objects.order_by('pk'), 10
+        )
+
+        assert paginator.count == 1
+
+    def test_unfiltered_count_is_estimated(self):
+        if connection.vendor != 'postgresql':
+            pytest.skip('Оценка числа строк есть только в PostgreSQL')
+        Category.objects.bulk_create(
+            Category(name=f'Категория {number}', slug=f'slug-{number}')
+            for number in range(50)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE reviews_category')
+        Category.objects.filter(slug='slug-0').delete()
+
+        paginator = EstimatedCountPaginator(
+            Category.objects.order_by('pk'), 10
+        )
+        paginator.estimate_threshold = 10
+        filtered = EstimatedCountPaginator(
+            Category.objects.filter(slug__startswith='slug').order_by('pk'),
+            10
+        )
+        filtered.estimate_threshold = 10
+
+        assert paginator.count == 50, (
+            'Проверьте, что без фильтров число строк берётся из статистики'
+        )
+        assert filtered.count == 49
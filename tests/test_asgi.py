@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from api.asgi_handler import ASGIHandler
+from django.core.wsgi import get_wsgi_application
+from reviews.models import Category, Title
+
+
+def http_scope(method, path, query_string=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path,
+            'query_string': query_string, 'headers': list(headers),
+            'http_version': '1.1', 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('10.0.0.1', 5000)}
+
+
+async def call(application, scope, chunks=(b'',)):
+    messages = [{'type': 'http.request', 'body': chunk,
+                 'more_body': number < len(chunks) - 1}
+                for number, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    start, body = sent
+    return start['status'], dict(start['headers']), body['body']
+
+
+def request(application, *args, **kwargs):
+    return asyncio.run(call(application, *args, **kwargs))
+
+
+class EchoApplication:
+    """WSGI-приложение, возвращающее окружение запроса и имя потока."""
+    def __call__(self, environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [json.dumps({
+            'thread': threading.current_thread().name,
+            'path': environ['PATH_INFO'],
+            'query': environ['QUERY_STRING'],
+            'type': environ.get('CONTENT_TYPE'),
+            'token': environ.get('HTTP_AUTHORIZATION'),
+            'body': environ['wsgi.input'].read().decode(),
+        }).encode()]
+
+
+class TestASGIHandler:
+
+    def test_request_environ(self):
+        status, headers, body = request(
+            ASGIHandler(EchoApplication()),
+            http_scope('POST', '/api/v1/titles/1/reviews/', b'limit=1',
+                       [(b'content-type', b'application/json'),
+                        (b'authorization', b'Bearer token')]),
+            chunks=(b'{"text": ', '"Отзыв"}'.encode()),
+        )
+
+        echo = json.loads(body)
+        assert status == 200
+        assert headers[b'content-type'] == b'application/json'
+        assert echo['path'] == '/api/v1/titles/1/reviews/'
+        assert echo['query'] == 'limit=1'
+        assert echo['type'] == 'application/json'
+        assert echo['token'] == 'Bearer token'
+        assert echo['body'] == '{"text": "Отзыв"}', (
+            'Проверьте, что тело запроса из нескольких сообщений '
+            'передаётся WSGI-приложению целиком'
+        )
+
+    @pytest.mark.parametrize('method, path, pool', [
+        ('GET', '/api/v1/titles/', 'read'),
+        ('GET', '/api/v1/titles/1/reviews/2/comments/', 'read'),
+        ('POST', '/api/v1/titles/1/reviews/', 'default'),
+        ('GET', '/api/v1/users/me/', 'default'),
+    ])
+    def test_pool_selection(self, method, path, pool):
+        _, _, body = request(ASGIHandler(EchoApplication()),
+                             http_scope(method, path))
+
+        assert json.loads(body)['thread'].startswith(f'asgi-{pool}'), (
+            'Проверьте, что чтение произведений, отзывов и комментариев '
+            'выполняется в отдельном пуле потоков'
+        )
+
+    def test_overloaded_pool(self, settings):
+        settings.ASGI_READ_THREADS = 1
+        settings.ASGI_MAX_PENDING = 0
+        release = threading.Event()
+
+        def blocking(environ, start_response):
+            release.wait(5)
+            start_response('200 OK', [])
+            return [b'']
+
+        application = ASGIHandler(blocking)
+        scope = http_scope('GET', '/api/v1/titles/')
+
+        async def concurrent():
+            first = asyncio.ensure_future(call(application, scope))
+            await asyncio.sleep(0.1)
+            second = await call(application, scope)
+            release.set()
+            return await first, second
+
+        first, second = asyncio.run(concurrent())
+
+        assert first[0] == 200
+        assert second[0] == 503, (
+            'Проверьте, что запрос сверх очереди пула сразу получает 503'
+        )
+        assert b'retry-after' in second[1]
+
+    def test_lifespan(self):
+        application = ASGIHandler(EchoApplication())
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+
+        assert sent == ['lifespan.startup.complete',
+                        'lifespan.shutdown.complete']
+        assert application.pools is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_django_application(self):
+        category = Category.objects.create(name='Книги', slug='books')
+        Title.objects.create(name='Книга', year=2000, category=category)
+
+        status, _, body = request(ASGIHandler(get_wsgi_application()),
+                                  http_scope('GET', '/api/v1/titles/'))
+
+        assert status == 200
+        assert json.loads(body)['results'][0]['name'] == 'Книга'
@@ -0,0 +1,119 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Review, Title, User
+
+URL = '/api/v1/batch/'
+
+
+def user_client(user):
+    client = Client()
+    token = RefreshToken.for_user(user).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def post_batch(client, paths):
+    return client.post(URL, {'requests': paths},
+                       content_type='application/json')
+
+
+def make_catalog():
+    category = Category.objects.create(name='Книги', slug='books')
+    title = Title.objects.create(name='Книга', year=2000, category=category)
+    author = User.objects.create(username='author',
+                                 email='author@yamdb.local')
+    Review.objects.create(title=title, author=author, text='Отзыв', score=7)
+    return title, author
+
+
+class TestBatch:
+
+    @pytest.mark.django_db
+    def test_responses_match_single_requests(self):
+        title, _ = make_catalog()
+        Category.objects.create(name='Фильмы', slug='movies')
+        client = Client()
+        paths = [
+            f'/api/v1/titles/{title.pk}/',
+            f'/api/v1/titles/{title.pk}/reviews/',
+            '/api/v1/categories/?limit=1',
+            '/api/v1/titles/0/',
+            '/api/v1/nothing/',
+            URL,
+            '/admin/',
+            'https://example.com/api/v1/titles/',
+        ]
+
+        response = post_batch(client, paths)
+
+        assert response.status_code == 200
+        results = response.json()
+        assert [result['path'] for result in results] == paths
+        assert [result['status'] for result in results] == [
+            200, 200, 200, 404, 404, 400, 400, 400
+        ]
+        for result in results[:3]:
+            assert result['body'] == client.get(result['path']).json(), (
+                'Проверьте, что подзапрос отвечает так же, как обычный запрос'
+            )
+        assert results[2]['body']['next'].startswith('http://testserver/')
+
+    @pytest.mark.django_db
+    def test_shared_authentication(self, monkeypatch):
+        _, author = make_catalog()
+        validated = []
+        get_validated_token = JWTAuthentication.get_validated_token
+
+        def counting(self, raw_token):
+            validated.append(raw_token)
+            return get_validated_token(self, raw_token)
+
+        monkeypatch.setattr(JWTAuthentication, 'get_validated_token',
+                            counting)
+
+        results = post_batch(user_client(author), [
+            '/api/v1/users/me/', '/api/v1/users/me/reviews/',
+            '/api/v1/users/',
+        ]).json()
+
+        assert len(validated) == 1, (
+            'Проверьте, что токен пакетного запроса проверяется один раз'
+        )
+        assert results[0]['body']['username'] == 'author'
+        assert results[1]['body']['results'][0]['text'] == 'Отзыв'
+        assert results[2]['status'] == 403
+        anonymous = post_batch(Client(), ['/api/v1/users/me/']).json()
+        assert anonymous[0]['status'] == 401
+        broken = Client(HTTP_AUTHORIZATION='Bearer broken')
+        assert post_batch(broken, ['/api/v1/titles/']).status_code == 401
+
+    @pytest.mark.django_db
+    def test_limits(self, settings):
+        settings.BATCH_MAX_REQUESTS = 2
+        client = Client()
+
+        assert post_batch(client, ['/api/v1/titles/'] * 3).status_code == 400
+        assert post_batch(client, []).status_code == 400
+        assert post_batch(client, [{'path': '/'}]).status_code == 400
+        assert client.get(URL).status_code == 405
+        assert post_batch(client, ['/api/v1/titles/'] * 2).status_code == 200
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='потоки со своими соединениями')
+    @pytest.mark.django_db(transaction=True)
+    def test_thread_pool(self, settings):
+        settings.BATCH_WORKERS = 3
+        title, author = make_catalog()
+        paths = [f'/api/v1/titles/{title.pk}/',
+                 f'/api/v1/titles/{title.pk}/reviews/',
+                 '/api/v1/users/me/', '/api/v1/genres/']
+
+        results = post_batch(user_client(author), paths).json()
+
+        assert [result['status'] for result in results] == [200] * 4
+        assert results[0]['body']['name'] == 'Книга'
+        assert results[1]['body']['count'] == 1
+        assert results[2]['body']['username'] == 'author'
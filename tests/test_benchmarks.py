@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+from django.db import connection
+
+from .benchmarks import runner
+from .benchmarks.__main__ import BASELINE_PATH
+
+
+@pytest.mark.django_db
+class TestBenchmarks:
+
+    # Без транзакции теста: как и в python -m tests.benchmarks,
+    # atomic() не добавляет запросов SAVEPOINT/RELEASE.
+    @pytest.mark.django_db(transaction=True)
+    def test_queries_match_baseline(self):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['meta']['database'] != connection.vendor:
+            pytest.skip('Базовая линия снята на другой СУБД')
+
+        results = runner.run(iterations=2, warmup=1)
+
+        for name, base in baseline['scenarios'].items():
+            current = results['scenarios'][name]['queries']['max']
+            assert current == base['queries']['max'], (
+                f'Сценарий {name} выполняет {current} запросов к БД, '
+                f'в базовой линии {os.path.basename(BASELINE_PATH)} - '
+                f'{base["queries"]["max"]}: перезапишите базовую линию '
+                f'ключом --update-baseline'
+            )
+
+    def test_compare_detects_regressions(self):
+        baseline = {'scenarios': {'title_detail': {
+            'latency_ms': {'p95': 10.0}, 'queries': {'max': 3},
+        }}}
+        results = {'scenarios': {'title_detail': {
+            'latency_ms': {'p95': 20.0}, 'queries': {'max': 4},
+        }}}
+
+        assert len(runner.compare(results, baseline)) == 2, (
+            'Проверьте, что сравнение с базовой линией учитывает '
+            'и задержку, и число запросов'
+        )
+        assert runner.compare(baseline, baseline) == [], (
+            'Проверьте, что без изменений регрессий нет'
+        )
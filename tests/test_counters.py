@@ -0,0 +1,82 @@
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from reviews import deletion
+from reviews.models import Category, Comment, Review, Title, User
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    titles = [Title.objects.create(name=f'Книга {number}', year=2000,
+                                   category=category)
+              for number in range(2)]
+    users = [User.objects.create(username=f'user_{number}',
+                                 email=f'user_{number}@yamdb.local')
+             for number in range(3)]
+    reviews = []
+    for title in titles:
+        for user in users:
+            review = Review.objects.create(title=title, author=user,
+                                           text='Отзыв', score=5)
+            for commenter in users:
+                Comment.objects.create(review=review, author=commenter,
+                                       text='Комментарий')
+            reviews.append(review)
+    return titles, users, reviews
+
+
+def counts(titles, reviews):
+    return ([Title.objects.get(pk=title.pk).reviews_count
+             for title in titles],
+            [Review.objects.get(pk=review.pk).comments_count
+             for review in reviews if Review.objects.filter(
+                 pk=review.pk).exists()])
+
+
+class TestCounters:
+
+    def test_counters_in_api(self, catalog):
+        titles, _, reviews = catalog
+
+        title = Client().get(f'/api/v1/titles/{titles[0].pk}/').json()
+        review = Client().get(
+            f'/api/v1/titles/{titles[0].pk}/reviews/{reviews[0].pk}/'
+        ).json()
+
+        assert title['reviews_count'] == 3
+        assert review['comments_count'] == 3
+        assert 'is_deleted' not in title
+        assert 'is_deleted' not in title['category']
+
+    def test_counters_follow_deletes_and_cascades(self, catalog):
+        titles, users, reviews = catalog
+
+        reviews[0].comments.filter(author=users[0]).delete()
+        reviews[1].delete()
+        users[2].delete()
+
+        assert counts(titles, reviews) == ([1, 2], [1, 2, 2]), (
+            'Проверьте, что счётчики уменьшаются при каскадном удалении'
+        )
+
+    def test_counters_follow_background_deletion(self, catalog, settings):
+        titles, users, reviews = catalog
+
+        deletion.schedule(users[2])
+        deletion.run_pending(batch_size=2)
+
+        assert counts(titles, reviews) == ([2, 2], [2, 2, 2, 2])
+
+    def test_repair(self, catalog, capsys):
+        titles, _, reviews = catalog
+        Title.objects.update(reviews_count=10)
+        Review.objects.filter(pk=reviews[0].pk).update(comments_count=0)
+
+        call_command('repair_counters')
+
+        assert counts(titles, reviews)[0] == [3, 3]
+        assert Review.objects.get(pk=reviews[0].pk).comments_count == 3
+        output = capsys.readouterr().out
+        assert 'reviews.title.reviews_count: исправлено 2.' in output
+        assert 'reviews.review.comments_count: исправлено 1.' in output
@@ -0,0 +1,203 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews import deletion, leaderboards
+from reviews.models import (Category, Comment, DeletionJob, Review, Title,
+                            TitleStats, User)
+
+
+@pytest.fixture
+def admin_client(db, settings):
+    settings.BACKGROUND_DELETION = True
+    admin = User.objects.create(username='root', email='root@yamdb.local',
+                                role=User.ADMIN)
+    client = Client()
+    token = RefreshToken.for_user(admin).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    other = Category.objects.create(name='Фильмы', slug='movies')
+    titles = [Title.objects.create(name=f'Книга {number}', year=2000,
+                                   category=category)
+              for number in range(3)]
+    kept = Title.objects.create(name='Фильм', year=2000, category=other)
+    authors = [User.objects.create(username=f'user_{number}',
+                                   email=f'user_{number}@yamdb.local')
+               for number in range(4)]
+    for title in titles + [kept]:
+        for score, author in enumerate(authors, start=5):
+            review = Review.objects.create(title=title, author=author,
+                                           text='Отзыв', score=score)
+            for commenter in authors[:2]:
+                Comment.objects.create(review=review, author=commenter,
+                                       text='Комментарий')
+    return {'category': category, 'titles': titles, 'kept': kept,
+            'authors': authors}
+
+
+class TestBackgroundDeletion:
+
+    def test_category_hidden_then_deleted_in_batches(self, admin_client,
+                                                     catalog):
+        response = admin_client.delete('/api/v1/categories/books/')
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job['status'] == DeletionJob.PENDING
+        assert Review.objects.count() == 16, (
+            'Проверьте, что зависимые объекты удаляются не в запросе'
+        )
+        titles = Client().get('/api/v1/titles/').json()
+        assert [title['name'] for title in titles['results']] == ['Фильм'], (
+            'Проверьте, что удаляемые произведения скрыты из API'
+        )
+        assert Client().get(
+            f'/api/v1/titles/{catalog["titles"][0].pk}/reviews/'
+        ).status_code == 404
+
+        call_command('process_deletions', '--once', '--batch-size', '5')
+
+        job = admin_client.get(f'/api/v1/deletions/{job["id"]}/').json()
+        assert job['status'] == DeletionJob.DONE
+        assert (job['deleted_titles'], job['deleted_reviews'],
+                job['deleted_comments']) == (3, 12, 24)
+        assert not Category.objects.filter(slug='books').exists()
+        assert Review.objects.count() == 4
+        assert Comment.objects.count() == 8
+
+    def test_user_deletion_keeps_ratings_consistent(self, admin_client,
+                                                    catalog):
+        user = catalog['authors'][3]
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+
+        assert response.status_code == 202
+        assert admin_client.get(
+            f'/api/v1/users/{user.username}/'
+        ).status_code == 404
+        user.refresh_from_db()
+        assert not user.is_active
+
+        assert deletion.run_pending(batch_size=1) == 1
+        assert not User.objects.filter(pk=user.pk).exists()
+        for stats in TitleStats.objects.all():
+            assert (stats.reviews_count, stats.score_sum) == (3, 18), (
+                'Проверьте, что рейтинги пересчитываются при удалении '
+                'отзывов пользователя'
+            )
+        response = Client().get(
+            f'/api/v1/titles/{catalog["kept"].pk}/reviews/'
+        ).json()
+        assert response['count'] == 3
+
+    def test_deleted_title_stays_off_leaderboards(self, admin_client,
+                                                  catalog):
+        title = catalog['titles'][0]
+        admin_client.delete(f'/api/v1/titles/{title.pk}/')
+        review = Review.objects.filter(title=title).first()
+
+        response = admin_client.post(
+            '/api/v1/moderation/', {'action': 'hide', 'target': 'review',
+                                    'ids': [review.pk]},
+            content_type='application/json'
+        )
+        assert response.status_code == 200
+        leaderboards.rebuild()
+        # Задание на удаление произведения не выполняется.
+        DeletionJob.objects.update(status=DeletionJob.DONE)
+        admin_client.delete(f'/api/v1/users/{catalog["authors"][3].username}/')
+        assert deletion.run_pending(batch_size=1) == 1
+
+        assert not TitleStats.objects.filter(title=title).exists(), (
+            'Проверьте, что пересчёт рейтингов пропускает удаляемые '
+            'произведения'
+        )
+        top = Client().get('/api/v1/titles/top/').json()
+        assert title.pk not in {item['id'] for item in top}
+
+    def test_abandoned_job_is_resumed(self, admin_client, catalog,
+                                      settings):
+        settings.DELETION_STALE_TIMEOUT = 60
+        admin_client.delete(f'/api/v1/titles/{catalog["kept"].pk}/')
+        job = deletion.claim()
+        deletion._delete_comments(
+            job, Comment.objects.filter(review__title=catalog['kept']), 3
+        )
+
+        assert deletion.claim() is None, (
+            'Проверьте, что выполняемое задание не берётся повторно'
+        )
+        DeletionJob.objects.update(
+            updated=timezone.now() - timedelta(seconds=61)
+        )
+        assert deletion.run_pending() == 1
+
+        job.refresh_from_db()
+        assert job.status == DeletionJob.DONE
+        assert (job.deleted_titles, job.deleted_reviews,
+                job.deleted_comments) == (1, 4, 8)
+        assert not Title.objects.filter(pk=catalog['kept'].pk).exists()
+
+    def test_failed_job_is_recorded(self, admin_client, catalog,
+                                    monkeypatch):
+        def broken(*args):
+            raise RuntimeError('broken')
+        monkeypatch.setattr(deletion, '_delete_title', broken)
+        admin_client.delete(f'/api/v1/titles/{catalog["kept"].pk}/')
+
+        deletion.run_pending()
+
+        job = DeletionJob.objects.get()
+        assert job.status == DeletionJob.FAILED
+        assert 'broken' in job.error
+
+    def test_synchronous_deletion_by_default(self, admin_client, catalog,
+                                             settings):
+        settings.BACKGROUND_DELETION = False
+
+        response = admin_client.delete(f'/api/v1/titles/{catalog["kept"].pk}/')
+
+        assert response.status_code == 204
+        assert not DeletionJob.objects.exists()
+
+    def test_admin_retries_only_failed_jobs(self, db):
+        admin = User.objects.create(username='staff',
+                                    email='staff@yamdb.local',
+                                    is_staff=True, is_superuser=True)
+        client = Client()
+        client.force_login(admin)
+        jobs = {status: DeletionJob.objects.create(
+            target=DeletionJob.TITLE, object_id=number, status=status,
+            error='boom' if status == DeletionJob.FAILED else ''
+        ) for number, (status, _) in enumerate(DeletionJob.STATUSES)}
+        url = '/admin/reviews/deletionjob/'
+
+        assert 'form-0-status' not in client.get(url).content.decode(), (
+            'Проверьте, что статус задания нельзя менять в списке'
+        )
+        client.post(f'{url}{jobs[DeletionJob.DONE].pk}/change/',
+                    {'target': DeletionJob.TITLE, 'object_id': 1,
+                     'status': DeletionJob.PENDING})
+        client.post(url, {'action': 'retry_failed',
+                          '_selected_action': [job.pk
+                                               for job in jobs.values()]})
+
+        assert {
+            status: DeletionJob.objects.get(pk=job.pk).status
+            for status, job in jobs.items()
+        } == {
+            DeletionJob.PENDING: DeletionJob.PENDING,
+            DeletionJob.RUNNING: DeletionJob.RUNNING,
+            DeletionJob.DONE: DeletionJob.DONE,
+            DeletionJob.FAILED: DeletionJob.PENDING,
+        }, 'Проверьте, что повторяются только задания с ошибкой'
+        failed = DeletionJob.objects.get(pk=jobs[DeletionJob.FAILED].pk)
+        assert failed.error == ''
@@ -0,0 +1,250 @@
+import json
+import threading
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models.signals import post_delete
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews import deletion, events
+from reviews.models import Category, Comment, Event, Review, Title, User
+
+
+def user_client(user):
+    client = Client()
+    token = RefreshToken.for_user(user).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def logged():
+    return list(Event.objects.values_list('model', 'action', 'object_id'))
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    title = Title.objects.create(name='Книга', year=2000, category=category)
+    author = User.objects.create(username='author',
+                                 email='author@yamdb.local')
+    admin = User.objects.create(username='root', email='root@yamdb.local',
+                                role=User.ADMIN)
+    return title, author, admin
+
+
+class TestEvents:
+
+    def test_api_changes_are_logged(self, catalog):
+        title, author, _ = catalog
+        client = user_client(author)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        Event.objects.all().delete()
+
+        review = client.post(url, {'text': 'Отзыв', 'score': 7},
+                             content_type='application/json').json()
+        duplicate = client.post(url, {'text': 'Ещё', 'score': 1},
+                                content_type='application/json')
+        client.patch(f'{url}{review["id"]}/', {'score': 9},
+                     content_type='application/json')
+        client.delete(f'{url}{review["id"]}/')
+
+        assert duplicate.status_code == 400
+        assert logged() == [
+            ('review', 'create', review['id']),
+            ('review', 'update', review['id']),
+            ('review', 'delete', review['id']),
+        ], 'Проверьте, что отклонённое изменение не попадает в журнал'
+        update = Event.objects.get(action=Event.UPDATE)
+        data = json.loads(update.data)
+        assert data['score'] == 9 and data['title_id'] == title.pk
+
+    def test_cascade_delete_is_logged(self, catalog):
+        title, author, _ = catalog
+        review = Review.objects.create(title=title, author=author,
+                                       text='Отзыв', score=5)
+        comment = Comment.objects.create(review=review, author=author,
+                                         text='Комментарий')
+        Event.objects.all().delete()
+        title_id = title.pk
+
+        title.delete()
+
+        assert sorted(logged()) == [
+            ('comment', 'delete', comment.pk),
+            ('review', 'delete', review.pk),
+            ('title', 'delete', title_id),
+        ]
+
+    def test_background_deletion_is_logged(self, catalog, settings):
+        settings.BACKGROUND_DELETION = True
+        title, author, admin = catalog
+        review = Review.objects.create(title=title, author=author,
+                                       text='Отзыв', score=5)
+        comment = Comment.objects.create(review=review, author=admin,
+                                         text='Комментарий')
+        Event.objects.all().delete()
+
+        deletion.schedule(title)
+        deletion.run_pending()
+
+        assert logged() == [
+            ('comment', 'delete', comment.pk),
+            ('review', 'delete', review.pk),
+            ('title', 'delete', title.pk),
+        ]
+
+    def test_feed(self, catalog):
+        title, author, admin = catalog
+        Event.objects.all().delete()
+        for number in range(5):
+            Title.objects.create(name=f'Книга {number}', year=2000,
+                                 category=title.category)
+
+        assert user_client(author).get('/api/v1/events/').status_code == 403
+        client = user_client(admin)
+        seen = []
+        url = '/api/v1/events/?limit=2'
+        for _ in range(4):
+            page = client.get(url).json()
+            seen.extend(page['results'])
+            url = page['next']
+
+        assert [event['id'] for event in seen] == list(
+            Event.objects.values_list('id', flat=True)
+        )
+        positions = [event['position'] for event in seen]
+        assert positions == sorted(positions)
+        assert page['results'] == [] and page['last'] == positions[-1], (
+            'Проверьте, что ссылка next пустой страницы не сдвигается'
+        )
+        assert f'after={positions[-1]}' in url
+        assert client.get('/api/v1/events/?after=x').status_code == 400
+
+    def test_dump_command(self, catalog, tmp_path, capsys):
+        title, _, _ = catalog
+        events.sequence()
+        first = Event.objects.order_by('position').first()
+        Title.objects.filter(pk=title.pk).first().save()
+        output = tmp_path / 'events.ndjson'
+
+        call_command('dump_events', '--after', str(first.position),
+                     '--output', str(output))
+
+        lines = [json.loads(line)
+                 for line in output.read_text(encoding='utf-8').splitlines()]
+        assert [line['id'] for line in lines] == list(
+            Event.objects.filter(position__gt=first.position)
+            .order_by('position').values_list('id', flat=True)
+        )
+        assert lines[-1]['action'] == 'update'
+        assert lines[-1]['data']['name'] == 'Книга'
+        assert f'{lines[-1]["position"]}' in capsys.readouterr().err
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='параллельные транзакции PostgreSQL')
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_waits_for_open_transactions(self):
+        category = Category.objects.create(name='Книги', slug='books')
+        title = Title.objects.create(name='Книга', year=2000,
+                                     category=category)
+        admin = User.objects.create(username='root',
+                                    email='root@yamdb.local',
+                                    role=User.ADMIN)
+        client = user_client(admin)
+        recorded = threading.Event()
+        release = threading.Event()
+
+        def open_transaction():
+            try:
+                with transaction.atomic():
+                    events.record(title, Event.UPDATE)
+                    recorded.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=open_transaction)
+        thread.start()
+        recorded.wait(5)
+        events.record(title, Event.DELETE)
+        before = client.get('/api/v1/events/').json()
+        release.set()
+        thread.join()
+        after = client.get(before['next']).json()
+
+        assert [event['action'] for event in before['results']] == [
+            'create', 'delete'
+        ]
+        assert [event['action'] for event in after['results']] == [
+            'update'
+        ], (
+            'Проверьте, что событие транзакции, зафиксированной позже, '
+            'получает следующий номер, а не пропускается'
+        )
+        assert after['results'][0]['id'] < before['results'][1]['id']
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='блокировки строк PostgreSQL')
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_delete_and_create(self):
+        category = Category.objects.create(name='Книги', slug='books')
+        title = Title.objects.create(name='Книга', year=2000,
+                                     category=category)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.local')
+        other = User.objects.create(username='other',
+                                    email='other@yamdb.local')
+        review = Review.objects.create(title=title, author=author,
+                                       text='Отзыв', score=5)
+        Comment.objects.create(review=review, author=author,
+                               text='Комментарий')
+        comment_deleted = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def pause(sender, **kwargs):
+            comment_deleted.set()
+            release.wait(5)
+
+        def delete():
+            try:
+                review.delete()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        def create():
+            try:
+                Review.objects.create(title=title, author=other,
+                                      text='Новый', score=9)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        post_delete.connect(pause, sender=Comment)
+        try:
+            deleting = threading.Thread(target=delete)
+            creating = threading.Thread(target=create)
+            deleting.start()
+            comment_deleted.wait(5)
+            creating.start()
+            creating.join(2)
+            release.set()
+            deleting.join()
+            creating.join()
+        finally:
+            post_delete.disconnect(pause, sender=Comment)
+
+        assert errors == [], (
+            'Проверьте, что запись в журнал не блокирует параллельные '
+            'изменения'
+        )
+        title.refresh_from_db()
+        assert title.reviews_count == 1
+        assert sorted(Event.objects.filter(model=Event.REVIEW)
+                      .values_list('action', flat=True)) == [
+            'create', 'create', 'delete'
+        ]
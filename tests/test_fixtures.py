@@ -0,0 +1,200 @@
+import io
+import json
+import tracemalloc
+from datetime import datetime, timezone
+from os.path import join
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from reviews import fixtures
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, TitleStats, User)
+
+from .conftest import infra_dir_path
+
+PUB_DATE = '2022-06-21T03:11:29.145Z'
+
+
+class GeneratedFixture(io.TextIOBase):
+    """Поток фикстуры из count жанров, который не хранится в памяти."""
+
+    def __init__(self, count):
+        self.parts = self.generate(count)
+        self.buffer = ''
+
+    @staticmethod
+    def generate(count):
+        yield '['
+        for number in range(count):
+            separator = ', ' if number else ''
+            yield separator + json.dumps({
+                'model': 'reviews.genre', 'pk': number + 1,
+                'fields': {'name': f'Жанр [{number}], "x"',
+                           'slug': f'genre-{number}'},
+            })
+        yield ']'
+
+    def read(self, size=-1):
+        while len(self.buffer) < size:
+            part = next(self.parts, None)
+            if part is None:
+                break
+            self.buffer += part
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def catalog_fixture():
+    objects = [
+        {'model': 'reviews.comment', 'pk': 1, 'fields': {
+            'review': 1, 'author': 2, 'text': 'Комментарий',
+            'pub_date': PUB_DATE}},
+        {'model': 'reviews.review', 'pk': 1, 'fields': {
+            'title': 1, 'author': 1, 'text': 'Отзыв', 'score': 8,
+            'pub_date': PUB_DATE}},
+        {'model': 'reviews.review', 'pk': 2, 'fields': {
+            'title': 1, 'author': 2, 'text': 'Отзыв', 'score': 6,
+            'pub_date': PUB_DATE}},
+        {'model': 'reviews.title', 'pk': 1, 'fields': {
+            'name': 'Ромео и Джульетта', 'year': 1856, 'category': 1,
+            'genre': [1, 2]}},
+        {'model': 'reviews.title', 'pk': 2, 'fields': {
+            'name': 'Дядя Степа', 'year': 1965, 'category': 1,
+            'genre': [2]}},
+        {'model': 'reviews.genre', 'pk': 1, 'fields': {
+            'name': 'Романы', 'slug': 'novels'}},
+        {'model': 'reviews.genre', 'pk': 2, 'fields': {
+            'name': 'Стихи', 'slug': 'poems'}},
+        {'model': 'reviews.category', 'pk': 1, 'fields': {
+            'name': 'Книги', 'slug': 'books'}},
+    ] + [
+        {'model': 'reviews.user', 'pk': pk, 'fields': {
+            'username': f'user_{pk}', 'email': f'user_{pk}@yamdb.local',
+            'password': '', 'role': 'user'}}
+        for pk in (1, 2)
+    ]
+    return io.StringIO(json.dumps(objects, ensure_ascii=False, indent=2))
+
+
+class TestIterObjects:
+
+    def test_matches_json_load(self):
+        with open(join(infra_dir_path, 'fixtures.json'),
+                  encoding='utf-8') as stream:
+            expected = json.load(stream)
+            stream.seek(0)
+            parsed = list(fixtures.iter_objects(stream, chunk_size=7))
+
+        assert parsed == expected
+
+    def test_generated_stream(self):
+        parsed = list(fixtures.iter_objects(GeneratedFixture(50),
+                                            chunk_size=5))
+
+        assert [item['pk'] for item in parsed] == list(range(1, 51))
+        assert parsed[3]['fields']['name'] == 'Жанр [3], "x"'
+
+    @pytest.mark.parametrize('content', ['{}', '[{"a": 1}', '[1, 2]', ''])
+    def test_invalid(self, content):
+        with pytest.raises(ValueError):
+            list(fixtures.iter_objects(io.StringIO(content), chunk_size=3))
+
+    def test_memory_does_not_grow_with_file(self):
+        peaks = []
+        for count in (2000, 20000):
+            tracemalloc.start()
+            for _ in fixtures.iter_objects(GeneratedFixture(count)):
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        assert peaks[1] < peaks[0] * 1.5, (
+            'Проверьте, что память разбора не растёт с размером фикстуры'
+        )
+
+
+@pytest.mark.django_db
+class TestLoad:
+
+    def test_load_catalog(self):
+        loaded = fixtures.load(catalog_fixture(), batch_size=1)
+
+        assert loaded['reviews.Review'] == 2
+        assert loaded['reviews.GenreTitle'] == 3
+        assert sorted(GenreTitle.objects.values_list('title_id',
+                                                     'genre_id')) == [
+            (1, 1), (1, 2), (2, 2)
+        ]
+        assert Review.objects.get(pk=1).pub_date == datetime(
+            2022, 6, 21, 3, 11, 29, 145000, tzinfo=timezone.utc
+        ), 'Проверьте, что дата публикации берётся из фикстуры'
+        title = Title.objects.get(pk=1)
+        assert title.reviews_count == 2
+        assert Review.objects.get(pk=1).comments_count == 1
+        assert TitleStats.objects.get(title=title).score_sum == 14
+
+        review = Review.objects.create(title_id=2, author_id=1, text='Ещё',
+                                       score=5)
+        category = Category.objects.create(name='Фильмы', slug='movies')
+        assert review.pk == 3 and category.pk == 2, (
+            'Проверьте, что последовательности первичных ключей сброшены'
+        )
+
+    def test_broken_reference_rolls_back(self):
+        broken = io.StringIO(json.dumps([
+            {'model': 'reviews.category', 'pk': 1,
+             'fields': {'name': 'Книги', 'slug': 'books'}},
+            {'model': 'reviews.title', 'pk': 1,
+             'fields': {'name': 'Книга', 'year': 2000, 'category': 5}},
+        ]))
+
+        with pytest.raises(IntegrityError):
+            fixtures.load(broken)
+
+        assert not Category.objects.exists()
+
+    def test_existing_objects_updated(self):
+        fixtures.load(catalog_fixture())
+        changed = json.loads(catalog_fixture().getvalue())
+        for item in changed:
+            if item['model'] == 'reviews.review' and item['pk'] == 2:
+                item['fields']['score'] = 10
+            if item['model'] == 'reviews.title' and item['pk'] == 1:
+                item['fields']['genre'] = [2]
+
+        loaded = fixtures.load(io.StringIO(json.dumps(changed)))
+
+        assert loaded['reviews.Review'] == 2
+        assert Review.objects.count() == 2
+        assert Review.objects.get(pk=2).score == 10, (
+            'Проверьте, что объекты с занятым pk обновляются, как в loaddata'
+        )
+        assert TitleStats.objects.get(title_id=1).score_sum == 18
+        assert sorted(GenreTitle.objects.values_list('title_id',
+                                                     'genre_id')) == [
+            (1, 2), (2, 2)
+        ], 'Проверьте, что связи многие-ко-многим заменяются'
+
+    def test_command_reports_database_errors(self, tmp_path):
+        fixture = tmp_path / 'broken.json'
+        fixture.write_text(json.dumps([
+            {'model': 'reviews.title', 'pk': 1,
+             'fields': {'name': 'Книга', 'year': 2000, 'category': 5}},
+        ]), encoding='utf-8')
+
+        with pytest.raises(CommandError):
+            call_command('load_fixtures', str(fixture))
+
+    @pytest.mark.parametrize('options', [(), ('--ignore-existing',)])
+    def test_command_loads_infra_fixture(self, capsys, options):
+        call_command('load_fixtures', join(infra_dir_path, 'fixtures.json'),
+                     *options)
+
+        assert list(Title.objects.order_by('pk').values_list(
+            'name', flat=True
+        )) == ['Ромео и Джульетта', 'Дядя Степа']
+        assert Genre.objects.count() == 1
+        assert User.objects.filter(username='admin').exists()
+        assert not Comment.objects.exists()
+        assert 'Загружено объектов' in capsys.readouterr().out
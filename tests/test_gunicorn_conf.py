@@ -0,0 +1,56 @@
+import pytest
+from api.warmup import warm_up
+from api_yamdb import gunicorn_asgi_conf, gunicorn_conf
+from reviews.models import Category, Title
+
+
+class TestGunicornConf:
+
+    @pytest.mark.parametrize('cpus, threads, expected', [
+        (1, 1, 3), (4, 1, 9), (1, 4, 2), (4, 4, 4), (8, 2, 9),
+    ])
+    def test_worker_count(self, cpus, threads, expected):
+        assert gunicorn_conf.worker_count(cpus, threads) == expected
+
+    @pytest.mark.parametrize('files, expected', [
+        ({'/sys/fs/cgroup/cpu.max': ['150000', '100000']}, 2),
+        ({'/sys/fs/cgroup/cpu.max': ['max', '100000']}, 16),
+        ({'/sys/fs/cgroup/cpu/cpu.cfs_quota_us': ['100000'],
+          '/sys/fs/cgroup/cpu/cpu.cfs_period_us': ['100000']}, 1),
+        ({}, 16),
+    ])
+    def test_cpu_count_respects_quota(self, monkeypatch, files, expected):
+        monkeypatch.setattr(gunicorn_conf.os, 'sched_getaffinity',
+                            lambda pid: set(range(16)))
+        monkeypatch.setattr(gunicorn_conf, '_read', files.get)
+
+        assert gunicorn_conf.cpu_count() == expected
+
+    def test_production_profile(self):
+        assert gunicorn_conf.worker_class == 'gthread'
+        assert gunicorn_conf.preload_app is True
+        assert gunicorn_conf.max_requests > 0
+        assert 0 < gunicorn_conf.max_requests_jitter < (
+            gunicorn_conf.max_requests
+        )
+
+    def test_asgi_profile(self):
+        assert 'uvicorn' in gunicorn_asgi_conf.worker_class
+        assert gunicorn_asgi_conf.workers >= 2
+        assert gunicorn_asgi_conf.post_worker_init is (
+            gunicorn_conf.post_worker_init
+        ), 'Проверьте, что ASGI-воркер прогревается так же, как WSGI-воркер'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_warm_up(self):
+        category = Category.objects.create(name='Книги', slug='books')
+        Title.objects.create(name='Книга', year=2000, category=category)
+
+        timings, statuses = warm_up(['/api/v1/titles/',
+                                     '/api/v1/categories/?limit=1',
+                                     '/api/v1/nothing/'])
+
+        assert set(timings) == {'imports', 'db', 'caches'}
+        assert statuses == {'/api/v1/titles/': 200,
+                            '/api/v1/categories/?limit=1': 200,
+                            '/api/v1/nothing/': 404}
@@ -0,0 +1,178 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.dispatch import receiver
+from reviews import invalidation
+from reviews.models import Category, Review, Title, User
+from reviews.signals import count_cache_key, response_generation_key
+
+
+def worker_cache(name):
+    return LocMemCache(name, {})
+
+
+def wait_for(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def bus_events():
+    events = []
+
+    @receiver(invalidation.bus_event)
+    def collect(sender, event, **kwargs):
+        events.append(event)
+
+    yield events
+    invalidation.bus_event.disconnect(collect)
+
+
+@pytest.fixture
+def workers(request):
+    buses = []
+
+    def make(transport, **kwargs):
+        bus = invalidation.InvalidationBus(
+            transport, worker_cache(f'worker-{len(buses)}'),
+            poll_interval=0.05, **kwargs
+        )
+        bus.start()
+        buses.append(bus)
+        return bus
+
+    yield make
+    for bus in buses:
+        bus.stop()
+
+
+class FailingTransport:
+
+    def publish(self, message):
+        pass
+
+    def listen(self, poll_interval):
+        raise ConnectionError('транспорт недоступен')
+
+
+class TestInvalidationBus:
+
+    def test_sqlite_transport(self, tmp_path, workers, bus_events):
+        transport = invalidation.SQLiteTransport(str(tmp_path / 'bus.db'))
+        writer, reader = workers(transport), workers(transport)
+        time.sleep(0.1)
+        for bus in (writer, reader):
+            bus.cache.set('count', 5)
+            bus.cache.set('generation', 1)
+
+        invalidation.apply(writer.cache, delete=['count'],
+                           bump=['generation'])
+        writer.publish(delete=['count'], bump=['generation'])
+
+        assert wait_for(lambda: reader.cache.get('count') is None), (
+            'Проверьте, что сообщение шины сбрасывает ключ в других воркерах'
+        )
+        assert reader.cache.get('generation') == 2
+        assert writer.cache.get('generation') == 2, (
+            'Проверьте, что воркер не применяет своё сообщение повторно'
+        )
+        assert 'published' in bus_events and 'applied' in bus_events
+
+    def test_split_large_message(self):
+        keys = [f'response:generation:title:{number}'
+                for number in range(1000)]
+
+        parts = invalidation.split({'origin': 'x', 'sent': 0,
+                                    'delete': keys[:10], 'bump': keys})
+
+        assert len(parts) > 1
+        assert [key for part in parts for key in part['delete']] == keys[:10]
+        assert [key for part in parts for key in part['bump']] == keys
+        assert all(len(invalidation.json.dumps(part))
+                   <= invalidation.MAX_PAYLOAD for part in parts)
+
+    def test_staleness_is_bounded(self, workers, bus_events):
+        bus = workers(FailingTransport(), max_staleness=0.2)
+        bus.cache.set('count', 5)
+
+        bus.ensure_fresh()
+        assert bus.cache.get('count') == 5
+
+        time.sleep(0.3)
+        bus.ensure_fresh()
+
+        assert bus.cache.get('count') is None, (
+            'Проверьте, что кэш воркера с неработающей шиной очищается'
+        )
+        assert bus_events.count('reset') == 1
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='LISTEN/NOTIFY PostgreSQL')
+    @pytest.mark.django_db(transaction=True)
+    def test_postgres_transport(self, workers):
+        transport = invalidation.PostgresTransport()
+        writer, reader = workers(transport), workers(transport)
+        assert wait_for(lambda: reader.thread.is_alive())
+        time.sleep(0.2)
+        reader.cache.set('count', 5)
+
+        with transaction.atomic():
+            writer.publish(delete=['count'])
+            time.sleep(0.2)
+            assert reader.cache.get('count') == 5, (
+                'Проверьте, что сообщение доставляется после фиксации'
+            )
+
+        assert wait_for(lambda: reader.cache.get('count') is None)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parent_count_reset_after_commit(self):
+        category = Category.objects.create(name='Книги', slug='books')
+        title = Title.objects.create(name='Книга', year=2000,
+                                     category=category)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.local')
+        key = count_cache_key(Review, title.pk)
+
+        with transaction.atomic():
+            Review.objects.create(title=title, author=author,
+                                  text='Отзыв', score=7)
+            # Параллельный запрос списка до фиксации кэширует старое число.
+            cache.set(key, 0)
+
+        assert cache.get(key) is None, (
+            'Проверьте, что число объектов сбрасывается после фиксации'
+        )
+
+    @pytest.mark.django_db
+    def test_model_writes_publish(self, monkeypatch):
+        published = []
+
+        class RecordingBus:
+
+            def publish(self, delete=(), bump=()):
+                published.append((list(delete), list(bump)))
+
+        monkeypatch.setattr(invalidation, 'get_bus', RecordingBus)
+        category = Category.objects.create(name='Книги', slug='books')
+        title = Title.objects.create(name='Книга', year=2000,
+                                     category=category)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.local')
+        published.clear()
+
+        review = Review.objects.create(title=title, author=author,
+                                       text='Отзыв', score=7)
+
+        deleted = [key for delete, _ in published for key in delete]
+        bumped = [key for _, bump in published for key in bump]
+        assert count_cache_key(Review, title.pk) in deleted
+        assert response_generation_key(f'title:{title.pk}') in bumped
+        assert response_generation_key(f'review:{review.pk}') in bumped
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.utils import timezone
+from reviews import leaderboards
+from reviews.models import (Category, Genre, GenreTitle, Review, Title,
+                            TitleStats, User)
+
+
+@pytest.fixture
+def catalog(db):
+    books = Category.objects.create(name='Книги', slug='books')
+    movies = Category.objects.create(name='Фильмы', slug='movies')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    titles = {
+        name: Title.objects.create(name=name, year=2000, category=category)
+        for name, category in (('one', books), ('many', books),
+                               ('fresh', movies), ('empty', movies))
+    }
+    GenreTitle.objects.create(title=titles['many'], genre=drama)
+    return titles
+
+
+def add_reviews(title, scores, age=None):
+    reviews = []
+    for score in scores:
+        number = User.objects.count()
+        author = User.objects.create(username=f'user_{number}',
+                                     email=f'user_{number}@yamdb.local')
+        reviews.append(Review.objects.create(title=title, author=author,
+                                             text='Отзыв', score=score))
+    if age is not None:
+        Review.objects.filter(pk__in=[review.pk for review in reviews]).update(
+            pub_date=timezone.now() - age
+        )
+        leaderboards.refresh_title(title.pk)
+    return reviews
+
+
+def names(response):
+    return [title['name'] for title in response.json()]
+
+
+class TestLeaderboards:
+
+    def test_top_uses_bayesian_rating(self, catalog):
+        add_reviews(catalog['one'], [10])
+        add_reviews(catalog['many'], [9] * 30)
+
+        response = Client().get('/api/v1/titles/top/')
+
+        assert response.status_code == 200
+        assert names(response) == ['many', 'one'], (
+            'Проверьте, что одна высокая оценка не обгоняет много хороших'
+        )
+        assert response.json()[0]['reviews_count'] == 30
+        assert response.json()[0]['rating'] == 9
+
+    def test_trending_prefers_recent_reviews(self, catalog):
+        add_reviews(catalog['many'], [5] * 5, age=timedelta(days=30))
+        add_reviews(catalog['fresh'], [5] * 2)
+
+        response = Client().get('/api/v1/titles/trending/')
+
+        assert names(response) == ['fresh', 'many'], (
+            'Проверьте, что старые отзывы затухают'
+        )
+        assert response.json()[0]['trend'] == pytest.approx(2, abs=0.01)
+
+    def test_filters_and_limit(self, catalog):
+        for title in ('one', 'many', 'fresh'):
+            add_reviews(catalog[title], [7])
+
+        assert names(Client().get('/api/v1/titles/top/?category=movies')) == [
+            'fresh'
+        ]
+        assert names(Client().get('/api/v1/titles/top/?genre=drama')) == [
+            'many'
+        ]
+        assert len(Client().get('/api/v1/titles/top/?limit=2').json()) == 2
+        assert Client().get('/api/v1/titles/top/?limit=x').status_code == 400
+
+    def test_incremental_updates_match_rebuild(self, catalog):
+        reviews = add_reviews(catalog['one'], [3, 8, 10])
+        reviews[0].score = 9
+        reviews[0].save()
+        reviews[1].delete()
+        add_reviews(catalog['many'], [4])
+        catalog['many'].category = catalog['fresh'].category
+        catalog['many'].save()
+        incremental = {
+            stats.pk: (stats.category_id, stats.reviews_count,
+                       stats.score_sum, stats.rating,
+                       round(stats.trend, 6))
+            for stats in TitleStats.objects.all()
+        }
+
+        call_command('rebuild_leaderboards')
+
+        assert incremental == {
+            stats.pk: (stats.category_id, stats.reviews_count,
+                       stats.score_sum, pytest.approx(stats.rating),
+                       round(stats.trend, 6))
+            for stats in TitleStats.objects.all()
+        }, 'Проверьте, что инкрементальные обновления совпадают с пересчётом'
+
+    def test_stats_removed_with_last_review(self, catalog):
+        review, = add_reviews(catalog['one'], [5])
+        review.delete()
+
+        assert not TitleStats.objects.exists()
+        catalog['many'].delete()
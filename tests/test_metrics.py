@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+
+import pytest
+from django.test import Client
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_route_metrics(self, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        client = Client()
+
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/titles/1/reviews/')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert (
+            'yamdb_http_requests_total{method="GET",'
+            'route="category.list",status="200"} 1'
+        ) in text, 'Проверьте, что запросы считаются по basename и action'
+        assert 'route="reviews.list",status="404"' in text
+        assert '# TYPE yamdb_http_request_duration_seconds histogram' in text
+        assert (
+            'yamdb_http_request_db_queries_bucket{le="+Inf",method="GET",'
+            'route="category.list"} 1'
+        ) in text
+        assert 'yamdb_http_response_size_bytes_sum' in text
+
+    def test_dead_workers_are_aggregated(self, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        worker = subprocess.Popen(['true'])
+        worker.wait()
+        name = 'yamdb_http_requests_total'
+        labels = [['method', 'GET'], ['route', 'title.list'],
+                  ['status', '200']]
+        with open(tmp_path / f'{worker.pid}_dead.json', 'w') as f:
+            json.dump([[name, labels, 5]], f)
+
+        Client().get('/api/v1/titles/')
+        text = Client().get('/metrics').content.decode()
+
+        assert (
+            f'{name}{{method="GET",route="title.list",status="200"}} 6'
+        ) in text, 'Проверьте, что метрики всех процессов суммируются'
+        assert not os.path.exists(tmp_path / f'{worker.pid}_dead.json'), (
+            'Проверьте, что файлы завершившихся процессов уходят в архив'
+        )
+
+    def test_access_restricted(self, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        settings.METRICS_TOKEN = 'secret'
+        outside = Client(REMOTE_ADDR='203.0.113.5')
+
+        assert outside.get('/metrics').status_code == 403, (
+            'Проверьте, что метрики недоступны из внешних сетей'
+        )
+        assert outside.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code == 403
+        assert outside.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        ).status_code == 200
+
+        settings.METRICS_TOKEN = ''
+        assert outside.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer '
+        ).status_code == 403, 'Проверьте, что пустой токен не принимается'
+        settings.METRICS_ALLOWED_NETWORKS = ['203.0.113.0/24']
+        assert outside.get('/metrics').status_code == 200
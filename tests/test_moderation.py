@@ -0,0 +1,189 @@
+import pytest
+from api.permissions import AuthorModeratorAdminOrReadonly
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews import counters, read_model
+from reviews.models import (Category, Comment, Event, Review, Title,
+                            TitleStats, User)
+
+
+def client_for(user):
+    client = Client()
+    token = RefreshToken.for_user(user).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def moderate(client, **data):
+    return client.post('/api/v1/moderation/', data=data,
+                       content_type='application/json')
+
+
+@pytest.fixture
+def spam(db, settings):
+    settings.MODERATION_BATCH_SIZE = 2
+    category = Category.objects.create(name='Книги', slug='books')
+    titles = [Title.objects.create(name=f'Книга {number}', year=2000,
+                                   category=category)
+              for number in range(3)]
+    reader = User.objects.create(username='reader',
+                                 email='reader@yamdb.local')
+    spammer = User.objects.create(username='spammer',
+                                  email='spammer@yamdb.local')
+    moderator = User.objects.create(username='moderator',
+                                    email='moderator@yamdb.local',
+                                    role=User.MODERATOR)
+    for title in titles:
+        review = Review.objects.create(title=title, author=reader,
+                                       text='Отзыв', score=8)
+        spam = Review.objects.create(title=title, author=spammer,
+                                     text='Реклама', score=1)
+        for author in (reader, spammer):
+            Comment.objects.create(review=review, author=author,
+                                   text='Комментарий')
+            Comment.objects.create(review=spam, author=author,
+                                   text='Комментарий')
+    return {'titles': titles, 'reader': reader, 'spammer': spammer,
+            'moderator': moderator}
+
+
+def assert_consistent():
+    assert set(counters.repair().values()) == {0}, (
+        'Проверьте, что счётчики отзывов и комментариев не расходятся'
+    )
+    assert read_model.check() == ([], []), (
+        'Проверьте, что документы произведений пересобираются'
+    )
+    for stats in TitleStats.objects.all():
+        visible = Review.objects.filter(title_id=stats.title_id,
+                                        is_hidden=False)
+        assert stats.reviews_count == visible.count()
+        assert stats.score_sum == sum(visible.values_list('score',
+                                                          flat=True))
+
+
+class TestModeration:
+
+    def test_delete_by_author(self, spam):
+        response = moderate(client_for(spam['moderator']), action='delete',
+                            target='review', author='spammer')
+
+        assert response.status_code == 200
+        assert response.json() == {'action': 'delete', 'reviews': 3,
+                                   'comments': 6}
+        assert not Review.objects.filter(author=spam['spammer']).exists()
+        assert Comment.objects.count() == 6
+        assert Event.objects.filter(action=Event.DELETE,
+                                    model=Event.REVIEW).count() == 3
+        assert_consistent()
+        title = Client().get(
+            f'/api/v1/titles/{spam["titles"][0].pk}/'
+        ).json()
+        assert (title['rating'], title['reviews_count']) == (8, 1)
+
+    def test_hide_and_unhide(self, spam):
+        moderator = client_for(spam['moderator'])
+        title = spam['titles'][0]
+        review = Review.objects.get(title=title, author=spam['spammer'])
+
+        response = moderate(moderator, action='hide', target='review',
+                            ids=[review.pk])
+
+        assert response.json()['reviews'] == 1
+        reviews = Client().get(f'/api/v1/titles/{title.pk}/reviews/').json()
+        assert [item['author'] for item in reviews['results']] == ['reader']
+        assert Client().get(
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        ).status_code == 404, (
+            'Проверьте, что комментарии скрытого отзыва недоступны'
+        )
+        assert Client().get(
+            f'/api/v1/titles/{title.pk}/'
+        ).json()['rating'] == 8
+        assert_consistent()
+
+        response = moderate(moderator, action='unhide', target='review',
+                            ids=[review.pk])
+
+        assert response.json()['reviews'] == 1
+        assert Client().get(
+            f'/api/v1/titles/{title.pk}/reviews/'
+        ).json()['count'] == 2
+        assert_consistent()
+
+    def test_comments_by_time_range(self, spam):
+        moderator = client_for(spam['moderator'])
+        start = timezone.now()
+        review = Review.objects.filter(author=spam['reader']).first()
+        late = [Comment.objects.create(review=review, author=spam['spammer'],
+                                       text='Реклама')
+                for _ in range(3)]
+
+        response = moderate(moderator, action='hide', target='comment',
+                            author='spammer', since=start.isoformat())
+
+        assert response.json()['comments'] == 3
+        review.refresh_from_db()
+        assert review.comments_count == 2
+        response = moderate(moderator, action='delete', target='comment',
+                            ids=[comment.pk for comment in late])
+        assert response.json()['comments'] == 3
+        assert_consistent()
+
+    def test_permissions_checked_for_whole_batch(self, spam):
+        spammer = client_for(spam['spammer'])
+        ids = list(Review.objects.filter(title=spam['titles'][0])
+                   .values_list('pk', flat=True))
+
+        assert moderate(Client(), action='delete', target='review',
+                        ids=ids).status_code == 401
+        assert moderate(spammer, action='delete', target='review',
+                        ids=ids).status_code == 403, (
+            'Проверьте, что автор не может удалить чужие отзывы в наборе'
+        )
+        assert Review.objects.filter(pk__in=ids).count() == 2
+        assert moderate(spammer, action='hide', target='review',
+                        author='spammer').status_code == 403
+
+        response = moderate(spammer, action='delete', target='review',
+                            author='spammer')
+
+        assert response.status_code == 200
+        assert response.json()['reviews'] == 3
+
+    def test_author_set_not_widened_after_check(self, spam, monkeypatch):
+        check = AuthorModeratorAdminOrReadonly.has_bulk_permission
+        start = timezone.now()
+
+        def check_then_insert(permission, request, view, queryset):
+            allowed = check(permission, request, view, queryset)
+            Comment.objects.create(review=Review.objects.first(),
+                                   author=spam['reader'], text='Позже')
+            return allowed
+
+        monkeypatch.setattr(AuthorModeratorAdminOrReadonly,
+                            'has_bulk_permission', check_then_insert)
+        Comment.objects.create(review=Review.objects.first(),
+                               author=spam['spammer'], text='Своё')
+
+        response = moderate(client_for(spam['spammer']), action='delete',
+                            target='comment', since=start.isoformat())
+
+        assert response.json()['comments'] == 1
+        assert Comment.objects.filter(text='Позже').exists(), (
+            'Проверьте, что автор удаляет только собственные объекты'
+        )
+
+    @pytest.mark.parametrize('data', [
+        {'action': 'delete', 'target': 'review'},
+        {'action': 'ban', 'target': 'review', 'ids': [1]},
+        {'action': 'delete', 'target': 'review', 'ids': []},
+        {'action': 'delete', 'target': 'review',
+         'since': '2024-01-02T00:00:00Z', 'until': '2024-01-01T00:00:00Z'},
+    ])
+    def test_validation(self, spam, data):
+        response = moderate(client_for(spam['moderator']), **data)
+
+        assert response.status_code == 400
+        assert Review.objects.count() == 6
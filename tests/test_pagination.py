@@ -0,0 +1,88 @@
+import pytest
+from api import pagination
+from django.core.cache import cache
+from django.test import Client
+from reviews.models import Category, Comment, Review, Title, User
+
+
+@pytest.fixture
+def title():
+    cache.clear()
+    category = Category.objects.create(name='Книги', slug='books')
+    yield Title.objects.create(name='Книга', year=2000, category=category)
+    cache.clear()
+
+
+def add_review(title, username):
+    author = User.objects.create(username=username,
+                                 email=f'{username}@yamdb.local')
+    return Review.objects.create(title=title, author=author,
+                                 text='Отзыв', score=5)
+
+
+@pytest.mark.django_db
+class TestCachedCount:
+
+    def test_parent_count_cached_and_invalidated(self, title,
+                                                 django_assert_num_queries):
+        add_review(title, 'first')
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+
+        assert Client().get(url).json()['count'] == 1
+        with django_assert_num_queries(3):
+            response = Client().get(url)
+        assert response.json()['count'] == 1, (
+            'Проверьте, что число отзывов берётся из кэша'
+        )
+
+        review = add_review(title, 'second')
+        assert Client().get(url).json()['count'] == 2, (
+            'Проверьте, что создание отзыва сбрасывает кэш счётчика'
+        )
+        Comment.objects.create(review=review, author=review.author,
+                               text='Комментарий')
+        comments_url = f'{url}{review.pk}/comments/'
+        assert Client().get(comments_url).json()['count'] == 1
+
+        review.delete()
+        assert Client().get(url).json()['count'] == 1, (
+            'Проверьте, что удаление отзыва сбрасывает кэш счётчика'
+        )
+
+    def test_stale_count_does_not_hide_results(self, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert Client().get(url).json()['count'] == 0
+        Review.objects.bulk_create([
+            Review(title=title, text='Отзыв', score=5,
+                   author=User.objects.create(username='bulk',
+                                              email='bulk@yamdb.local'))
+        ])
+
+        response = Client().get(url).json()
+
+        assert len(response['results']) == 1, (
+            'Проверьте, что устаревший нулевой счётчик не скрывает отзывы'
+        )
+
+    def test_filtered_count_cached(self, title, settings):
+        url = f'/api/v1/titles/?year={title.year}'
+
+        assert Client().get(url).json()['count'] == 1
+        Title.objects.create(name='Вторая', year=title.year,
+                             category=title.category)
+        assert Client().get(url).json()['count'] == 1, (
+            'Проверьте, что COUNT(*) с фильтрами кэшируется'
+        )
+        cache.clear()
+        assert Client().get(url).json()['count'] == 2
+
+    def test_estimate_for_unfiltered_list(self, title, monkeypatch):
+        monkeypatch.setattr(pagination, 'estimate_rows',
+                            lambda model, using: 10 ** 6)
+
+        response = Client().get('/api/v1/titles/').json()
+
+        assert response['count'] == 10 ** 6, (
+            'Проверьте, что для списка без фильтров используется оценка'
+        )
+        assert len(response['results']) == 1
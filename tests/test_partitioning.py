@@ -0,0 +1,194 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews import partitioning, search
+from reviews.models import (Category, Comment, Review, Title, TitleDocument,
+                            User)
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Секционирование доступно только в PostgreSQL',
+)
+
+
+@pytest.fixture
+def title(db):
+    # Тесты начинают с обычных таблиц, даже если база создана
+    # миграциями с REVIEWS_PARTITIONING=True.
+    partitioning.unpartition(connection)
+    category = Category.objects.create(name='Книги', slug='books')
+    return Title.objects.create(name='Книга', year=2000, category=category)
+
+
+def author_client(username):
+    user = User.objects.create(username=username,
+                               email=f'{username}@yamdb.local')
+    client = Client()
+    token = RefreshToken.for_user(user).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return user, client
+
+
+def add_review(title, user, score=5):
+    return Review.objects.create(title=title, author=user, text='Отзыв',
+                                 score=score)
+
+
+class TestPartitioning:
+
+    def test_viewsets_work_on_partitioned_tables(self, title):
+        old_user, _ = author_client('old')
+        old = add_review(title, old_user)
+        Comment.objects.create(review=old, author=old_user, text='Старый')
+
+        assert partitioning.partition(connection)
+        assert partitioning.is_partitioned(connection, 'reviews_review')
+        assert partitioning.is_partitioned(connection, 'reviews_comment')
+
+        user, client = author_client('author')
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = client.post(url, {'text': 'Новый', 'score': 9})
+        assert response.status_code == 201
+        assert response.json()['id'] > old.pk, (
+            'Проверьте, что последовательность id перенесена'
+        )
+        assert client.post(url, {'text': 'Ещё', 'score': 1}
+                           ).status_code == 400
+        review_url = f'{url}{response.json()["id"]}/'
+        assert client.post(f'{review_url}comments/', {'text': 'Да'}
+                           ).status_code == 201
+        assert client.get(f'{review_url}comments/').json()['count'] == 1
+        assert client.patch(review_url, {'score': 3},
+                            content_type='application/json'
+                            ).status_code == 200
+        assert client.get(url).json()['count'] == 2
+        assert Comment.objects.filter(review=old).count() == 1
+
+    def test_unique_review_enforced_by_guard_table(self, title):
+        partitioning.partition(connection)
+        user, _ = author_client('author')
+        review = add_review(title, user)
+
+        with pytest.raises(IntegrityError, match='unique_riview'):
+            with transaction.atomic():
+                add_review(title, user)
+
+        review.delete()
+        add_review(title, user)
+
+    def test_recent_queries_touch_hot_partitions(self, title):
+        user, _ = author_client('author')
+        old = add_review(title, user)
+        Review.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=200)
+        )
+        other = Title.objects.create(name='Другая', year=2000,
+                                     category=title.category)
+        recent = add_review(other, user)
+        old_comment = Comment.objects.create(review=recent, author=user,
+                                             text='Старый')
+        Comment.objects.create(review=recent, author=user, text='Новый')
+        Comment.objects.filter(pk=old_comment.pk).update(
+            pub_date=timezone.now() - timedelta(days=200)
+        )
+        partitioning.partition(connection)
+        old_partition = partitioning.partition_name(
+            'reviews_review',
+            partitioning.month_start(timezone.now() - timedelta(days=200))
+        )
+
+        plan = Review.objects.filter(
+            pub_date__gte=timezone.now() - timedelta(days=1)
+        ).explain()
+
+        assert old_partition in Review.objects.all().explain()
+        assert old_partition not in plan, (
+            'Проверьте, что запрос свежих отзывов не читает старые секции'
+        )
+
+    def test_manage_partitions(self, title, capsys):
+        user, _ = author_client('author')
+        old = add_review(title, user)
+        Review.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=200)
+        )
+        other = Title.objects.create(name='Другая', year=2000,
+                                     category=title.category)
+        recent = add_review(other, user)
+        old_comment = Comment.objects.create(review=recent, author=user,
+                                             text='Старый')
+        Comment.objects.create(review=recent, author=user, text='Новый')
+        Comment.objects.filter(pk=old_comment.pk).update(
+            pub_date=timezone.now() - timedelta(days=200)
+        )
+        call_command('manage_partitions', '--partition',
+                     '--months-ahead', '1')
+        next_month = partitioning.partition_name(
+            'reviews_review', partitioning.month_start(timezone.now(), 2)
+        )
+
+        call_command('manage_partitions', '--months-ahead', '2',
+                     '--keep-months', '3', '--archive')
+
+        output = capsys.readouterr().out
+        assert f'Создана секция {next_month}.' in output
+        assert not Review.objects.filter(pk=old.pk).exists(), (
+            'Проверьте, что старые секции отсоединяются'
+        )
+        title.refresh_from_db()
+        recent.refresh_from_db()
+        assert (title.reviews_count, recent.comments_count) == (0, 1), (
+            'Проверьте, что счётчики не учитывают отсоединённые строки'
+        )
+        document = TitleDocument.objects.get(title=title).document
+        assert json.loads(document)['reviews_count'] == 0
+        reviews = Client().get(f'/api/v1/titles/{title.pk}/reviews/').json()
+        assert reviews['count'] == 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tablename FROM pg_tables WHERE schemaname = %s',
+                [partitioning.ARCHIVE_SCHEMA]
+            )
+            archived = [row[0] for row in cursor.fetchall()]
+        assert partitioning.partition_name(
+            'reviews_review',
+            partitioning.month_start(timezone.now() - timedelta(days=200))
+        ) in archived
+
+    def test_unpartition_restores_constraints(self, title):
+        user, _ = author_client('author')
+        partitioning.partition(connection)
+        review = add_review(title, user)
+
+        assert partitioning.unpartition(connection)
+
+        assert not partitioning.is_partitioned(connection, 'reviews_review')
+        with pytest.raises(IntegrityError):
+            with transaction.atomic():
+                add_review(title, user)
+        with pytest.raises(IntegrityError):
+            with transaction.atomic():
+                Comment.objects.create(review_id=review.pk + 100,
+                                       author=user, text='Нет отзыва')
+
+    def test_search_trigger_survives_rebuild(self, title):
+        user, _ = author_client('author')
+
+        partitioning.partition(connection)
+        review = Review.objects.create(title=title, author=user,
+                                       text='Неожиданный финал', score=5)
+        assert search.search(Review.objects.all(), 'финал') == [review]
+
+        partitioning.unpartition(connection)
+        review.text = 'Предсказуемая развязка'
+        review.save()
+        assert search.search(Review.objects.all(), 'развязка') == [review], (
+            'Проверьте, что триггер поискового столбца переносится '
+            'при пересоздании таблицы'
+        )
@@ -0,0 +1,44 @@
+import logging
+
+import pytest
+from django.test import Client
+from reviews.models import Category
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_server_timing_header(self, settings):
+        settings.PROFILING_SERVER_TIMING = True
+        Category.objects.create(name='Фильмы', slug='movies')
+
+        response = Client().get('/api/v1/categories/')
+
+        assert response.status_code == 200
+        header = response.get('Server-Timing', '')
+        for metric in ('auth;', 'serialize;', 'render;', 'db;', 'total;'):
+            assert metric in header, (
+                f'Проверьте, что заголовок Server-Timing содержит {metric}'
+            )
+        assert '2 queries' in header, (
+            'Проверьте, что в Server-Timing передаётся число SQL-запросов'
+        )
+
+    def test_disabled_by_default(self):
+        response = Client().get('/api/v1/categories/')
+
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что без настройки профилирование выключено'
+        )
+
+    def test_slow_requests_logged_with_sql(self, settings, caplog):
+        settings.PROFILING_SAMPLE_RATE = 1
+        settings.PROFILING_SLOW_REQUEST_MS = 0
+
+        with caplog.at_level(logging.WARNING, logger='api.middleware'):
+            response = Client().get('/api/v1/genres/')
+
+        assert 'Server-Timing' not in response
+        assert 'reviews_genre' in caplog.text, (
+            'Проверьте, что медленные запросы пишутся в лог вместе с SQL'
+        )
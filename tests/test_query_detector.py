@@ -0,0 +1,58 @@
+import pytest
+from api.query_detector import DUPLICATE, REPEATED, QueryDetector, fingerprint
+from django.test import Client
+from reviews.models import Category, Review, Title, User
+
+
+class TestFingerprint:
+
+    def test_literals_are_normalized(self):
+        assert fingerprint(
+            'SELECT * FROM t WHERE id = %s AND name = \'a\' LIMIT 21'
+        ) == 'SELECT * FROM t WHERE id = ? AND name = ? LIMIT ?'
+        assert fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s, %s)'
+        ) == fingerprint('SELECT * FROM t WHERE id IN (%s)'), (
+            'Проверьте, что списки IN с разной длиной имеют одну форму'
+        )
+
+
+@pytest.mark.django_db
+class TestQueryDetector:
+
+    def test_n_plus_one_in_reviews_list(self):
+        category = Category.objects.create(name='Фильмы', slug='movies')
+        title = Title.objects.create(name='Фильм', year=2000,
+                                     category=category)
+        for number in range(5):
+            author = User.objects.create(username=f'user_{number}',
+                                         email=f'user_{number}@yamdb.local')
+            Review.objects.create(title=title, author=author, text='Отзыв',
+                                  score=5)
+
+        with QueryDetector(threshold=3) as detector:
+            Client().get(f'/api/v1/titles/{title.pk}/reviews/')
+
+        problems = detector.problems()
+        repeated = [problem for problem in problems
+                    if problem.kind == REPEATED]
+        assert repeated, 'Проверьте, что N+1 в списке отзывов найден'
+        assert all(problem.count == 5 for problem in repeated)
+        assert all(problem.call_sites for problem in repeated), (
+            'Проверьте, что для проблем указывается место вызова'
+        )
+
+    def test_exact_duplicates(self):
+        with QueryDetector(threshold=10) as detector:
+            list(Category.objects.filter(slug='movies'))
+            list(Category.objects.filter(slug='movies'))
+            list(Category.objects.filter(slug='books'))
+
+        problems = detector.problems()
+        assert [problem.kind for problem in problems] == [DUPLICATE]
+        assert problems[0].count == 2
+        assert 'test_query_detector.py' in problems[0].call_sites[0]
+
+    def test_fixture_passes_without_problems(self, query_detector):
+        with query_detector:
+            Client().get('/api/v1/categories/')
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+from api.serializers import ReadTitleSerializer
+from django.core.management import CommandError, call_command
+from django.db.models import Avg
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews import read_model
+from reviews.models import (Category, Genre, Review, Title, TitleDocument,
+                            User)
+
+
+def stored(title):
+    return json.loads(TitleDocument.objects.get(title_id=title.pk).document)
+
+
+def serialized(title):
+    title = Title.objects.annotate(rating=Avg('reviews__score')).get(
+        pk=title.pk
+    )
+    return json.loads(json.dumps(ReadTitleSerializer(title).data))
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    admin = User.objects.create(username='root', email='root@yamdb.local',
+                                role=User.ADMIN)
+    client = Client()
+    token = RefreshToken.for_user(admin).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    response = client.post('/api/v1/titles/', {
+        'name': 'Книга', 'year': 2000, 'category': 'books',
+        'genre': ['drama', 'comedy'], 'description': 'Описание',
+    }, content_type='application/json')
+    assert response.status_code == 201
+    title = Title.objects.get(pk=response.json()['id'])
+    return title, category, drama, comedy, admin
+
+
+class TestReadModel:
+
+    def test_document_follows_changes(self, catalog):
+        title, category, drama, comedy, admin = catalog
+        assert stored(title) == serialized(title)
+
+        Review.objects.create(title=title, author=admin, text='Отзыв',
+                              score=7)
+        assert stored(title)['rating'] == 7
+        assert stored(title)['reviews_count'] == 1
+
+        comedy.name = 'Трагикомедия'
+        comedy.save()
+        category.name = 'Литература'
+        category.save()
+        title.genre.remove(drama)
+        title.year = 2001
+        title.save()
+
+        assert stored(title) == serialized(title), (
+            'Проверьте, что документ пересобирается при изменении жанров, '
+            'категории и произведения'
+        )
+        Review.objects.filter(title=title).get().delete()
+        assert stored(title) == serialized(title)
+        assert stored(title)['rating'] is None
+
+    def test_delete_title_with_reviews(self, catalog):
+        title, _, _, _, admin = catalog
+        Review.objects.create(title=title, author=admin, text='Отзыв',
+                              score=7)
+
+        Title.objects.filter(pk=title.pk).delete()
+
+        assert not TitleDocument.objects.exists()
+
+    def test_api_reads_documents(self, catalog):
+        title, category, _, _, _ = catalog
+        other = Title.objects.create(name='Другая', year=1990,
+                                     category=category)
+        TitleDocument.objects.filter(title=other).delete()
+        TitleDocument.objects.filter(title=title).update(
+            document=json.dumps({'id': title.pk, 'name': 'из документа'})
+        )
+
+        listed = Client().get('/api/v1/titles/?year_min=1995').json()
+        detail = Client().get(f'/api/v1/titles/{other.pk}/').json()
+
+        assert listed['count'] == 1
+        assert listed['results'] == [{'id': title.pk,
+                                      'name': 'из документа'}]
+        assert detail == serialized(other), (
+            'Проверьте, что без документа произведение собирается на лету'
+        )
+        Title.objects.filter(pk=other.pk).update(is_deleted=True)
+        assert Client().get(f'/api/v1/titles/{other.pk}/').status_code == 404
+        assert Client().get('/api/v1/titles/abc/').status_code == 404
+
+    def test_check_and_rebuild(self, catalog, capsys):
+        title, category, _, _, _ = catalog
+        other = Title.objects.create(name='Другая', year=1990,
+                                     category=category)
+        TitleDocument.objects.filter(title=other).delete()
+        Title.objects.filter(pk=title.pk).update(name='Изменена в обход')
+
+        assert read_model.check() == ([other.pk], [title.pk])
+        with pytest.raises(CommandError):
+            call_command('rebuild_title_documents', '--check')
+
+        call_command('rebuild_title_documents', '--check', '--fix')
+        assert read_model.check() == ([], [])
+        assert stored(title)['name'] == 'Изменена в обход'
+
+        TitleDocument.objects.all().delete()
+        call_command('rebuild_title_documents', '--chunk-size', '1')
+        assert read_model.check() == ([], [])
+        assert 'Пересобрано документов: 2.' in capsys.readouterr().out
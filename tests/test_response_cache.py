@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+from api.response_cache import SingleFlight, get_or_compute
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Comment, Review, Title, User
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def run_concurrently(target, count=THREADS):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(number):
+        barrier.wait()
+        try:
+            results[number] = target(number)
+        except Exception as error:
+            results[number] = error
+
+    threads = [threading.Thread(target=worker, args=(number,))
+               for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class SlowComputation:
+
+    def __init__(self, value='ответ', error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class TestSingleFlight:
+
+    def test_threads_share_one_computation(self):
+        compute = SlowComputation()
+
+        results = run_concurrently(
+            lambda _: get_or_compute('key', compute, 60)
+        )
+
+        assert compute.calls == 1, (
+            'Проверьте, что одинаковые промахи ждут одно вычисление'
+        )
+        assert results == ['ответ'] * THREADS
+
+    def test_workers_share_one_computation(self):
+        compute = SlowComputation()
+        workers = [SingleFlight(), SingleFlight()]
+
+        results = run_concurrently(
+            lambda number: get_or_compute('key', compute, 60,
+                                          flights=workers[number % 2])
+        )
+
+        assert compute.calls == 1, (
+            'Проверьте, что воркеры ждут вычисление под блокировкой в кэше'
+        )
+        assert results == ['ответ'] * THREADS
+
+    def test_error_is_shared(self):
+        compute = SlowComputation(error=ValueError('сбой'))
+
+        results = run_concurrently(
+            lambda _: get_or_compute('key', compute, 60)
+        )
+
+        assert compute.calls == 1
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache.get('key') is None
+
+    def test_stale_while_revalidate(self):
+        cache.set('key', ('старый', time.time() - 1), 60)
+        cache.add('key:lock', 'другой воркер')
+        compute = SlowComputation('новый')
+
+        assert get_or_compute('key', compute, 60, stale=60) == 'старый'
+        assert compute.calls == 0, (
+            'Проверьте, что устаревший ответ отдаётся, пока его '
+            'пересобирает другой запрос'
+        )
+
+        cache.delete('key:lock')
+        results = run_concurrently(
+            lambda _: get_or_compute('key', compute, 60, stale=60)
+        )
+
+        assert compute.calls == 1
+        assert set(results) <= {'старый', 'новый'}
+        assert get_or_compute('key', compute, 60) == 'новый'
+
+
+class TestResponseCache:
+
+    @pytest.mark.django_db
+    def test_responses_are_cached_and_invalidated(self, settings):
+        settings.RESPONSE_CACHE_TIMEOUT = 60
+        category = Category.objects.create(name='Книги', slug='books')
+        title = Title.objects.create(name='Книга', year=2000,
+                                     category=category)
+        author = User.objects.create(username='author',
+                                     email='author@yamdb.local')
+        review = Review.objects.create(title=title, author=author,
+                                       text='Отзыв', score=7)
+        client = Client()
+        urls = [
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title.pk}/',
+            f'/api/v1/titles/{title.pk}/reviews/',
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/',
+        ]
+        first = [client.get(url).json() for url in urls]
+
+        with CaptureQueriesContext(connection) as queries:
+            second = [client.get(url).json() for url in urls]
+
+        assert second == first
+        assert len(queries) == 0, (
+            'Проверьте, что закэшированный ответ не обращается к базе'
+        )
+
+        Review.objects.create(title=title, author=User.objects.create(
+            username='other', email='other@yamdb.local'
+        ), text='Ещё', score=3)
+        Comment.objects.create(review=review, author=author, text='Ответ')
+        titles, detail, reviews, comments = [client.get(url).json()
+                                             for url in urls]
+
+        assert detail['rating'] == 5 and detail['reviews_count'] == 2
+        assert titles['results'][0]['rating'] == 5
+        assert reviews['count'] == 2
+        assert comments['count'] == 1, (
+            'Проверьте, что изменения сбрасывают закэшированные ответы'
+        )
+
+        Title.objects.filter(pk=title.pk).update(is_deleted=True)
+        Title.objects.get(pk=title.pk).save()
+        assert client.get(urls[1]).status_code == 404
+        assert client.get(urls[2]).status_code == 404
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Review, Title, User
+
+THREADS = 8
+
+
+def author_client(user):
+    client = Client()
+    token = RefreshToken.for_user(user).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def post_review(client, title, score=7):
+    return client.post(f'/api/v1/titles/{title.pk}/reviews/',
+                       {'text': 'Отзыв', 'score': score},
+                       content_type='application/json')
+
+
+def make_title():
+    category = Category.objects.create(name='Книги', slug='books')
+    return Title.objects.create(name='Книга', year=2000, category=category)
+
+
+class TestReviewCreate:
+
+    @pytest.mark.django_db
+    def test_second_review_is_rejected(self):
+        title = make_title()
+        user = User.objects.create(username='author',
+                                   email='author@yamdb.local')
+        client = author_client(user)
+
+        first = post_review(client, title)
+        second = post_review(client, title, score=3)
+
+        assert first.status_code == 201
+        assert second.status_code == 400, (
+            'Проверьте, что повторный отзыв возвращает 400'
+        )
+        assert second.json() == {
+            'non_field_errors': ['Извините, возможен только один отзыв']
+        }
+        title.refresh_from_db()
+        assert title.reviews_count == 1
+        assert title.stats.score_sum == 7, (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+
+    @pytest.mark.django_db
+    def test_no_existence_check(self):
+        title = make_title()
+        user = User.objects.create(username='author',
+                                   email='author@yamdb.local')
+        client = author_client(user)
+        other = User.objects.create(username='other',
+                                    email='other@yamdb.local')
+        post_review(author_client(other), title)
+
+        with CaptureQueriesContext(connection) as context:
+            response = post_review(client, title)
+
+        assert response.status_code == 201
+        selects = [query['sql'] for query in context.captured_queries
+                   if 'FROM "reviews_review"' in query['sql']
+                   and query['sql'].startswith('SELECT')]
+        assert not selects, (
+            'Проверьте, что перед созданием отзыва не выполняется SELECT'
+        )
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='нужны одновременные соединения PostgreSQL')
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_double_submit(self):
+        title = make_title()
+        user = User.objects.create(username='author',
+                                   email='author@yamdb.local')
+        barrier = threading.Barrier(THREADS)
+        statuses = []
+
+        def submit():
+            client = author_client(user)
+            try:
+                barrier.wait()
+                statuses.append(post_review(client, title).status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(statuses) == [201] + [400] * (THREADS - 1), (
+            'Проверьте, что одновременные отзывы одного автора дают '
+            'один ответ 201, остальные - 400'
+        )
+        assert Review.objects.filter(title=title).count() == 1
+        title.refresh_from_db()
+        assert title.reviews_count == 1
+        assert title.stats.reviews_count == 1
@@ -0,0 +1,146 @@
+import pytest
+from django.db import connection
+from django.test import Client
+from reviews import search
+from reviews.models import Category, Comment, Event, Review, Title, User
+
+BACKENDS = [
+    pytest.param(search.search_postgres, marks=pytest.mark.skipif(
+        connection.vendor != 'postgresql',
+        reason='Поисковый столбец есть только в PostgreSQL',
+    ), id='postgres'),
+    pytest.param(search.search_index, id='index'),
+]
+
+
+@pytest.fixture
+def reviews(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    texts = ['сюжет сюжет сюжет', 'сюжет и герои', 'герои без сюжет',
+             'скучные герои', 'сюжет', 'сюжет скрыт']
+    result = []
+    for number, text in enumerate(texts):
+        title = Title.objects.create(name=f'Книга {number}', year=2000,
+                                     category=category)
+        author = User.objects.create(username=f'author_{number}',
+                                     email=f'author_{number}@yamdb.local')
+        review = Review.objects.create(title=title, author=author,
+                                       text=text, score=5)
+        Comment.objects.create(review=review, author=author,
+                               text=f'комментарий про {text}')
+        result.append(review)
+    Review.objects.filter(pk=result[-1].pk).update(is_hidden=True)
+    return result
+
+
+def fetch_all(target, query, limit):
+    found = []
+    response = Client().get(f'/api/v1/search/{target}/',
+                            {'q': query, 'limit': limit})
+    while True:
+        assert response.status_code == 200
+        found.extend(response.json()['results'])
+        if response.json()['next'] is None:
+            return found
+        response = Client().get(response.json()['next'])
+
+
+class TestSearch:
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_ranked_keyset_pages(self, reviews, backend):
+        visible = Review.objects.filter(is_hidden=False)
+        everything = backend(visible, 'сюжет', limit=10)
+        pages, after = [], None
+        while True:
+            page = backend(visible, 'сюжет', after=after, limit=2)
+            if not page:
+                break
+            pages.extend(page)
+            after = (page[-1].search_rank, page[-1].pk)
+
+        assert [review.pk for review in everything] == [
+            review.pk for review in pages
+        ], 'Проверьте, что страницы по курсору не теряют и не повторяют'
+        assert {review.pk for review in everything} == {
+            review.pk for review in reviews[:5] if 'сюжет' in review.text
+        }
+        found = [review.pk for review in everything]
+        assert found.index(reviews[0].pk) < found.index(reviews[1].pk), (
+            'Проверьте, что результаты упорядочены по релевантности'
+        )
+        ranks = [review.search_rank for review in everything]
+        assert ranks == sorted(ranks, reverse=True)
+
+    @pytest.mark.parametrize('backend', BACKENDS)
+    def test_follows_changes(self, reviews, backend):
+        backend(Review.objects.all(), 'сюжет')
+        reviews[3].text = 'интересный сюжет'
+        reviews[3].save()
+        reviews[0].delete()
+        Review.objects.create(title=reviews[0].title, author=reviews[1].author,
+                              text='новый сюжет', score=1)
+
+        found = backend(Review.objects.all(), 'сюжет', limit=10)
+
+        texts = {review.text for review in found}
+        assert 'интересный сюжет' in texts
+        assert 'новый сюжет' in texts
+        assert 'сюжет сюжет сюжет' not in texts
+
+    def test_index_notices_writes_outside_event_log(self, reviews):
+        search.search_index(Review.objects.all(), 'сюжет')
+        Review.objects.filter(pk=reviews[3].pk).update(text='нудный сюжет')
+        Event.objects.all().delete()
+        Review.objects.filter(pk=reviews[0].pk).update(text='герои')
+
+        found = search.search_index(Review.objects.all(), 'сюжет', limit=10)
+
+        assert reviews[3].pk in {review.pk for review in found}
+        assert reviews[0].pk not in {review.pk for review in found}, (
+            'Проверьте, что индекс перестраивается при изменениях '
+            'в обход журнала событий'
+        )
+
+    def test_api(self, reviews):
+        found = fetch_all('reviews', 'сюжет', limit=2)
+
+        assert len(found) == 4, (
+            'Проверьте, что скрытые отзывы не находятся'
+        )
+        assert {review['title'] for review in found} == {
+            review.title_id for review in reviews[:5]
+            if 'сюжет' in review.text
+        }
+
+        Title.objects.filter(pk=reviews[0].title_id).update(is_deleted=True)
+        comments = fetch_all('comments', 'герои', limit=1)
+
+        assert sorted(comment['review_id'] for comment in comments) == [
+            reviews[1].pk, reviews[2].pk, reviews[3].pk
+        ]
+        assert {'title_id', 'author', 'text'} <= set(comments[0])
+
+    @pytest.mark.parametrize('params', [
+        {}, {'q': ' '}, {'q': 'а' * 201}, {'q': 'сюжет', 'cursor': 'broken'},
+        {'q': 'сюжет', 'limit': 'x'},
+    ])
+    def test_invalid_query(self, reviews, params):
+        response = Client().get('/api/v1/search/reviews/', params)
+
+        assert response.status_code == 400
+
+    def test_admin_full_text_search(self, reviews):
+        admin = User.objects.create(username='root', email='root@yamdb.local',
+                                    is_staff=True, is_superuser=True)
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get('/admin/reviews/review/?q=скучные')
+
+        assert response.status_code == 200
+        assert response.context['cl'].result_count == 1
+        response = client.get('/admin/reviews/comment/?q=author_2')
+        assert response.context['cl'].result_count == 1, (
+            'Проверьте, что поиск по индексированным полям сохранён'
+        )
@@ -0,0 +1,110 @@
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from reviews import similarity
+from reviews.models import (Category, Genre, GenreTitle, Review,
+                            SimilarityBuild, SimilarTitle, Title, User)
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name='Фильмы', slug='movies')
+    genres = {slug: Genre.objects.create(name=slug, slug=slug)
+              for slug in ('drama', 'comedy', 'horror')}
+    titles = {}
+    for name, slugs in (('base', ('drama', 'comedy')),
+                        ('twin', ('drama', 'comedy')),
+                        ('half', ('drama',)),
+                        ('other', ('horror',))):
+        titles[name] = Title.objects.create(name=name, year=2000,
+                                            category=category)
+        for slug in slugs:
+            GenreTitle.objects.create(title=titles[name],
+                                      genre=genres[slug])
+    return titles
+
+
+def rate(title, scores):
+    for number, score in enumerate(scores):
+        author, _ = User.objects.get_or_create(
+            username=f'user_{number}', email=f'user_{number}@yamdb.local'
+        )
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=score)
+
+
+def similar(title):
+    response = Client().get(f'/api/v1/titles/{title.pk}/similar/')
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()]
+
+
+class TestSimilarTitles:
+
+    def test_genre_overlap(self, catalog):
+        call_command('build_similar_titles')
+
+        assert similar(catalog['base']) == ['twin', 'half'], (
+            'Проверьте, что похожие произведения упорядочены по сходству '
+            'и не содержат несвязанных произведений'
+        )
+
+    def test_co_rating_patterns(self, catalog):
+        rate(catalog['base'], [10, 2, 9])
+        rate(catalog['other'], [9, 1, 10])
+        rate(catalog['twin'], [1, 10, 2])
+        call_command('build_similar_titles')
+
+        response = Client().get(
+            f'/api/v1/titles/{catalog["base"].pk}/similar/?limit=1'
+        ).json()
+
+        assert [item['name'] for item in response] == ['other'], (
+            'Проверьте, что учитываются совпадения оценок пользователей'
+        )
+        assert response[0]['similarity'] > 0
+        assert response[0]['rating'] == 6
+
+    def test_streamed_in_chunks(self, catalog, monkeypatch):
+        rate(catalog['base'], [10, 2, 9])
+        rate(catalog['other'], [9, 1, 10])
+        rate(catalog['half'], [3, 8])
+        call_command('build_similar_titles')
+        expected = set(SimilarTitle.objects.values_list(
+            'title_id', 'similar_id', 'score'
+        ))
+        monkeypatch.setattr(similarity, 'FETCH_SIZE', 2)
+
+        call_command('build_similar_titles')
+
+        assert set(SimilarTitle.objects.values_list(
+            'title_id', 'similar_id', 'score'
+        )) == expected, (
+            'Проверьте, что чтение таблиц кусками не меняет результат'
+        )
+
+    def test_incremental_refresh(self, catalog):
+        call_command('build_similar_titles')
+        stale = SimilarTitle.objects.get(title=catalog['twin'],
+                                         similar=catalog['base'])
+        SimilarTitle.objects.filter(pk=stale.pk).update(score=100)
+        new = Title.objects.create(name='new', year=2000,
+                                   category=catalog['base'].category)
+        GenreTitle.objects.create(title=new,
+                                  genre=catalog['base'].genre.first())
+        rate(catalog['half'], [5])
+
+        call_command('build_similar_titles', '--incremental')
+
+        build = SimilarityBuild.objects.latest()
+        assert build.incremental and build.titles_count == 2, (
+            'Проверьте, что пересчитываются только новые произведения '
+            'и произведения с новыми отзывами'
+        )
+        assert SimilarTitle.objects.get(pk=stale.pk).score == 100
+        assert similar(new)
+
+    def test_unknown_title(self, db):
+        response = Client().get('/api/v1/titles/1/similar/')
+
+        assert response.status_code == 404
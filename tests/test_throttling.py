@@ -0,0 +1,125 @@
+import pytest
+from api.throttling import LocalBucketStore, get_limiter, local_stores
+from django.test import Client
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    def set_rates(ip='100/min', identity='100/min'):
+        settings.REST_FRAMEWORK = dict(
+            settings.REST_FRAMEWORK,
+            DEFAULT_THROTTLE_RATES={'auth_ip': ip, 'auth_identity': identity},
+        )
+    local_stores.clear()
+    yield set_rates
+    local_stores.clear()
+
+
+def signup(username, address='10.0.0.1'):
+    return Client().post(
+        '/api/v1/auth/signup/',
+        {'username': username, 'email': f'{username}@yamdb.local'},
+        REMOTE_ADDR=address,
+    )
+
+
+class TestTokenBucket:
+
+    def test_refill(self):
+        store = LocalBucketStore()
+
+        assert store.consume(['key'], capacity=2, rate=1, now=0) == 0
+        assert store.consume(['key'], capacity=2, rate=1, now=0) == 0
+        assert store.consume(['key'], capacity=2, rate=1, now=0) == 1, (
+            'Проверьте, что пустое ведро возвращает время ожидания'
+        )
+        assert store.consume(['key'], capacity=2, rate=1, now=1) == 0, (
+            'Проверьте, что ведро пополняется со временем'
+        )
+
+    def test_oldest_buckets_evicted(self):
+        store = LocalBucketStore(max_keys=3)
+        for key in ('a', 'b', 'c'):
+            store.consume([key], capacity=1, rate=0.001, now=0)
+
+        store.consume(['a'], capacity=1, rate=0.001, now=1)
+        store.consume(['d'], capacity=1, rate=0.001, now=2)
+
+        assert list(store.buckets) == ['c', 'a', 'd'], (
+            'Проверьте, что при переполнении вытесняются самые давние '
+            'вёдра, даже пустые'
+        )
+        assert store.consume(['a'], capacity=1, rate=0.001, now=3) > 0
+
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+
+    def test_signup_throttled_by_ip(self, throttle_rates):
+        throttle_rates(ip='2/min')
+
+        assert signup('first').status_code == 200
+        assert signup('second').status_code == 200
+        response = signup('third')
+
+        assert response.status_code == 429, (
+            'Проверьте, что signup ограничен по IP-адресу'
+        )
+        assert 'Retry-After' in response
+        assert signup('fourth', address='10.0.0.2').status_code == 200
+
+    def test_signup_throttled_by_identity(self, throttle_rates):
+        throttle_rates(identity='1/min')
+
+        assert signup('bot', address='10.0.0.1').status_code == 200
+        response = signup('bot', address='10.0.0.2')
+
+        assert response.status_code == 429, (
+            'Проверьте, что signup ограничен по username и email'
+        )
+
+    def test_scopes_use_separate_stores(self, throttle_rates):
+        throttle_rates(ip='20/min', identity='5/min')
+
+        signup('bot')
+
+        assert {
+            scope: [key.rsplit('_', 1)[-1] for key in store.buckets]
+            for scope, store in local_stores.items()
+        } == {
+            'auth_ip': ['10.0.0.1'],
+            'auth_identity': ['username:bot', 'email:bot@yamdb.local'],
+        }, 'Проверьте, что у каждой области своё хранилище вёдер'
+
+    @pytest.mark.parametrize('url', ['/api/v1/auth/signup/',
+                                     '/api/v1/auth/token/'])
+    def test_non_object_body(self, throttle_rates, url):
+        throttle_rates()
+
+        response = Client().post(url, '[1, 2]',
+                                 content_type='application/json')
+
+        assert response.status_code == 400, (
+            'Проверьте, что тело не объект JSON даёт 400, а не 500'
+        )
+
+    def test_concurrency_limit(self, settings, throttle_rates):
+        settings.CONCURRENCY_LIMITS = {'auth': 1}
+        limiter = get_limiter('auth')
+
+        assert limiter.acquire()
+        try:
+            response = signup('busy')
+            catalog = Client().get('/api/v1/categories/')
+        finally:
+            limiter.release()
+
+        assert response.status_code == 503, (
+            'Проверьте, что сверх бюджета запрос сразу получает 503'
+        )
+        assert catalog.status_code == 200, (
+            'Проверьте, что лимит не затрагивает другие эндпоинты'
+        )
+        assert signup('busy').status_code == 200
+        assert limiter.in_flight == 0
@@ -0,0 +1,96 @@
+import pytest
+from api.filters import TitleFilter
+from django.db import connection
+from django.test import Client
+from reviews.models import Category, Genre, Review, Title, User
+
+
+@pytest.fixture
+def catalog(db):
+    books = Category.objects.create(name='Книги', slug='books')
+    movies = Category.objects.create(name='Фильмы', slug='movies')
+    music = Category.objects.create(name='Музыка', slug='music')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    rock = Genre.objects.create(name='Рок', slug='rock')
+    titles = {}
+    for name, year, category, genres in (
+        ('both', 1990, books, (drama, comedy)),
+        ('drama', 2000, movies, (drama,)),
+        ('comedy', 2010, books, (comedy,)),
+        ('rock', 2020, music, (rock,)),
+    ):
+        title = Title.objects.create(name=name, year=year, category=category)
+        title.genre.set(genres)
+        titles[name] = title
+    users = [User.objects.create(username=f'user_{number}',
+                                 email=f'user_{number}@yamdb.local')
+             for number in range(2)]
+    for name, scores in (('both', (9, 8)), ('drama', (6, 5)),
+                         ('rock', (10,))):
+        for user, score in zip(users, scores):
+            Review.objects.create(title=titles[name], author=user,
+                                  text='Отзыв', score=score)
+    return titles
+
+
+def names(query):
+    response = Client().get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert response.json()['count'] == len(results)
+    return sorted(title['name'] for title in results)
+
+
+def filtered(query):
+    return TitleFilter(dict(pair.split('=') for pair in query.split('&')),
+                       queryset=Title.objects.order_by('pk')).qs
+
+
+class TestTitleFilter:
+
+    def test_genres(self, catalog):
+        assert names('genre=drama') == ['both', 'drama']
+        assert names('genre=drama,comedy') == ['both', 'comedy', 'drama'], (
+            'Проверьте, что произведение с двумя жанрами не дублируется'
+        )
+        assert names('genre=drama,comedy&genre_match=all') == ['both']
+        assert names('genre=drama,rock&genre_match=all') == []
+        assert names('genre=unknown') == []
+
+    def test_categories(self, catalog):
+        assert names('category=books') == ['both', 'comedy']
+        assert names('category=books,music') == ['both', 'comedy', 'rock']
+
+    def test_years_and_rating(self, catalog):
+        assert names('year_min=2000&year_max=2010') == ['comedy', 'drama']
+        assert names('year=2020') == ['rock']
+        assert names('rating_min=8.5') == ['both', 'rock']
+        assert names('rating_min=5.5&category=books,movies') == [
+            'both', 'drama'
+        ]
+
+    def test_subqueries_instead_of_joins(self, catalog):
+        sql = str(filtered(
+            'genre=drama,comedy&genre_match=all&category=books'
+            '&rating_min=5'
+        ).query)
+
+        assert 'JOIN "reviews_genretitle"' not in sql
+        assert 'JOIN "reviews_category"' not in sql
+        assert sql.count('IN (SELECT') == 6, sql
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='план запроса PostgreSQL')
+    def test_genre_plan_uses_index(self, catalog):
+        queryset = filtered('genre=drama,comedy&genre_match=all')
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute('RESET enable_seqscan')
+
+        assert 'genre_title_idx' in plan, plan
+        assert 'Semi Join' in plan or 'Nested Loop' in plan, plan
@@ -0,0 +1,127 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Comment, Review, Title, User
+
+
+def user_client(user):
+    client = Client()
+    token = RefreshToken.for_user(user).access_token
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def pages(client, url):
+    results = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data['results']) <= 2
+        results.extend(data['results'])
+        url = data['next']
+    return results
+
+
+@pytest.fixture
+def activity(db):
+    category = Category.objects.create(name='Книги', slug='books')
+    titles = [Title.objects.create(name=f'Книга {number}', year=2000,
+                                   category=category)
+              for number in range(5)]
+    author = User.objects.create(username='author',
+                                 email='author@yamdb.local')
+    other = User.objects.create(username='other', email='other@yamdb.local')
+    for title in titles:
+        review = Review.objects.create(title=title, author=author,
+                                       text=f'Отзыв {title.pk}', score=5)
+        Review.objects.create(title=title, author=other, text='Чужой',
+                              score=5)
+        Comment.objects.create(review=review, author=author, text='Свой')
+        Comment.objects.create(review=review, author=other, text='Чужой')
+    return titles, author, other
+
+
+class TestUserActivity:
+
+    def test_my_reviews_pages_newest_first(self, activity):
+        titles, author, _ = activity
+        Title.objects.filter(pk=titles[0].pk).update(is_deleted=True)
+
+        results = pages(user_client(author),
+                        '/api/v1/users/me/reviews/?limit=2')
+
+        assert [review['title'] for review in results] == [
+            title.pk for title in reversed(titles[1:])
+        ], 'Проверьте порядок отзывов и скрытие удаляемых произведений'
+        assert {review['author'] for review in results} == {'author'}
+
+    def test_my_comments(self, activity):
+        titles, author, _ = activity
+
+        results = pages(user_client(author),
+                        '/api/v1/users/me/comments/?limit=2')
+
+        assert [comment['title_id'] for comment in results] == [
+            title.pk for title in reversed(titles)
+        ]
+        assert {comment['text'] for comment in results} == {'Свой'}
+        review = Review.objects.get(pk=results[0]['review_id'])
+        assert review.author == author
+
+    def test_user_reviews_for_admin_only(self, activity):
+        _, author, other = activity
+        admin = User.objects.create(username='root',
+                                    email='root@yamdb.local',
+                                    role=User.ADMIN)
+        url = '/api/v1/users/other/reviews/'
+
+        assert user_client(author).get(url).status_code == 403
+        assert Client().get('/api/v1/users/me/reviews/').status_code == 401
+        results = pages(user_client(admin), f'{url}?limit=2')
+        assert len(results) == 5
+        assert {review['author'] for review in results} == {'other'}
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='план запроса PostgreSQL')
+    def test_keyset_uses_author_index(self, db):
+        category = Category.objects.create(name='Книги', slug='books')
+        titles = Title.objects.bulk_create(
+            Title(name=f'Книга {number}', year=2000, category=category)
+            for number in range(400)
+        )
+        authors = User.objects.bulk_create(
+            User(username=f'author_{number}',
+                 email=f'author_{number}@yamdb.local')
+            for number in range(20)
+        )
+        Review.objects.bulk_create(
+            Review(title=title, author=author, text='Отзыв', score=5)
+            for author in authors for title in titles
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        client = user_client(authors[0])
+        first = client.get('/api/v1/users/me/reviews/?limit=2').json()
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(first['next'])
+        statement = next(query['sql'] for query in queries
+                         if 'FROM "reviews_review"' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {statement}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        nodes = [line.strip().lstrip('->').split('  (')[0].strip()
+                 for line in plan.splitlines()]
+
+        assert re.search(r'Index Scan Backward using \S*author\S*pub_date',
+                         plan), plan
+        assert 'Index Cond: ((author_id = ' in plan, plan
+        assert not {'Sort', 'Incremental Sort'} & set(nodes), (
+            'Проверьте, что страница читается по индексу без сортировки'
+        )